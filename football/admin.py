@@ -1,12 +1,51 @@
 from django.contrib import admin
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.decorators import method_decorator
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django.shortcuts import redirect
+from django.views.decorators.csrf import csrf_exempt
 from .models import (
     ClubInfo, League, Team, Player, Management, News, 
-    Match, Standing, Event, Gallery, GalleryAlbum, PageVisit, MainPage, GoogleCalendarSettings, BulkImageUpload
+    Match, Standing, Event, Gallery, GalleryAlbum, PageVisit, MainPage, GoogleCalendarSettings, BulkImageUpload,
+    PageVisitHourly, PageVisitDaily, ImageJob, MediaBlob
 )
 from .forms import BulkImageUploadForm
+from .exports import FORMAT_CSV, FORMAT_JSONL, MATCH_FIELDS, VISIT_FIELDS, streaming_export_response
+from .imagejobs import enqueue_thumbnail
+from .renditions import THUMBNAIL_SIZE, thumbnail_url
+
+
+def export_action(fields, fmt, basename, description):
+    """Admin action streaming the selected rows as CSV or gzip JSON Lines"""
+    def action(modeladmin, request, queryset):
+        return streaming_export_response(queryset, fields, fmt, basename)
+    action.__name__ = f"export_{basename}_{fmt}"
+    action.short_description = description
+    return action
+
+def admin_thumbnail(field_file, width, height, style=""):
+    """Lazy-loaded micro-thumbnail for changelist previews; never links the full-size original"""
+    url = thumbnail_url(field_file.name) if field_file else None
+    if not url:
+        return _("Náhled se připravuje")
+    return format_html(
+        '<img src="{}" width="{}" height="{}" loading="lazy" decoding="async" style="object-fit: cover;{}" />',
+        url, width, height, style,
+    )
+
+def regenerate_thumbnails_action(get_file):
+    """Admin action queueing a rewrite of the micro-thumbnail of each selected row's image"""
+    def action(modeladmin, request, queryset):
+        count = 0
+        for obj in queryset:
+            field_file = get_file(obj)
+            if field_file and enqueue_thumbnail(field_file.instance, field_file.field.name):
+                count += 1
+        modeladmin.message_user(request, f"Zařazeno {count} úloh na nové náhledy ({THUMBNAIL_SIZE} px)")
+    action.__name__ = "regenerate_thumbnails"
+    action.short_description = _("Znovu vytvořit náhledy")
+    return action
 
 @admin.register(ClubInfo)
 class ClubInfoAdmin(admin.ModelAdmin):
@@ -26,8 +65,8 @@ class ClubInfoAdmin(admin.ModelAdmin):
 
 @admin.register(League)
 class LeagueAdmin(admin.ModelAdmin):
-    list_display = ['name', 'season']
-    list_filter = ['season']
+    list_display = ['name', 'season', 'standings_from_matches']
+    list_filter = ['season', 'standings_from_matches']
     search_fields = ['name']
 
 @admin.register(Team)
@@ -39,9 +78,10 @@ class TeamAdmin(admin.ModelAdmin):
     
     def flag_preview(self, obj):
         if obj.flag:
-            return format_html('<img src="{}" width="30" height="20" />', obj.flag.url)
+            return admin_thumbnail(obj.flag, 30, 20)
         return _("Bez vlajky")
     flag_preview.short_description = _("Vlajka")
+    actions = [regenerate_thumbnails_action(lambda obj: obj.flag)]
 
 class PlayerInline(admin.TabularInline):
     model = Player
@@ -57,9 +97,10 @@ class PlayerAdmin(admin.ModelAdmin):
     
     def photo_preview(self, obj):
         if obj.photo:
-            return format_html('<img src="{}" width="40" height="40" style="border-radius: 50%;" />', obj.photo.url)
+            return admin_thumbnail(obj.photo, 40, 40, " border-radius: 50%;")
         return _("Bez fotografie")
     photo_preview.short_description = _("Fotografie")
+    actions = [regenerate_thumbnails_action(lambda obj: obj.photo)]
 
 @admin.register(Management)
 class ManagementAdmin(admin.ModelAdmin):
@@ -74,9 +115,10 @@ class ManagementAdmin(admin.ModelAdmin):
     
     def photo_preview(self, obj):
         if obj.photo:
-            return format_html('<img src="{}" width="40" height="40" style="border-radius: 50%;" />', obj.photo.url)
+            return admin_thumbnail(obj.photo, 40, 40, " border-radius: 50%;")
         return _("Bez fotografie")
     photo_preview.short_description = _("Fotografie")
+    actions = [regenerate_thumbnails_action(lambda obj: obj.photo)]
     
     class Media:
         css = {
@@ -94,9 +136,10 @@ class NewsAdmin(admin.ModelAdmin):
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="60" height="40" />', obj.image.url)
+            return admin_thumbnail(obj.image, 60, 40)
         return _("Bez obrázku")
     image_preview.short_description = _("Obrázek")
+    actions = [regenerate_thumbnails_action(lambda obj: obj.image)]
     
     def save_model(self, request, obj, form, change):
         if not obj.author_id:
@@ -114,6 +157,10 @@ class MatchAdmin(admin.ModelAdmin):
     list_filter = ['league', 'round_number', 'date', 'home_team__is_club_team', 'away_team__is_club_team']
     search_fields = ['home_team__name', 'away_team__name']
     date_hierarchy = 'date'
+    actions = [
+        export_action(MATCH_FIELDS, FORMAT_CSV, 'zapasy', _("Exportovat vybrané do CSV")),
+        export_action(MATCH_FIELDS, FORMAT_JSONL, 'zapasy', _("Exportovat vybrané do JSON Lines (gzip)")),
+    ]
     ordering = ['-date']
     fields = ['home_team', 'away_team', 'date', 'league', 'round_number', 'home_score', 'away_score', 'location', 'referee', 'notes']
     
@@ -151,7 +198,8 @@ class GalleryInline(admin.TabularInline):
 
 @admin.register(GalleryAlbum)
 class GalleryAlbumAdmin(admin.ModelAdmin):
-    list_display = ['title', 'created_at', 'event', 'cover_preview', 'bulk_upload_link']
+    list_display = ['title', 'created_at', 'event', 'photo_count', 'cover_preview', 'bulk_upload_link']
+    list_select_related = ['event', 'cover_photo']
     list_filter = ['created_at', 'event']
     search_fields = ['title', 'description']
     date_hierarchy = 'created_at'
@@ -160,11 +208,12 @@ class GalleryAlbumAdmin(admin.ModelAdmin):
     fields = ['title', 'description', 'event', 'cover_image']
     
     def cover_preview(self, obj):
-        url = obj.get_cover_url()
-        if url:
-            return format_html('<img src="{}" width="80" height="60" />', url)
+        cover = obj.get_cover_file()
+        if cover:
+            return admin_thumbnail(cover, 80, 60)
         return _("Bez obrázku")
     cover_preview.short_description = _("Titulka")
+    actions = [regenerate_thumbnails_action(lambda obj: obj.get_cover_file())]
     
     def bulk_upload_link(self, obj):
         from django.urls import reverse
@@ -190,9 +239,10 @@ class GalleryAdmin(admin.ModelAdmin):
     
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="80" height="60" />', obj.image.url)
+            return admin_thumbnail(obj.image, 80, 60)
         return _("Bez obrázku")
     image_preview.short_description = _("Obrázek")
+    actions = [regenerate_thumbnails_action(lambda obj: obj.image)]
 
 
 @admin.register(BulkImageUpload)
@@ -202,8 +252,18 @@ class BulkImageUploadAdmin(admin.ModelAdmin):
     list_display = ['album', 'event', 'uploaded_at', 'default_title_prefix']
     list_filter = ['uploaded_at', 'album', 'event']
     ordering = ['-uploaded_at']
-    fields = ['album', 'event', 'default_title_prefix', 'images']
+    fields = ['album', 'event', 'default_title_prefix', 'images', 'archive']
     
+    @method_decorator(csrf_exempt)
+    def add_view(self, request, form_url='', extra_context=None):
+        """Stream the uploaded photos to temporary files instead of holding them in memory.
+
+        The handlers must be replaced before anything reads request.POST, so the
+        CSRF middleware is skipped here and the check runs in changeform_view.
+        """
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().add_view(request, form_url, extra_context)
+
     def get_form(self, request, obj=None, **kwargs):
         """Pre-fill album field if passed in URL"""
         form = super().get_form(request, obj, **kwargs)
@@ -225,13 +285,15 @@ class BulkImageUploadAdmin(admin.ModelAdmin):
         """Override save to handle multiple images"""
         if not change:  # Only for new instances
             created_galleries = form.save(commit=True)
+            from django.contrib import messages
             if created_galleries:
-                from django.contrib import messages
                 count = len(created_galleries)
                 messages.success(
                     request, 
                     f"Úspěšně nahráno {count} obrázků do galerie '{obj.album.title}'"
                 )
+            for filename, error in form.failures:
+                messages.warning(request, f"Soubor '{filename}' nebyl nahrán: {error}")
         else:
             # For existing instances, just save normally (shouldn't happen much)
             super().save_model(request, obj, form, change)
@@ -264,23 +326,132 @@ class BulkImageUploadAdmin(admin.ModelAdmin):
 
 @admin.register(PageVisit)
 class PageVisitAdmin(admin.ModelAdmin):
-    list_display = ['page_name', 'ip_address', 'timestamp', 'short_user_agent']
-    list_filter = ['page_name', 'timestamp']
+    list_display = ['page_name', 'ip_address', 'timestamp', 'referrer', 'device']
+    list_filter = ['page_name', 'device', 'timestamp']
     search_fields = ['page_name', 'ip_address']
     date_hierarchy = 'timestamp'
     ordering = ['-timestamp']
-    readonly_fields = ['page_name', 'ip_address', 'user_agent', 'timestamp']
+    readonly_fields = ['page_name', 'ip_address', 'device', 'referrer', 'timestamp']
+    change_list_template = 'admin/football/pagevisit/change_list.html'
+    actions = [
+        export_action(VISIT_FIELDS, FORMAT_CSV, 'navstevy', _("Exportovat vybrané do CSV")),
+        export_action(VISIT_FIELDS, FORMAT_JSONL, 'navstevy', _("Exportovat vybrané do JSON Lines (gzip)")),
+    ]
+    
+    def has_add_permission(self, request):
+        return False
     
-    def short_user_agent(self, obj):
-        return obj.user_agent[:50] + "..." if len(obj.user_agent) > 50 else obj.user_agent
-    short_user_agent.short_description = "User Agent"
+    def get_urls(self):
+        from django.urls import path
+        urls = [
+            path('analytics/', self.admin_site.admin_view(self.analytics_view), name='football_pagevisit_analytics'),
+        ]
+        return urls + super().get_urls()
     
+    def analytics_view(self, request):
+        """Traffic dashboard built from the rollup tables"""
+        from datetime import date
+        from django.template.response import TemplateResponse
+        from .analytics import RANGE_CHOICES, resolve_range, visit_report
+
+        def parse_date(value):
+            try:
+                return date.fromisoformat(value) if value else None
+            except ValueError:
+                return None
+
+        try:
+            days = int(request.GET.get('days', RANGE_CHOICES[1]))
+        except ValueError:
+            days = RANGE_CHOICES[1]
+        if days not in RANGE_CHOICES:
+            days = RANGE_CHOICES[1]
+        start, end = resolve_range(days, parse_date(request.GET.get('start')), parse_date(request.GET.get('end')))
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': _("Statistiky návštěvnosti"),
+            'range_choices': RANGE_CHOICES,
+            'days': days,
+            'report': visit_report(start, end),
+        }
+        return TemplateResponse(request, 'admin/football/pagevisit/analytics.html', context)
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'kind', 'status', 'result', 'attempts', 'run_after', 'updated_at']
+    list_filter = ['status', 'kind', 'model']
+    search_fields = ['path', 'last_error']
+    ordering = ['-created_at']
+    readonly_fields = ['model', 'object_id', 'field_name', 'kind', 'path', 'max_width', 'max_height', 'status',
+                       'attempts', 'result', 'last_error', 'run_after', 'created_at', 'updated_at']
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+        count = queryset.exclude(status=ImageJob.STATUS_DONE).update(
+            status=ImageJob.STATUS_PENDING, attempts=0, run_after=timezone.now()
+        )
+        self.message_user(request, f"Znovu zařazeno {count} úloh")
+    retry_jobs.short_description = _("Zkusit znovu")
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    """Read-only view of deduplicated media files and their reference counts"""
+    list_display = ['name', 'refcount', 'size', 'created_at']
+    search_fields = ['name', 'sha256']
+    ordering = ['-refcount', 'name']
+    readonly_fields = ['name', 'sha256', 'size', 'refcount', 'created_at']
+
     def has_add_permission(self, request):
         return False
 
+class PageVisitRollupAdmin(admin.ModelAdmin):
+    """Read-only view of the rollups written by aggregate_page_visits"""
+    list_display = ['page_name', 'bucket', 'hits', 'unique_ips']
+    list_filter = ['page_name']
+    search_fields = ['page_name']
+    date_hierarchy = 'bucket'
+    ordering = ['-bucket', 'page_name']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(PageVisitHourly)
+class PageVisitHourlyAdmin(PageVisitRollupAdmin):
+    pass
+
+@admin.register(PageVisitDaily)
+class PageVisitDailyAdmin(PageVisitRollupAdmin):
+    pass
+
 @admin.register(MainPage)
 class MainPageAdmin(admin.ModelAdmin):
     filter_horizontal = ['featured_news']
+    readonly_fields = ['fragment_cache_stats']
+
+    def fragment_cache_stats(self, obj):
+        """Hit/miss counters of the cached home page sections"""
+        from django.utils.html import format_html_join
+        from .fragments import fragment_stats
+
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            ((row['name'], row['hits'], row['misses'], '–' if row['ratio'] is None else f"{row['ratio']} %")
+             for row in fragment_stats()),
+        )
+        return format_html(
+            '<table><thead><tr><th>{}</th><th>{}</th><th>{}</th><th>{}</th></tr></thead><tbody>{}</tbody></table>',
+            _("Sekce"), _("Zásahy"), _("Výpadky"), _("Úspěšnost"), rows,
+        )
+    fragment_cache_stats.short_description = _("Cache sekcí hlavní stránky")
     
     def has_add_permission(self, request):
         # Only allow one instance
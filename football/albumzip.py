@@ -0,0 +1,166 @@
+"""Whole-album ZIP downloads.
+
+The archive is streamed while it is built: photos are copied in chunks into
+a ``zipfile`` writing to an unseekable sink, and every chunk is yielded to the
+client as soon as it is produced. Already-compressed formats are stored
+without compression, so the work is mostly copying bytes. The same bytes are
+teed into a cache file under ``ALBUM_ZIP_CACHE_DIR``; once complete, repeat
+downloads are served from that file. The cache file name carries a
+fingerprint of the album's photos, and the signal handlers in
+``football.signals`` drop cached archives whenever a photo is added, changed
+or removed.
+
+The cache is bounded: every newly completed archive triggers ``prune_cache``,
+which drops archives not downloaded for ``ALBUM_ZIP_CACHE_MAX_AGE`` seconds
+and then the least recently downloaded ones until the directory fits in
+``ALBUM_ZIP_CACHE_MAX_BYTES``.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+import time
+import zipfile
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.text import slugify
+
+CHUNK_SIZE = 256 * 1024
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_AGE = 60 * 60 * 24 * 30
+
+
+def get_cache_dir():
+    return str(getattr(settings, 'ALBUM_ZIP_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'album_zips')))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def prune_cache(keep=None):
+    """Evict expired archives, then the least recently used until the size limit holds; returns files removed"""
+    max_bytes = getattr(settings, 'ALBUM_ZIP_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+    max_age = getattr(settings, 'ALBUM_ZIP_CACHE_MAX_AGE', DEFAULT_MAX_AGE)
+    cache_dir = get_cache_dir()
+    now = time.time()
+    entries = []
+    removed = 0
+    for path in glob.glob(os.path.join(cache_dir, 'album-*.zip')) + glob.glob(os.path.join(cache_dir, '*.part')):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        # Leftover .part files come from builds that were killed; live ones are younger than max_age
+        if path != keep and now - stat.st_mtime > max_age:
+            _remove(path)
+            removed += 1
+        elif path.endswith('.zip'):
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path != keep:
+            _remove(path)
+            removed += 1
+            total -= size
+    return removed
+
+
+def album_photos(album):
+    return list(album.photos.order_by('uploaded_at', 'pk').values_list('pk', 'title', 'image'))
+
+
+def fingerprint(album, photos):
+    digest = hashlib.sha1(f"{album.pk}:{album.title}".encode('utf-8'))
+    for pk, title, name in photos:
+        digest.update(f"|{pk}:{title}:{name}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def cache_path(album, photos):
+    return os.path.join(get_cache_dir(), f"album-{album.pk}-{fingerprint(album, photos)}.zip")
+
+
+def invalidate_album_zip(album_id):
+    """Remove every cached archive of the album"""
+    for path in glob.glob(os.path.join(get_cache_dir(), f"album-{album_id}-*.zip")):
+        _remove(path)
+
+
+class _Sink:
+    """Write-only file object collecting zipfile output for the response and the cache file"""
+
+    def __init__(self, tee):
+        self.tee = tee
+        self.chunks = []
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.tee.write(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def _entries(photos):
+    from .models import Gallery
+
+    storage = Gallery._meta.get_field('image').storage
+    for number, (pk, title, name) in enumerate(photos, 1):
+        if not name or not storage.exists(name):
+            continue
+        ext = os.path.splitext(name)[1].lower()
+        yield storage.path(name), f"{number:03d}-{slugify(title) or pk}{ext}", ext
+
+
+def stream_album_zip(photos, dest):
+    """Yield the ZIP of ``photos`` chunk by chunk, caching it at ``dest`` once complete"""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(dest))
+    completed = False
+    try:
+        with os.fdopen(fd, 'wb') as cache_file:
+            sink = _Sink(cache_file)
+            with zipfile.ZipFile(sink, 'w') as zf:
+                for path, arcname, ext in _entries(photos):
+                    info = zipfile.ZipInfo.from_file(path, arcname)
+                    info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                    with open(path, 'rb') as src, zf.open(info, 'w') as out:
+                        for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                            out.write(chunk)
+                            yield from sink.drain()
+                    yield from sink.drain()
+            yield from sink.drain()  # central directory
+        os.replace(tmp, dest)
+        completed = True
+        prune_cache(keep=dest)
+    finally:
+        if not completed:
+            _remove(tmp)
+
+
+def album_zip_response(album):
+    """Download response for the whole album, from the cache file when it is current"""
+    photos = album_photos(album)
+    dest = cache_path(album, photos)
+    filename = f"{slugify(album.title) or 'album'}-{album.pk}.zip"
+    if os.path.exists(dest):
+        os.utime(dest)  # recently used, see prune_cache
+        return FileResponse(open(dest, 'rb'), as_attachment=True, filename=filename, content_type='application/zip')
+    invalidate_album_zip(album.pk)  # older versions
+    response = StreamingHttpResponse(stream_album_zip(photos, dest), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,113 @@
+"""Visit statistics for the admin dashboard, read from the rollup tables only."""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from .hll import HyperLogLog
+from .models import PageVisitDaily, PageVisitHourly, PageVisitSketch, PageVisitSourceDaily, RollupCheckpoint
+from .rollups import CHECKPOINT_NAME
+
+RANGE_CHOICES = [7, 30, 90, 365]
+# Longest explicit start/end range, in days
+MAX_RANGE_DAYS = 366
+TOP_LIMIT = 10
+
+
+def resolve_range(days=None, start=None, end=None):
+    """Return an inclusive (start, end) date range; explicit dates win over ``days``
+
+    ``days`` other than one of ``RANGE_CHOICES`` falls back to the default and
+    explicit ranges are cut to the last ``MAX_RANGE_DAYS`` days before ``end``.
+    """
+    today = timezone.localdate()
+    # Keep the date arithmetic below clear of date.min
+    end = max(min(end or today, today), date.min + timedelta(days=MAX_RANGE_DAYS))
+    if start is not None:
+        start = min(start, today)
+    if days not in RANGE_CHOICES:
+        days = RANGE_CHOICES[1]
+    if start is None:
+        start = end - timedelta(days=days - 1)
+    if start > end:
+        start, end = end, start
+    start = max(start, end - timedelta(days=MAX_RANGE_DAYS - 1))
+    return start, end
+
+
+def unique_visitors(start, end, page_names=None):
+    """Estimate distinct visitor IPs per page and overall by merging daily sketches.
+
+    Returns ``(per_page, total)``; both carry the HyperLogLog error bound
+    documented in ``football.hll``.
+    """
+    sketches = PageVisitSketch.objects.filter(day__gte=start, day__lte=end)
+    if page_names is not None:
+        sketches = sketches.filter(page_name__in=page_names)
+    by_page = defaultdict(list)
+    for page_name, registers in sketches.values_list('page_name', 'registers').iterator():
+        by_page[page_name].append(HyperLogLog.from_bytes(registers))
+    per_page = {page: HyperLogLog.union(items) for page, items in by_page.items()}
+    total = HyperLogLog.union(per_page.values())
+    return {page: len(sketch) for page, sketch in per_page.items()}, len(total)
+
+
+def visit_report(start, end, limit=TOP_LIMIT):
+    """Top pages, visits per day, peak hours, referrers and devices for a date range"""
+    tz = timezone.get_current_timezone()
+    daily = PageVisitDaily.objects.filter(bucket__gte=start, bucket__lte=end).order_by()
+    sources = PageVisitSourceDaily.objects.filter(bucket__gte=start, bucket__lte=end).order_by()
+    hour_start = timezone.make_aware(datetime.combine(start, time.min), tz)
+    hour_end = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+    hourly = PageVisitHourly.objects.filter(bucket__gte=hour_start, bucket__lt=hour_end).order_by()
+
+    per_day = {row['bucket']: row['hits'] for row in daily.values('bucket').annotate(hits=Sum('hits'))}
+    visits_per_day = []
+    day = start
+    while day <= end:
+        visits_per_day.append({'day': day, 'hits': per_day.get(day, 0)})
+        day += timedelta(days=1)
+
+    per_hour = {
+        row['hour']: row['hits']
+        for row in hourly.annotate(hour=ExtractHour('bucket', tzinfo=tz)).values('hour').annotate(hits=Sum('hits'))
+    }
+    peak_hours = [{'hour': hour, 'hits': per_hour.get(hour, 0)} for hour in range(24)]
+
+    top_pages = list(
+        daily.values('page_name')
+        .annotate(hits=Sum('hits'))
+        .order_by('-hits', 'page_name')[:limit]
+    )
+    referrers = list(
+        sources.filter(dimension='referrer').exclude(value='')
+        .values('value').annotate(hits=Sum('hits')).order_by('-hits', 'value')[:limit]
+    )
+    devices = list(
+        sources.filter(dimension='device')
+        .values('value').annotate(hits=Sum('hits')).order_by('-hits', 'value')
+    )
+    page_visitors, total_visitors = unique_visitors(start, end)
+    for row in top_pages:
+        row['unique_visitors'] = page_visitors.get(row['page_name'], 0)
+    checkpoint = RollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+
+    total = sum(per_day.values())
+    max_day = max((row['hits'] for row in visits_per_day), default=0)
+    max_hour = max((row['hits'] for row in peak_hours), default=0)
+    return {
+        'start': start,
+        'end': end,
+        'total_hits': total,
+        'unique_visitors': total_visitors,
+        'top_pages': top_pages,
+        'visits_per_day': visits_per_day,
+        'max_day_hits': max_day,
+        'peak_hours': peak_hours,
+        'max_hour_hits': max_hour,
+        'referrers': referrers,
+        'devices': devices,
+        'aggregated_at': checkpoint.updated_at if checkpoint else None,
+    }
@@ -0,0 +1,77 @@
+"""Cached club context: the club team, ClubInfo and the MainPage configuration.
+
+These rows change a few times a season but are read on almost every page.
+The bundle is kept in the shared cache under a version number and memoised
+in process memory; every lookup only compares the process copy with the
+shared version, so steady-state requests run no database queries. The
+signal handlers in ``football.signals`` bump the version whenever a Team,
+ClubInfo or MainPage row is saved or deleted, which makes every process
+reload on its next lookup. A missing version (evicted or cleared) is seeded
+from the clock, never from a fixed number, so it cannot match a data key
+left over from before.
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'club-context:version'
+DATA_KEY = 'club-context:data:{}'
+TIMEOUT = 60 * 60 * 24
+
+_memo = None  # (version, data) of this process
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        seed = time.time_ns()
+        cache.add(VERSION_KEY, seed, None)
+        version = cache.get(VERSION_KEY, seed)
+    return version
+
+
+def _load():
+    from .models import ClubInfo, MainPage, Team
+
+    return {
+        'club_team': Team.objects.filter(is_club_team=True).first(),
+        'club_info': ClubInfo.objects.first(),
+        'main_page': MainPage.objects.first(),
+    }
+
+
+def get_club_context():
+    """Dict with ``club_team``, ``club_info`` and ``main_page`` (each may be None)"""
+    global _memo
+    version = _version()
+    memo = _memo
+    if memo and memo[0] == version:
+        return memo[1]
+    data = cache.get(DATA_KEY.format(version))
+    if data is None:
+        data = _load()
+        cache.set(DATA_KEY.format(version), data, TIMEOUT)
+    _memo = (version, data)
+    return data
+
+
+def get_club_team():
+    return get_club_context()['club_team']
+
+
+def get_club_info():
+    return get_club_context()['club_info']
+
+
+def get_main_page():
+    return get_club_context()['main_page']
+
+
+def invalidate_club_context():
+    """Make every process reload the club context on its next lookup"""
+    global _memo
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+    _memo = None
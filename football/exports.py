@@ -0,0 +1,117 @@
+"""Streaming CSV / gzip JSON Lines export of visits and matches.
+
+Rows are read with ``.iterator(chunk_size=...)`` and encoded one chunk at a
+time, so memory use does not depend on the number of exported rows.
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Match, PageVisit
+
+CHUNK_SIZE = 2000
+FORMAT_CSV = 'csv'
+FORMAT_JSONL = 'jsonl'
+
+VISIT_FIELDS = ['id', 'timestamp', 'page_name', 'ip_address', 'device', 'referrer']
+MATCH_FIELDS = [
+    'id', 'date', 'league__name', 'league__season', 'round_number',
+    'home_team__name', 'away_team__name', 'home_score', 'away_score', 'location', 'referee',
+]
+
+
+def filter_visits(queryset=None, start=None, end=None, page=None):
+    """Restrict visits to an inclusive date range and/or a page name"""
+    qs = PageVisit.objects.all() if queryset is None else queryset
+    if start:
+        qs = qs.filter(timestamp__date__gte=start)
+    if end:
+        qs = qs.filter(timestamp__date__lte=end)
+    if page:
+        qs = qs.filter(page_name=page)
+    return qs
+
+
+def filter_matches(queryset=None, start=None, end=None, league=None):
+    qs = Match.objects.all() if queryset is None else queryset
+    if start:
+        qs = qs.filter(date__date__gte=start)
+    if end:
+        qs = qs.filter(date__date__lte=end)
+    if league:
+        qs = qs.filter(league_id=league)
+    return qs
+
+
+def iter_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """Yield value tuples without caching the queryset"""
+    return queryset.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(fields, rows, batch=500):
+    """Yield CSV text, ``batch`` rows per chunk"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow([_plain(v) for v in row]))
+        if len(lines) >= batch:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def jsonl_gzip_chunks(fields, rows, batch=500):
+    """Yield gzip-compressed JSON Lines bytes, one object per row"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(fields, map(_plain, row))), ensure_ascii=False))
+        if len(lines) >= batch:
+            data = compressor.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+            lines = []
+            if data:
+                yield data
+    if lines:
+        yield compressor.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+    yield compressor.flush()
+
+
+def export_chunks(queryset, fields, fmt, chunk_size=CHUNK_SIZE):
+    rows = iter_rows(queryset, fields, chunk_size)
+    if fmt == FORMAT_JSONL:
+        return jsonl_gzip_chunks(fields, rows)
+    return csv_chunks(fields, rows)
+
+
+def streaming_export_response(queryset, fields, fmt, basename):
+    """StreamingHttpResponse with the export as an attachment"""
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M')
+    if fmt == FORMAT_JSONL:
+        response = StreamingHttpResponse(export_chunks(queryset, fields, fmt), content_type='application/gzip')
+        filename = f"{basename}-{stamp}.jsonl.gz"
+    else:
+        response = StreamingHttpResponse(export_chunks(queryset, fields, fmt), content_type='text/csv; charset=utf-8')
+        filename = f"{basename}-{stamp}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
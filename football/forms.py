@@ -1,7 +1,9 @@
 from django import forms
 from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
-from .models import Gallery, GalleryAlbum, Event, BulkImageUpload
+from .models import GalleryAlbum, Event, BulkImageUpload
+from .ingest import ingest_archive, ingest_images
 import os
+import zipfile
 
 
 class MultipleFileInput(forms.ClearableFileInput):
@@ -29,7 +31,12 @@ class BulkImageUploadForm(forms.ModelForm):
     images = MultipleFileField(
         label="Obrázky",
         help_text="Vyberte více obrázků najednou (podržte Ctrl/Cmd pro výběr více souborů)",
-        required=True
+        required=False
+    )
+    archive = forms.FileField(
+        label="ZIP archiv",
+        help_text="Nebo nahrajte celé album jako jeden ZIP soubor",
+        required=False
     )
     
     class Meta:
@@ -44,30 +51,53 @@ class BulkImageUploadForm(forms.ModelForm):
             'accept': 'image/*',
             'class': 'bulk-image-upload'
         })
+        self.fields['archive'].widget.attrs.update({
+            'accept': '.zip,application/zip',
+        })
+
+    def clean_archive(self):
+        archive = self.cleaned_data.get('archive')
+        if archive and not zipfile.is_zipfile(archive):
+            raise forms.ValidationError("Soubor není platný ZIP archiv.")
+        return archive
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('images') and not cleaned_data.get('archive') and not self.errors:
+            raise forms.ValidationError("Vyberte obrázky nebo ZIP archiv.")
+        return cleaned_data
 
     def save(self, commit=True):
-        """Override save to handle multiple images"""
+        """Ingest all uploaded images; per-file failures end up in ``self.failures``"""
         # Don't save the BulkImageUpload instance
         bulk_upload = super().save(commit=False)
-        
+        self.failures = []
+
         if commit:
             images = self.cleaned_data.get('images', [])
             if not isinstance(images, list):
                 images = [images]
-            
+
+            images = [image for image in images if image]
+            archive = self.cleaned_data.get('archive')
             created_galleries = []
-            for i, image_file in enumerate(images, 1):
-                if image_file:
-                    # Create individual Gallery instances
-                    gallery = Gallery(
-                        title=f"{bulk_upload.default_title_prefix} {i}",
-                        image=image_file,
-                        album=bulk_upload.album,
-                        event=bulk_upload.event
-                    )
-                    gallery.save()
-                    created_galleries.append(gallery)
-            
+            if images:
+                created_galleries, self.failures = ingest_images(
+                    images,
+                    album=bulk_upload.album,
+                    event=bulk_upload.event,
+                    title_prefix=bulk_upload.default_title_prefix,
+                )
+            if archive:
+                galleries, failures = ingest_archive(
+                    archive,
+                    album=bulk_upload.album,
+                    event=bulk_upload.event,
+                    title_prefix=bulk_upload.default_title_prefix,
+                    first_number=len(images) + 1,
+                )
+                created_galleries += galleries
+                self.failures += failures
             return created_galleries
-        
+
         return bulk_upload
@@ -0,0 +1,144 @@
+"""Versioned template fragment cache for the home page sections.
+
+Every fragment is declared in ``FRAGMENTS`` with the models its markup is
+built from. Each of those models has a version counter in the shared cache;
+the signal handlers in ``football.signals`` bump it whenever a row of the
+model is saved or deleted, and the fragment key embeds the current versions,
+so a stale fragment is simply never looked up again and expires on its own.
+A missing counter is seeded from the clock, so an evicted version can never
+point back at fragments cached under an earlier one.
+A warm fragment costs one ``get_many`` for the versions and one ``get`` for
+the markup and no database queries.
+
+Match fragments also carry a short timeout because "upcoming" and "recent"
+depend on the clock, not only on the data.
+
+Hits and misses are counted per fragment in process memory and added to
+counters in the shared cache at most every ``STATS_FLUSH_INTERVAL`` seconds,
+so counting does not add a cache write to every request.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+
+VERSION_KEY = 'fragment-version:{}'
+CHANGED_KEY = 'fragment-changed:{}'
+FRAGMENT_KEY = 'fragment:{}:{}'
+STATS_KEY = 'fragment-stats:{}:{}'
+STATS_FLUSH_INTERVAL = 30
+DAY = 60 * 60 * 24
+
+# name -> (models the markup depends on, timeout in seconds)
+FRAGMENTS = {
+    'home_hero': (('ClubInfo',), DAY),
+    'home_upcoming_match': (('Match', 'Team', 'League'), 60 * 10),
+    'home_recent_match': (('Match', 'Team', 'League'), 60 * 10),
+    'home_latest_news': (('News',), DAY),
+}
+# Models whose saves bump a version (connected in football.signals)
+VERSIONED_MODELS = sorted({model for models, _ in FRAGMENTS.values() for model in models})
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def model_versions(models):
+    """Current version counters of the given model names"""
+    keys = [VERSION_KEY.format(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            seed = time.time_ns()
+            cache.add(key, seed, None)
+            found[key] = cache.get(key, seed)
+    return [found[key] for key in keys]
+
+
+def fragment_key(name, vary_on=()):
+    """Cache key of ``name`` for the current model versions (KeyError for unknown fragments)"""
+    models, _ = FRAGMENTS[name]
+    parts = [f"{model}.{version}" for model, version in zip(models, model_versions(models))]
+    parts.extend(str(value) for value in vary_on)
+    return FRAGMENT_KEY.format(name, hashlib.md5(':'.join(parts).encode()).hexdigest())
+
+
+def get_fragment(name, vary_on=()):
+    """``(key, cached markup or None)``; counts the lookup as a hit or a miss"""
+    key = fragment_key(name, vary_on)
+    markup = cache.get(key)
+    record(name, markup is not None)
+    return key, markup
+
+
+def set_fragment(name, key, markup):
+    cache.set(key, markup, FRAGMENTS[name][1])
+
+
+def bump_version(model):
+    """Invalidate every fragment built from ``model`` (a model name such as ``'News'``)"""
+    key = VERSION_KEY.format(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+    cache.set(CHANGED_KEY.format(model), time.time(), None)
+
+
+def last_changed(models):
+    """Unix time of the newest version bump of the given models (None if never bumped)"""
+    times = cache.get_many([CHANGED_KEY.format(model) for model in models]).values()
+    return max(times, default=None)
+
+
+def record(name, hit):
+    global _last_flush
+    with _lock:
+        _pending[name, 'hit' if hit else 'miss'] += 1
+        due = time.monotonic() - _last_flush >= STATS_FLUSH_INTERVAL
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """Add this process's pending hit/miss counts to the shared counters"""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    for (name, kind), count in pending.items():
+        key = STATS_KEY.format(name, kind)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            if not cache.add(key, count, None):
+                cache.incr(key, count)
+
+
+def fragment_stats():
+    """List of ``{'name', 'hits', 'misses', 'ratio'}`` dicts (ratio in percent or None)"""
+    flush_stats()
+    keys = [STATS_KEY.format(name, kind) for name in FRAGMENTS for kind in ('hit', 'miss')]
+    counts = cache.get_many(keys)
+    rows = []
+    for name in FRAGMENTS:
+        hits = counts.get(STATS_KEY.format(name, 'hit'), 0)
+        misses = counts.get(STATS_KEY.format(name, 'miss'), 0)
+        total = hits + misses
+        rows.append({
+            'name': name,
+            'hits': hits,
+            'misses': misses,
+            'ratio': round(hits * 100 / total, 1) if total else None,
+        })
+    return rows
+
+
+def reset_stats():
+    with _lock:
+        _pending.clear()
+    cache.delete_many([STATS_KEY.format(name, kind) for name in FRAGMENTS for kind in ('hit', 'miss')])
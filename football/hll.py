@@ -0,0 +1,87 @@
+"""HyperLogLog cardinality sketch used for unique-visitor estimates.
+
+With precision ``p`` the sketch keeps ``m = 2**p`` one-byte registers and
+estimates the number of distinct items with a relative standard error of
+about ``1.04 / sqrt(m)``. The default ``p = 11`` (2048 registers) gives
+~2.3 %; roughly 99 % of estimates fall within three standard errors (~7 %).
+Small cardinalities use linear counting and are close to exact.
+
+Sketches merge by taking the register-wise maximum, so the union of any
+number of pages or days is estimated with the same error bound. Registers
+are stored zlib-compressed; sketches of quiet pages are mostly zeros and
+shrink to a few hundred bytes.
+"""
+import hashlib
+import math
+import zlib
+
+DEFAULT_PRECISION = 11
+
+
+def _hash64(value):
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            registers = bytearray(self.m)
+        elif len(registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(registers)}")
+        self.registers = bytearray(registers)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, *others):
+        """Fold other sketches of the same precision into this one"""
+        if not others:
+            return self
+        for other in others:
+            if other.precision != self.precision:
+                raise ValueError("Cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, *(o.registers for o in others)))
+        return self
+
+    @classmethod
+    def union(cls, sketches, precision=DEFAULT_PRECISION):
+        result = cls(precision)
+        return result.merge(*sketches)
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+    def __len__(self):
+        return int(round(self.estimate()))
+
+    @property
+    def standard_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def to_bytes(self):
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers), 6)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        return cls(data[0], zlib.decompress(data[1:]))
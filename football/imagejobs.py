@@ -0,0 +1,288 @@
+"""Database-backed queue for image processing outside the request.
+
+Model ``save()`` methods only enqueue an ``ImageJob``, after the transaction
+commits and only when the file changed; the ``process_image_jobs``
+management command claims pending jobs and runs the Pillow work in a process
+pool. A ``resize`` job shrinks the original and then generates its
+renditions (see ``football.renditions``); a ``renditions`` job only does the
+latter. A resized image is stored under its new content hash and the rows
+are moved to it, the stored original is never rewritten. Failed jobs are
+retried with exponential backoff up to ``MAX_ATTEMPTS``. With
+``IMAGE_JOBS['SYNC']`` enabled (tests, local development without a worker)
+jobs run inline when enqueued.
+"""
+import io
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.utils import timezone
+from PIL import Image
+
+from .renditions import generate_renditions, generate_thumbnail
+from .storage import store_rewritten
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SYNC': False,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,      # seconds, doubled after every failed attempt
+    'STALE_AFTER': 600,     # seconds before a 'running' job is considered abandoned
+}
+
+
+def get_job_settings():
+    conf = dict(DEFAULTS)
+    conf.update(getattr(settings, 'IMAGE_JOBS', {}))
+    return conf
+
+
+def encode_options(img, fmt, quality=85):
+    """Pillow save options for ``fmt`` that keep the EXIF data and ICC profile of ``img``"""
+    options = {key: img.info[key] for key in ('exif', 'icc_profile') if img.info.get(key)}
+    if fmt == 'JPEG':
+        options.update(quality=quality, optimize=True, progressive=True)
+    elif fmt == 'WEBP':
+        options.update(quality=quality)
+    elif fmt == 'PNG':
+        options.update(optimize=True)
+    return options
+
+
+def resize_image_file(path, max_width, max_height, dest=None):
+    """Shrink the image at ``path`` to fit the box, writing it to ``dest`` (default: in place).
+
+    Returns True if written. Only files that are not in storage yet may be
+    rewritten in place. Runs in worker processes, so it must not touch the database.
+    """
+    with Image.open(path) as img:
+        if img.width <= max_width and img.height <= max_height:
+            return False
+        fmt = img.format
+        options = encode_options(img, fmt)
+        img.thumbnail((max_width, max_height))
+        img.save(dest or path, format=fmt, **options)
+    return True
+
+
+def recompress_image_file(path, max_size=None, quality=85, min_saving=0.1, dry_run=False, dest=None):
+    """Shrink to ``max_size`` (if given) and re-encode ``path`` when that saves space.
+
+    The result is written to ``dest``, or over ``path`` when ``dest`` is None
+    (only for files outside the content-addressed storage). Returns
+    ``(bytes_before, bytes_after)``; ``bytes_after == bytes_before`` when the
+    file is kept and nothing is written. A file that needs no resizing is only
+    rewritten if it shrinks by at least ``min_saving``, so already-compressed
+    photos do not lose quality for nothing. EXIF data (orientation) and the ICC
+    profile are preserved. Runs in worker processes; must not touch the database.
+    """
+    before = os.path.getsize(path)
+    with Image.open(path) as img:
+        fmt = img.format
+        if fmt not in ('JPEG', 'PNG', 'WEBP') or getattr(img, 'is_animated', False):
+            return before, before
+        options = encode_options(img, fmt, quality)
+        resize = bool(max_size) and (img.width > max_size[0] or img.height > max_size[1])
+        if resize:
+            if fmt == 'JPEG':
+                img.draft('RGB', max_size)
+            img.thumbnail(max_size, Image.LANCZOS, reducing_gap=3.0)
+        buf = io.BytesIO()
+        img.save(buf, format=fmt, **options)
+    after = buf.tell()
+    if not resize and after > before * (1 - min_saving):
+        return before, before
+    if not dry_run:
+        out = dest or path
+        tmp = f"{out}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, out)
+    return before, after
+
+
+def _run_job(job_id, kind, path, max_width, max_height, media_root):
+    """``(job_id, path of the resized copy or None, error)``; the stored original is left untouched"""
+    root, ext = os.path.splitext(path)
+    resized = f"{root}.resized{ext}"
+    try:
+        if kind == 'resize' and resize_image_file(path, max_width, max_height, dest=resized):
+            generate_renditions(resized, media_root)
+            return job_id, resized, None
+        if kind == 'thumbnail':
+            generate_thumbnail(path, media_root, force=True)
+        generate_renditions(path, media_root)
+        return job_id, None, None
+    except FileNotFoundError:
+        return job_id, None, None  # replaced or deleted since enqueueing; nothing to do
+    except Exception as e:
+        if os.path.exists(resized):
+            os.remove(resized)
+        return job_id, None, f"{type(e).__name__}: {e}"
+
+
+def replace_stored_file(model, field, old_name, path):
+    """
+    Store the rewritten copy at ``path`` for every ``model`` row whose ``field`` is ``old_name``.
+
+    The copy gets its own content-addressed name (see ``store_rewritten``) and
+    is deleted from ``path`` afterwards. Returns the number of rows moved.
+    """
+    try:
+        with open(path, 'rb') as f:
+            new_name, moved = store_rewritten(field.storage, model._default_manager.all(), field.attname, old_name, File(f))
+    finally:
+        os.remove(path)
+    if moved:
+        # update() sends no signals; let the cache invalidation handlers see the new file
+        for instance in model._default_manager.filter(**{field.attname: new_name}):
+            post_save.send(sender=model, instance=instance, created=False,
+                           update_fields=frozenset([field.attname]), raw=False, using=instance._state.db)
+    return moved
+
+
+def _store_resized(job, resized):
+    """Move every row still on the job's original to the resized copy"""
+    from django.apps import apps
+
+    try:
+        model = apps.get_model(job.model)
+        field = model._meta.get_field(job.field_name)
+    except Exception:
+        os.remove(resized)  # model or field gone; do not leave the copy behind
+        raise
+    old_name = os.path.relpath(job.path, field.storage.location).replace(os.sep, '/')
+    replace_stored_file(model, field, old_name, resized)
+
+
+def enqueue_resize(instance, field_name, max_size):
+    """Queue a resize of ``instance.<field_name>`` to fit ``max_size``"""
+    return _enqueue(instance, field_name, 'resize', max_size)
+
+
+def enqueue_renditions(instance, field_name):
+    """Queue rendition generation for ``instance.<field_name>``"""
+    return _enqueue(instance, field_name, 'renditions', (0, 0))
+
+
+def enqueue_thumbnail(instance, field_name):
+    """Queue a rewrite of the admin micro-thumbnail of ``instance.<field_name>`` (plus any missing renditions)"""
+    return _enqueue(instance, field_name, 'thumbnail', (0, 0))
+
+
+def _enqueue(instance, field_name, kind, max_size):
+    """Queue a job for ``instance.<field_name>`` once the current transaction commits.
+
+    Nothing is queued when the file is the one the row had before this save
+    (see ``release_replaced_files``), so saving other fields costs no job.
+    Returns True when a job was scheduled.
+    """
+    from .models import ImageJob
+
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return False
+    if getattr(instance, '_previous_files', {}).get(field_file.field.attname) == field_file.name:
+        return False
+    try:
+        path = field_file.path
+    except (ValueError, NotImplementedError):
+        return False
+
+    def create():
+        job, created = ImageJob.objects.get_or_create(
+            path=path,
+            kind=kind,
+            status=ImageJob.STATUS_PENDING,
+            defaults={
+                'model': instance._meta.label,
+                'object_id': instance.pk,
+                'field_name': field_name,
+                'max_width': max_size[0],
+                'max_height': max_size[1],
+            },
+        )
+        if get_job_settings()['SYNC']:
+            process_jobs(jobs=[job])
+
+    # A worker must never pick up a job for a row that is rolled back
+    transaction.on_commit(create)
+    return True
+
+
+def claim_jobs(limit):
+    """Mark up to ``limit`` due jobs as running and return them"""
+    from .models import ImageJob
+
+    conf = get_job_settings()
+    now = timezone.now()
+    stale = now - timedelta(seconds=conf['STALE_AFTER'])
+    with transaction.atomic():
+        ids = list(
+            ImageJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ImageJob.STATUS_PENDING, run_after__lte=now)
+                | Q(status=ImageJob.STATUS_RUNNING, updated_at__lt=stale)
+            )
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        ImageJob.objects.filter(id__in=ids).update(status=ImageJob.STATUS_RUNNING, updated_at=now)
+    return list(ImageJob.objects.filter(id__in=ids).order_by('id'))
+
+
+def _finish(job, changed, error):
+    from .models import ImageJob
+
+    conf = get_job_settings()
+    job.attempts += 1
+    if error is None:
+        job.status = ImageJob.STATUS_DONE
+        job.last_error = ''
+        job.result = 'resized' if changed else 'unchanged'
+    elif job.attempts < conf['MAX_ATTEMPTS']:
+        job.status = ImageJob.STATUS_PENDING
+        job.last_error = error
+        job.run_after = timezone.now() + timedelta(seconds=conf['RETRY_DELAY'] * 2 ** (job.attempts - 1))
+    else:
+        job.status = ImageJob.STATUS_FAILED
+        job.last_error = error
+        logger.error("Image job %s failed permanently: %s", job.pk, error)
+    job.save(update_fields=['status', 'attempts', 'last_error', 'result', 'run_after', 'updated_at'])
+
+
+def process_jobs(jobs, pool=None):
+    """Run the given (claimed) jobs, in ``pool`` if given, else inline"""
+    jobs = list(jobs)
+    by_id = {job.pk: job for job in jobs}
+    media_root = str(settings.MEDIA_ROOT)
+    args = [(job.pk, job.kind, job.path, job.max_width, job.max_height, media_root) for job in jobs]
+    if pool is None:
+        results = [_run_job(*a) for a in args]
+    else:
+        results = pool.map(_run_job, *zip(*args)) if args else []
+    done = 0
+    for job_id, resized, error in results:
+        job = by_id[job_id]
+        if resized:
+            try:
+                _store_resized(job, resized)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        _finish(job, bool(resized), error)
+        done += error is None
+    return done
+
+
+def run_worker_batch(batch_size=20, pool=None):
+    """Claim one batch of due jobs and process it; returns (claimed, succeeded)"""
+    jobs = claim_jobs(batch_size)
+    if not jobs:
+        return 0, 0
+    return len(jobs), process_jobs(jobs, pool)
@@ -0,0 +1,195 @@
+"""Bulk photo ingestion for gallery uploads.
+
+The bulk upload admin view streams uploads to temporary files on disk
+(``BulkImageUploadAdmin.add_view``); anything else is spooled to one first.
+Each file is validated, shrunk and given its renditions in a thread pool;
+Pillow releases the GIL while decoding, resizing and encoding, so threads
+scale across cores without forking the web worker. Finished files are moved
+into storage and all Gallery rows are created with one ``bulk_create``.
+A broken file is reported back and does not abort the rest of the batch.
+Whole albums can also be uploaded as one ZIP, see ``ingest_archive``.
+"""
+import io
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, UnidentifiedImageError
+
+from .imagejobs import encode_options, resize_image_file
+from .renditions import generate_renditions
+
+GALLERY_MAX_SIZE = (1200, 1200)
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+
+
+def get_ingest_workers():
+    return getattr(settings, 'GALLERY_INGEST_WORKERS', min(4, os.cpu_count() or 1))
+
+
+def _disk_path(upload):
+    """Path of the upload on disk; in-memory uploads are spooled to a temp file"""
+    if hasattr(upload, 'temporary_file_path'):
+        return upload.temporary_file_path(), False
+    _, ext = os.path.splitext(upload.name)
+    fd, path = tempfile.mkstemp(suffix='.upload' + ext, dir=settings.FILE_UPLOAD_TEMP_DIR)
+    with os.fdopen(fd, 'wb') as out:
+        for chunk in upload.chunks():
+            out.write(chunk)
+    return path, True
+
+
+def process_upload(path, max_size=GALLERY_MAX_SIZE):
+    """Validate, shrink and render one image file in place. Raises on invalid images."""
+    with Image.open(path) as img:
+        img.verify()
+    resize_image_file(path, *max_size)
+    generate_renditions(path)
+
+
+def _process(item):
+    index, path = item
+    try:
+        process_upload(path)
+        return index, None
+    except UnidentifiedImageError:
+        return index, "soubor není platný obrázek"
+    except Exception as e:
+        return index, f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+
+def _gallery_field():
+    from .models import Gallery
+    return Gallery._meta.get_field('image')
+
+
+def _target_name(filename):
+    return _gallery_field().generate_filename(None, os.path.basename(filename))
+
+
+def create_galleries(stored, album=None, event=None, title_prefix="Fotka"):
+    """Create Gallery rows for already stored files in one transaction.
+
+    ``stored`` is a list of ``(number, storage name)``; the files are released again on failure.
+    """
+    from .models import Gallery, refresh_album_stats
+
+    galleries = [
+        Gallery(title=f"{title_prefix} {number}", image=name, album=album, event=event)
+        for number, name in stored
+    ]
+    try:
+        with transaction.atomic():
+            Gallery.objects.bulk_create(galleries, batch_size=200)
+            refresh_album_stats([album.pk] if album else [])  # bulk_create sends no signals
+    except Exception:
+        storage = _gallery_field().storage
+        for _, name in stored:
+            storage.delete(name)
+        raise
+    return galleries
+
+
+def ingest_images(uploads, album=None, event=None, title_prefix="Fotka", workers=None):
+    """Create Gallery rows for ``uploads``; returns ``(galleries, failures)``.
+
+    ``failures`` is a list of ``(filename, error)`` for files that were skipped.
+    """
+    uploads = [u for u in uploads if u]
+    workers = workers or get_ingest_workers()
+    paths, spooled = [], []
+    for upload in uploads:
+        path, is_copy = _disk_path(upload)
+        paths.append(path)
+        if is_copy:
+            spooled.append(path)
+
+    try:
+        items = list(enumerate(paths))
+        if workers > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_process, items))
+        else:
+            results = [_process(item) for item in items]
+
+        failures, stored = [], []
+        storage = _gallery_field().storage
+        for index, error in results:
+            upload = uploads[index]
+            if error:
+                failures.append((upload.name, error))
+                continue
+            target = _target_name(upload.name)
+            if paths[index] in spooled:
+                with open(paths[index], 'rb') as f:
+                    name = storage.save(target, File(f))
+            else:
+                name = storage.save(target, upload)  # moves the temporary file
+            stored.append((index + 1, name))
+
+        return create_galleries(stored, album, event, title_prefix), failures
+    finally:
+        for path in spooled:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _store_entry(zf, info, storage, max_size=GALLERY_MAX_SIZE):
+    """Validate one archive entry and store it, shrunk to ``max_size`` if larger (keeping EXIF and ICC)"""
+    with zf.open(info) as fh, Image.open(fh) as img:
+        fmt, size = img.format, img.size
+        img.verify()
+    target = _target_name(info.filename)
+    if size[0] <= max_size[0] and size[1] <= max_size[1]:
+        with zf.open(info) as fh:
+            return storage.save(target, File(fh, name=target))  # streamed, never fully in memory
+    with zf.open(info) as fh, Image.open(fh) as img:
+        if fmt == 'JPEG':
+            img.draft('RGB', max_size)
+        options = encode_options(img, fmt)
+        img.thumbnail(max_size, Image.LANCZOS, reducing_gap=3.0)
+        buf = io.BytesIO()
+        img.save(buf, format=fmt, **options)
+    return storage.save(target, ContentFile(buf.getvalue(), name=target))
+
+
+def ingest_archive(archive, album=None, event=None, title_prefix="Fotka", first_number=1):
+    """Create Gallery rows from the images in a ZIP upload; returns ``(galleries, failures)``.
+
+    The archive is read entry by entry straight from the uploaded (spooled) file,
+    so memory stays bounded by one decoded photo whatever the archive size. Entries
+    that are not images are skipped and listed in ``failures`` like broken ones.
+    """
+    from .imagejobs import enqueue_renditions
+
+    storage = _gallery_field().storage
+    stored, failures = [], []
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            basename = os.path.basename(info.filename)
+            if info.is_dir() or not basename or basename.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            if os.path.splitext(basename)[1].lower() not in IMAGE_EXTENSIONS:
+                failures.append((info.filename, "přeskočeno, není obrázek"))
+                continue
+            try:
+                name = _store_entry(zf, info, storage)
+            except UnidentifiedImageError:
+                failures.append((info.filename, "soubor není platný obrázek"))
+                continue
+            except Exception as e:
+                failures.append((info.filename, f"{type(e).__name__}: {e}"))
+                continue
+            stored.append((first_number + len(stored), name))
+
+    galleries = create_galleries(stored, album, event, title_prefix)
+    for gallery in galleries:
+        enqueue_renditions(gallery, 'image')
+    return galleries, failures
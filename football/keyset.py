@@ -0,0 +1,68 @@
+"""Keyset (cursor) pagination.
+
+Instead of ``OFFSET n`` plus ``COUNT(*)`` a page is fetched with
+``WHERE (key, id) < (last key, last id) ORDER BY key DESC, id DESC LIMIT n + 1``,
+so every page costs the same index range scan however deep the visitor
+goes, and a "load more" link keeps pointing at the same rows when new
+ones are added at the top. The cursor is the ``(key, id)`` pair of the last
+row shown, encoded into an opaque URL-safe token.
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class KeysetPage:
+    """Rows of one page and the cursor of the next one (None on the last page)"""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """``(datetime, pk)`` from a token, or None for a missing or malformed one"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = json.loads(raw)
+        value = parse_datetime(value)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if value is None or not isinstance(pk, int):
+        return None
+    return value, pk
+
+
+def keyset_page(queryset, field, cursor, per_page, descending=True):
+    """
+    One page of ``queryset`` ordered by ``(field, pk)`` starting after ``cursor`` (a token or None).
+
+    Needs an index on ``(field, id)`` (plus any equality filters in front) to stay constant-time.
+    """
+    after = decode_cursor(cursor)
+    op = 'lt' if descending else 'gt'
+    if after:
+        value, pk = after
+        queryset = queryset.filter(Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'pk__{op}': pk}))
+    prefix = '-' if descending else ''
+    rows = list(queryset.order_by(f'{prefix}{field}', f'{prefix}pk')[:per_page + 1])
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(items, next_cursor)
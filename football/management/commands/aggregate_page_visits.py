@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from football.rollups import aggregate_visits
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold new PageVisit rows into the hourly and daily rollup tables.\n"
+        "Only rows above the stored high-water mark are processed; run it from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute the rollups of every day that still has raw rows (older days are kept)")
+
+    def handle(self, *args, **opts):
+        result = aggregate_visits(rebuild=opts["rebuild"])
+        if result["from_id"] == result["to_id"]:
+            self.stdout.write("No new page visits to aggregate.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Aggregated visits {result['from_id'] + 1}..{result['to_id']}: "
+            f"{result['hourly']} hourly and {result['daily']} daily buckets updated."
+        ))
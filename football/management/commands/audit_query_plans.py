@@ -0,0 +1,124 @@
+import logging
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from football import urls as football_urls
+
+
+# Views with side effects outside the database (external API, large downloads)
+SKIP_VIEWS = {"google_calendar", "gallery_download"}
+# Single-row configuration and small lookup tables that may be scanned
+SMALL_TABLES = {
+    "football_clubinfo", "football_mainpage", "football_googlecalendarsettings",
+    "football_league", "football_team", "football_player", "football_management",
+    "django_session",
+}
+SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+NO_CACHE = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    "PAGE_CACHE": {"ENABLED": False},
+}
+VISIT_MIDDLEWARE = "football.middleware.PageVisitMiddleware"
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every public view (with caching and visit tracking disabled, inside a transaction "
+        "that is rolled back), run EXPLAIN QUERY PLAN on each query it issues and flag full-table "
+        "scans and sorts that no index serves. "
+        "Exits with an error when something is flagged and --fail is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fail", action="store_true", help="Exit with an error if any scan is flagged")
+        parser.add_argument("--sorts", action="store_true", help="Also flag ORDER BY/GROUP BY that use a temp b-tree")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print the plan of every query")
+        parser.add_argument("--allow", action="append", default=[], help="Extra table allowed to be scanned")
+
+    def _sample_kwargs(self, pattern):
+        """URL kwargs for a pattern, using the first row of the view's model for <int:pk>"""
+        if not pattern.pattern.converters:
+            return {}
+        model = getattr(getattr(pattern.callback, "view_class", None), "model", None)
+        if set(pattern.pattern.converters) != {"pk"} or model is None:
+            return None
+        pk = model._default_manager.values_list("pk", flat=True).first()
+        return None if pk is None else {"pk": pk}
+
+    def _urls(self):
+        urls = []
+        for pattern in football_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or pattern.name in SKIP_VIEWS:
+                continue
+            kwargs = self._sample_kwargs(pattern)
+            if kwargs is None:
+                self.stdout.write(f"skip {pattern.name}: no sample row for {pattern.pattern}")
+                continue
+            urls.append((pattern.name, reverse(pattern.name, kwargs=kwargs)))
+        return urls
+
+    def _plan(self, cursor, sql):
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+    def _problems(self, plan, allowed, sorts):
+        problems = []
+        for step in plan:
+            match = SCAN.match(step)
+            if match and match.group(1) not in allowed:
+                problems.append(step)
+            elif sorts and step.startswith("USE TEMP B-TREE"):
+                problems.append(step)
+        return problems
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("EXPLAIN QUERY PLAN is SQLite syntax; run the audit against a SQLite database")
+        allowed = SMALL_TABLES | set(opts["allow"])
+        # The audit must not record visits or leave anything the views write behind
+        middleware = [m for m in settings.MIDDLEWARE if m != VISIT_MIDDLEWARE]
+
+        # Failing views are reported by status code instead of a logged traceback
+        request_logger = logging.getLogger("django.request")
+        request_logger.disabled = True
+        try:
+            with override_settings(MIDDLEWARE=middleware, **NO_CACHE), transaction.atomic():
+                try:
+                    self._audit(Client(raise_request_exception=False), allowed, opts)
+                finally:
+                    transaction.set_rollback(True)
+        finally:
+            request_logger.disabled = False
+
+    def _audit(self, client, allowed, opts):
+        flagged = total = errors = 0
+        for name, url in self._urls():
+            with CaptureQueriesContext(connection) as captured:
+                status = client.get(url).status_code
+            queries = [q["sql"] for q in captured.captured_queries if q["sql"].lstrip().upper().startswith("SELECT")]
+            self.stdout.write(f"{name} {url} -> {status}, {len(queries)} queries")
+            if status >= 500:
+                errors += 1
+                self.stdout.write(self.style.ERROR("  view failed; only the queries before the error were audited"))
+            with connection.cursor() as cursor:
+                for sql in queries:
+                    total += 1
+                    plan = self._plan(cursor, sql)
+                    problems = self._problems(plan, allowed, opts["sorts"])
+                    if problems:
+                        flagged += 1
+                        self.stdout.write(self.style.WARNING(f"  {'; '.join(problems)}"))
+                        self.stdout.write(f"    {sql[:300]}")
+                    if opts["verbose_plans"]:
+                        self.stdout.write("    " + "\n    ".join(plan))
+
+        summary = f"{flagged} of {total} queries flagged, {errors} views failed"
+        if (flagged or errors) and opts["fail"]:
+            raise CommandError(summary)
+        self.stdout.write(self.style.WARNING(summary) if flagged or errors else self.style.SUCCESS(summary))
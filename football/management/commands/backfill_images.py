@@ -0,0 +1,189 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from football.imagejobs import recompress_image_file, replace_stored_file
+from football.models import ImageBackfillCheckpoint
+from football.renditions import generate_renditions
+from football.storage import image_fields
+
+# Same boxes as the model save() methods; None = recompress only
+FIELD_BOXES = {
+    "football.Team.flag": (100, 100),
+    "football.Player.photo": (300, 300),
+    "football.Management.photo": (300, 300),
+    "football.News.image": (800, 800),
+    "football.Gallery.image": (1200, 1200),
+    "football.GalleryAlbum.cover_image": (1200, 1200),
+    "football.ClubInfo.logo": None,
+}
+CKEDITOR_SOURCE = "ckeditor"
+CKEDITOR_BOX = (1600, 1600)
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def _process(path, max_size, quality, min_saving, dry_run, renditions, media_root, in_place):
+    """``(path, bytes before, bytes after, rewritten copy or None, error)``
+
+    Content-addressed files are never rewritten in place; their new version is
+    written next to them and stored by the parent process.
+    """
+    root, ext = os.path.splitext(path)
+    dest = None if in_place else f"{root}.recompressed{ext}"
+    try:
+        before, after = recompress_image_file(path, max_size, quality, min_saving, dry_run, dest)
+        rewritten = dest if dest and os.path.exists(dest) else None
+        if renditions and not dry_run:
+            generate_renditions(rewritten or path, media_root)
+        return path, before, after, rewritten, None
+    except FileNotFoundError:
+        return path, 0, 0, None, None
+    except Exception as e:
+        if dest and os.path.exists(dest):
+            os.remove(dest)
+        return path, 0, 0, None, f"{type(e).__name__}: {e}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Shrink, recompress and generate renditions for every already uploaded image (all ImageFields "
+        "plus the CKEditor upload directory) in a process pool. Progress is checkpointed per source, "
+        "so an interrupted run continues where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (1 = no pool)")
+        parser.add_argument("--batch-size", type=int, default=50, help="Files per checkpoint (default 50)")
+        parser.add_argument("--quality", type=int, default=85, help="JPEG/WebP quality when re-encoding (default 85)")
+        parser.add_argument("--min-saving", type=float, default=0.1,
+                            help="Minimum relative saving to rewrite a file that needs no resize (default 0.1)")
+        parser.add_argument("--no-renditions", action="store_true", help="Skip rendition generation")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Estimate the bytes saved without writing files or checkpoints")
+        parser.add_argument("--restart", action="store_true", help="Forget checkpoints and start from scratch")
+        parser.add_argument("--source", action="append", help="Limit to a source, e.g. football.Gallery.image or ckeditor")
+
+    def _sources(self, only):
+        sources = [(f"{model._meta.label}.{field.name}", model, field) for model, field in image_fields()]
+        sources.append((CKEDITOR_SOURCE, None, None))
+        if only:
+            unknown = set(only) - {name for name, _, _ in sources}
+            if unknown:
+                raise CommandError(f"Unknown source(s): {', '.join(sorted(unknown))}")
+            sources = [s for s in sources if s[0] in only]
+        return sources
+
+    def _model_items(self, model, field, checkpoint):
+        rows = (
+            model._default_manager.filter(pk__gt=checkpoint.last_id)
+            .exclude(**{field.attname: ""}).exclude(**{f"{field.attname}__isnull": True})
+            .order_by("pk").values_list("pk", field.attname)
+        )
+        for pk, name in rows.iterator(chunk_size=500):
+            yield pk, field.storage.path(name)
+
+    def _ckeditor_items(self, checkpoint):
+        root = os.path.join(settings.MEDIA_ROOT, getattr(settings, "CKEDITOR_5_UPLOAD_PATH", "uploads/"))
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, root)
+                if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS and key > checkpoint.last_key:
+                    yield key, path
+
+    def _batches(self, items, size):
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def handle(self, *args, **opts):
+        dry_run = opts["dry_run"]
+        workers = max(1, opts["workers"])
+        media_root = str(settings.MEDIA_ROOT)
+        renditions = not opts["no_renditions"]
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        totals = {"files": 0, "rewritten": 0, "before": 0, "after": 0, "errors": 0}
+        try:
+            for name, model, field in self._sources(opts["source"]):
+                if dry_run:
+                    checkpoint = ImageBackfillCheckpoint(source=name)  # estimate the whole source, write nothing
+                else:
+                    checkpoint, _ = ImageBackfillCheckpoint.objects.get_or_create(source=name)
+                    if opts["restart"]:
+                        checkpoint.last_id, checkpoint.last_key = 0, ""
+                        checkpoint.save()
+                if model is None:
+                    items, box = self._ckeditor_items(checkpoint), CKEDITOR_BOX
+                else:
+                    items, box = self._model_items(model, field, checkpoint), FIELD_BOXES.get(name)
+
+                done = saved = 0
+                seen = set()
+                failed = None  # first item that failed; the checkpoint stays in front of it
+                for batch in self._batches(items, opts["batch_size"]):
+                    # Rows sharing a deduplicated file are processed once
+                    paths = [path for _, path in batch if not (path in seen or seen.add(path))]
+                    args = [(p, box, opts["quality"], opts["min_saving"], dry_run, renditions, media_root, model is None)
+                            for p in paths]
+                    results = pool.map(_process, *zip(*args)) if pool and args else [_process(*a) for a in args]
+                    errors = set()
+                    for path, before, after, rewritten, error in results:
+                        if rewritten and not error:
+                            old_name = os.path.relpath(path, field.storage.location).replace(os.sep, "/")
+                            try:
+                                replace_stored_file(model, field, old_name, rewritten)
+                            except Exception as e:
+                                error = f"{type(e).__name__}: {e}"
+                        if error:
+                            errors.add(path)
+                            totals["errors"] += 1
+                            self.stderr.write(f"{path}: {error}")
+                            continue
+                        totals["files"] += 1
+                        totals["before"] += before
+                        totals["after"] += after
+                        totals["rewritten"] += after != before
+                        saved += before - after
+                    done += len(batch)
+                    if dry_run or failed is not None:
+                        continue
+                    # Only advance over items that succeeded, so failed files are retried next run
+                    last_key = None
+                    for key, path in batch:
+                        if path in errors:
+                            failed = key
+                            break
+                        last_key = key
+                    if last_key is not None:
+                        if model is None:
+                            checkpoint.last_key = last_key
+                        else:
+                            checkpoint.last_id = last_key
+                        checkpoint.save(update_fields=["last_id", "last_key", "updated_at"])
+                if done:
+                    self.stdout.write(f"{name}: {done} files, {saved / 1024 / 1024:.1f} MB saved")
+                if failed is not None:
+                    self.stdout.write(self.style.WARNING(
+                        f"{name}: checkpoint kept before {failed}, which failed; the next run retries from there"
+                    ))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Interrupted; run again to resume from the last checkpoint"))
+        finally:
+            if pool:
+                pool.shutdown()
+
+        prefix = "[dry run] estimated: " if dry_run else ""
+        saved = totals["before"] - totals["after"]
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{totals['files']} files, {totals['rewritten']} rewritten, {totals['errors']} errors, "
+            f"{totals['before'] / 1024 / 1024:.1f} MB -> {totals['after'] / 1024 / 1024:.1f} MB "
+            f"({saved / 1024 / 1024:.1f} MB saved)"
+        ))
@@ -0,0 +1,116 @@
+import io
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from PIL import Image, ImageDraw
+
+from football.ingest import ingest_images
+from football.models import Gallery, GalleryAlbum
+from football.renditions import generate_renditions
+
+
+class Rollback(Exception):
+    pass
+
+
+def synthetic_jpeg(rng, width, height):
+    img = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.ellipse((x, y, x + rng.randrange(50, 600), y + rng.randrange(50, 600)),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def as_upload(name, data):
+    """The file as the temporary-file upload handler of the bulk upload view delivers it"""
+    upload = TemporaryUploadedFile(name, "image/jpeg", len(data), None)
+    upload.write(data)
+    upload.seek(0)
+    return upload
+
+
+def as_default_upload(name, data):
+    """The file as Django's default upload handlers deliver it (in memory up to FILE_UPLOAD_MAX_MEMORY_SIZE)"""
+    if len(data) > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        return as_upload(name, data)
+    return InMemoryUploadedFile(io.BytesIO(data), "images", name, "image/jpeg", len(data), None)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the previous bulk upload (default upload handlers, one Gallery.save() per file, renditions "
+        "left to the image job worker) with the parallel bulk ingestion pipeline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", type=int, default=100, help="Synthetic images per run (default 100)")
+        parser.add_argument("--workers", type=int, default=4, help="Ingestion worker threads (default 4)")
+        parser.add_argument("--size", default="2400x1600", help="Source image size WxH (default 2400x1600)")
+
+    def _legacy(self, album, payloads):
+        """The form before parallel ingestion; returns the seconds the request itself took"""
+        start = time.perf_counter()
+        galleries = []
+        with override_settings(IMAGE_JOBS={"SYNC": False}):
+            for i, (name, data) in enumerate(payloads, 1):
+                upload = as_default_upload(name, data)
+                gallery = Gallery(title=f"Bench {i}", image=upload, album=album)
+                gallery.save()
+                galleries.append(gallery)
+                upload.close()
+        request = time.perf_counter() - start
+        # What the queued renditions jobs then do in the worker (their on_commit never fires here)
+        for gallery in galleries:
+            generate_renditions(gallery.image.path)
+        return request
+
+    def _parallel(self, album, payloads, workers):
+        uploads = [as_upload(name, data) for name, data in payloads]
+        galleries, failures = ingest_images(uploads, album=album, title_prefix="Bench", workers=workers)
+        for upload in uploads:
+            upload.close()  # as the request does once the response is sent
+        return len(galleries), failures
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        result = None
+        try:
+            with transaction.atomic():
+                album = GalleryAlbum.objects.create(title="__bench__")
+                result = fn(album, *args)
+                raise Rollback
+        except Rollback:
+            pass
+        return time.perf_counter() - start, result
+
+    def handle(self, *args, **opts):
+        width, height = (int(v) for v in opts["size"].lower().split("x"))
+        rng = random.Random(1)
+        self.stdout.write(f"Generating {opts['images']} synthetic {width}x{height} JPEGs...")
+        payloads = [(f"bench_{i}.jpg", synthetic_jpeg(rng, width, height)) for i in range(opts["images"])]
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            legacy, legacy_request = self._timed(self._legacy, payloads)
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            parallel, (created, failures) = self._timed(self._parallel, payloads, opts["workers"])
+
+        count = len(payloads)
+        self.stdout.write(
+            f"Sequential save loop: {legacy:8.2f}s ({count / legacy:6.1f} images/s, "
+            f"{legacy_request:.2f}s in the request, the rest in the job worker)"
+        )
+        self.stdout.write(
+            f"Parallel ingestion:   {parallel:8.2f}s ({count / parallel:6.1f} images/s, "
+            f"{opts['workers']} workers, {created} created, {len(failures)} failed)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {legacy / parallel:.1f}x"))
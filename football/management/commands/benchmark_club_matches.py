@@ -0,0 +1,108 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from football.models import League, Match, Team, refresh_club_matches
+
+
+BENCH_PREFIX = "__bench__"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare club-match queries that OR across the two team joins with queries on the "
+        "denormalized Match.involves_club flag, on a synthetic match table. Prints the query "
+        "plans and timings; everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--matches", type=int, default=100_000, help="Synthetic matches (default 100000)")
+        parser.add_argument("--teams", type=int, default=200, help="Synthetic teams, one of them the club (default 200)")
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query (default 20)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _seed(self, count, team_count, seed):
+        rng = random.Random(seed)
+        league = League.objects.create(name=f"{BENCH_PREFIX} league", season="2000/2001")
+        teams = Team.objects.bulk_create(
+            Team(name=f"{BENCH_PREFIX} team {i}", league=league) for i in range(team_count)
+        )
+        now = timezone.now()
+        batch = []
+        for _ in range(count):
+            home, away = rng.sample(teams, 2)
+            played = rng.random() < 0.8
+            batch.append(Match(
+                home_team=home, away_team=away, league=league,
+                date=now + timedelta(minutes=rng.randrange(-5 * 365 * 1440, 365 * 1440)),
+                home_score=rng.randrange(6) if played else None,
+                away_score=rng.randrange(6) if played else None,
+            ))
+            if len(batch) >= 5000:
+                Match.objects.bulk_create(batch)
+                batch = []
+        Match.objects.bulk_create(batch)
+
+        club = teams[0]
+        club.is_club_team = True
+        start = time.perf_counter()
+        club.save()  # the post_save signal refreshes involves_club of the club's matches
+        flag_time = time.perf_counter() - start
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        return flag_time
+
+    def _time(self, qs, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(qs)
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **opts):
+        repeat = opts["repeat"]
+        joined = Match.objects.filter(Q(home_team__is_club_team=True) | Q(away_team__is_club_team=True))
+        flagged = Match.objects.filter(involves_club=True)
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            flag_time = self._seed(opts["matches"], opts["teams"], opts["seed"])
+            self.stdout.write(
+                f"Seeded {opts['matches']} matches in {time.perf_counter() - start:.1f}s; "
+                f"flagging the club team's matches took {flag_time * 1000:.1f} ms"
+            )
+            now = timezone.now()
+            queries = {
+                "upcoming page": lambda base: base.filter(date__gte=now).order_by("date", "pk")[:21],
+                "recent page": lambda base: (
+                    base.filter(date__lt=now, home_score__isnull=False).order_by("-date", "-pk")[:21]
+                ),
+                "club match count": lambda base: base.values("pk"),
+            }
+            expected = joined.count()
+            self.stdout.write(f"Club matches: {expected} (flag agrees: {flagged.count() == expected})")
+
+            for name, build in queries.items():
+                self.stdout.write(f"\n== {name}")
+                times = {}
+                for label, base in (("OR across team joins", joined), ("involves_club flag", flagged)):
+                    qs = build(base)
+                    self.stdout.write(f"-- {label}\n{qs.explain()}")
+                    times[label] = self._time(qs, repeat)
+                for label, ms in times.items():
+                    self.stdout.write(f"{label:<22} {ms:9.2f} ms")
+                before, after = times.values()
+                if after:
+                    self.stdout.write(self.style.SUCCESS(f"Speedup: {before / after:.1f}x"))
+
+            refresh_start = time.perf_counter()
+            refresh_club_matches()
+            self.stdout.write(
+                f"\nFull refresh_club_matches() over the table: {(time.perf_counter() - refresh_start) * 1000:.1f} ms"
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,228 @@
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import tempfile
+import time
+from queue import Empty
+
+import PIL
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageDraw, ImageFilter
+
+from football.renditions import generate_renditions
+
+# name -> (width, height, format, save options); sizes match what volunteers actually upload
+SCENARIOS = {
+    "phone_jpeg": (4032, 3024, "JPEG", {"quality": 90}),
+    "logo_png": (1024, 1024, "PNG", {}),
+    "panorama_jpeg": (12000, 3000, "JPEG", {"quality": 88}),
+}
+# Boxes used by the model save paths: Gallery/ingest, Player/Management photo, Team flag
+BOXES = {"gallery": (1200, 1200), "photo": (300, 300), "flag": (100, 100)}
+
+
+def synthetic_image(name, seed=1):
+    width, height, fmt, options = SCENARIOS[name]
+    rng = random.Random(seed)
+    if fmt == "PNG":
+        # Flat colours and transparency, like a club crest
+        img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        for _ in range(12):
+            x, y = rng.randrange(width), rng.randrange(height)
+            r = rng.randrange(width // 10, width // 3)
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)) + (255,))
+    else:
+        # Smooth gradient plus shapes and sensor-like noise, so JPEG sizes are realistic
+        img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+        draw = ImageDraw.Draw(img)
+        for _ in range(60):
+            x, y = rng.randrange(width), rng.randrange(height)
+            draw.rectangle((x, y, x + rng.randrange(20, width // 4), y + rng.randrange(20, height // 4)),
+                           fill=tuple(rng.randrange(256) for _ in range(3)))
+        img = img.filter(ImageFilter.GaussianBlur(2))
+        noise = Image.effect_noise((width, height), 24).convert("RGB")
+        img = Image.blend(img, noise, 0.08)
+    buf = io.BytesIO()
+    img.save(buf, fmt, **options)
+    return buf.getvalue()
+
+
+def _encode(img, fmt):
+    buf = io.BytesIO()
+    img.save(buf, format=fmt)
+    return buf.tell()
+
+
+def current_thumbnail(path, box):
+    """What the model save() methods and resize_image_file do today"""
+    with Image.open(path) as img:
+        fmt = img.format
+        img.thumbnail(box)
+        return _encode(img, fmt)
+
+
+def full_decode_thumbnail(path, box):
+    """thumbnail() without draft or reducing gap: full decode, one resample"""
+    with Image.open(path) as img:
+        fmt = img.format
+        img.load()
+        img.thumbnail(box, reducing_gap=None)
+        return _encode(img, fmt)
+
+
+def draft_lanczos(path, box):
+    """JPEG draft (DCT scaling) to the nearest power-of-two size, then Lanczos with a reducing gap"""
+    with Image.open(path) as img:
+        fmt = img.format
+        if fmt == "JPEG":
+            img.draft("RGB", box)
+        img.thumbnail(box, Image.LANCZOS, reducing_gap=3.0)
+        return _encode(img, fmt)
+
+
+def reducing_gap_lanczos(path, box):
+    """Lanczos with a reducing gap but no JPEG draft"""
+    with Image.open(path) as img:
+        fmt = img.format
+        img.load()
+        img.thumbnail(box, Image.LANCZOS, reducing_gap=3.0)
+        return _encode(img, fmt)
+
+
+def renditions(path, box):
+    """The full rendition set written by the image job worker (box is ignored)"""
+    out = tempfile.mkdtemp(prefix="bench-renditions-")
+    try:
+        generate_renditions(path, out)
+        return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(out) for f in files)
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+
+VARIANTS = {
+    "current_thumbnail": current_thumbnail,
+    "full_decode_thumbnail": full_decode_thumbnail,
+    "draft_lanczos": draft_lanczos,
+    "reducing_gap_lanczos": reducing_gap_lanczos,
+    "renditions": renditions,
+}
+
+
+def _max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure(queue, variant, path, box, iterations):
+    # Runs in a fresh forked process so peak RSS belongs to this variant alone
+    try:
+        fn = VARIANTS[variant]
+        baseline = _max_rss_kb()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            output_bytes = fn(path, box)
+        elapsed = time.perf_counter() - start
+        queue.put({
+            "seconds": round(elapsed, 4),
+            "ops_per_sec": round(iterations / elapsed, 3) if elapsed else None,
+            "peak_rss_kb": _max_rss_kb() - baseline,
+            "output_bytes": output_bytes,
+        })
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark Pillow decode/resize/encode paths on synthetic images and print the results as JSON "
+        "(ops/s, peak RSS, output bytes) for comparison between releases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=3, help="Runs per measurement (default 3)")
+        parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+        parser.add_argument("--boxes", nargs="+", choices=list(BOXES), default=list(BOXES))
+        parser.add_argument("--timeout", type=float, default=600,
+                            help="Seconds to wait for one measurement before giving up (default 600)")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+
+    def _collect(self, queue, proc, timeout):
+        """The worker's measurement, or an error row if it died (e.g. killed for memory) or hung"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return queue.get(timeout=1)
+            except Empty:
+                if not proc.is_alive():
+                    # It may have put its result just before exiting
+                    try:
+                        return queue.get(timeout=1)
+                    except Empty:
+                        return {"error": f"worker died with exit code {proc.exitcode}"}
+                if time.monotonic() > deadline:
+                    proc.terminate()
+                    return {"error": f"no result within {timeout:g} s"}
+
+    def handle(self, *args, **opts):
+        if opts["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        ctx = multiprocessing.get_context("fork")
+        results = []
+        workdir = tempfile.mkdtemp(prefix="bench-images-")
+        try:
+            for scenario in opts["scenarios"]:
+                data = synthetic_image(scenario)
+                width, height, fmt, _ = SCENARIOS[scenario]
+                path = os.path.join(workdir, f"{scenario}.{fmt.lower()}")
+                with open(path, "wb") as f:
+                    f.write(data)
+                del data
+                for variant in opts["variants"]:
+                    # Renditions do not depend on the box; measure them once per scenario
+                    boxes = opts["boxes"][:1] if variant == "renditions" else opts["boxes"]
+                    for box_name in boxes:
+                        queue = ctx.Queue()
+                        proc = ctx.Process(
+                            target=_measure, args=(queue, variant, path, BOXES[box_name], opts["iterations"])
+                        )
+                        proc.start()
+                        measurement = self._collect(queue, proc, opts["timeout"])
+                        proc.join()
+                        row = {
+                            "scenario": scenario,
+                            "source": {"width": width, "height": height, "format": fmt,
+                                       "bytes": os.path.getsize(path)},
+                            "variant": variant,
+                            "box": None if variant == "renditions" else box_name,
+                            "iterations": opts["iterations"],
+                            **measurement,
+                        }
+                        results.append(row)
+                        self.stderr.write(
+                            f"{scenario:14} {variant:22} {row['box'] or '-':8} "
+                            + (f"{row['ops_per_sec']:8.2f} ops/s {row['peak_rss_kb'] / 1024:8.1f} MB "
+                               f"{row['output_bytes']:>10} B" if "error" not in row else row["error"])
+                        )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }
+        payload = json.dumps(report, indent=2)
+        if opts["output"]:
+            with open(opts["output"], "w") as f:
+                f.write(payload + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} measurements to {opts['output']}"))
+        else:
+            self.stdout.write(payload)
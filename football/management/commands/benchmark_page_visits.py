@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from football.middleware import PageVisitMiddleware
+from football.models import PageVisit, PageVisitSketch
+from football.visits import get_buffer_settings, reset_visit_buffer
+
+
+BENCH_PREFIX = "__bench__"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/s of PageVisitMiddleware with one INSERT per request "
+        "against the buffered bulk_create recorder. Benchmark rows are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per run (default 2000)")
+        parser.add_argument("--flush-size", type=int, default=None, help="Override PAGE_VISIT_BUFFER FLUSH_SIZE")
+
+    def _run(self, count, buffered, flush_size):
+        conf = get_buffer_settings()
+        conf.update({'ENABLED': buffered, 'FLUSH_INTERVAL': 0})
+        if flush_size:
+            conf['FLUSH_SIZE'] = flush_size
+            conf['MAX_SIZE'] = max(conf['MAX_SIZE'], flush_size)
+
+        factory = RequestFactory()
+        requests = [
+            factory.get(f"/{BENCH_PREFIX}/page-{i % 10}/", HTTP_USER_AGENT="Mozilla/5.0 (benchmark)")
+            for i in range(count)
+        ]
+        with override_settings(PAGE_VISIT_BUFFER=conf):
+            reset_visit_buffer()
+            middleware = PageVisitMiddleware(lambda request: HttpResponse())
+            start = time.perf_counter()
+            for request in requests:
+                middleware(request)
+            reset_visit_buffer(flush=True)  # final flush is part of the cost
+            elapsed = time.perf_counter() - start
+        return count / elapsed if elapsed else 0.0, elapsed
+
+    def handle(self, *args, **opts):
+        count = opts["requests"]
+        flush_size = opts["flush_size"]
+        try:
+            sync_rps, sync_time = self._run(count, False, flush_size)
+            buffered_rps, buffered_time = self._run(count, True, flush_size)
+            stored = PageVisit.objects.filter(page_name__startswith=BENCH_PREFIX).count()
+        finally:
+            PageVisit.objects.filter(page_name__startswith=BENCH_PREFIX).delete()
+            PageVisitSketch.objects.filter(page_name__startswith=BENCH_PREFIX).delete()
+
+        self.stdout.write(f"Requests per run: {count}")
+        self.stdout.write(f"One INSERT per request: {sync_rps:10.1f} req/s ({sync_time:.3f}s)")
+        self.stdout.write(f"Buffered bulk_create:   {buffered_rps:10.1f} req/s ({buffered_time:.3f}s)")
+        self.stdout.write(f"Rows stored: {stored} (expected {count * 2})")
+        if sync_rps:
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {buffered_rps / sync_rps:.1f}x"))
@@ -0,0 +1,55 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from football.useragents import CACHE_SIZE, classify_user_agent
+
+
+TEMPLATES = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{v}.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_{v} like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; SM-S91{v}B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_{v}) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+    "Mozilla/5.0 (compatible; Googlebot/2.{v}; +http://www.google.com/bot.html)",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:12{v}.0) Gecko/20100101 Firefox/12{v}.0",
+]
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark of classify_user_agent throughput with a cold and a warm LRU cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=200000, help="Classifications per run (default 200000)")
+        parser.add_argument("--distinct", type=int, default=500, help="Distinct User-Agent strings for the warm run (default 500)")
+
+    def _timed(self, values):
+        start = time.perf_counter()
+        for ua in values:
+            classify_user_agent(ua)
+        elapsed = time.perf_counter() - start
+        return len(values) / elapsed if elapsed else 0.0
+
+    def handle(self, *args, **opts):
+        calls = opts["calls"]
+        distinct = min(opts["distinct"], CACHE_SIZE)
+        rng = random.Random(1)
+
+        # Cold: every string is new, so each call runs the full token scan
+        cold = [rng.choice(TEMPLATES).format(v=i) for i in range(calls)]
+        classify_user_agent.cache_clear()
+        cold_ops = self._timed(cold)
+
+        # Warm: realistic traffic repeats a small set of strings
+        pool = [rng.choice(TEMPLATES).format(v=i) for i in range(distinct)]
+        warm = [rng.choice(pool) for _ in range(calls)]
+        classify_user_agent.cache_clear()
+        for ua in pool:
+            classify_user_agent(ua)
+        warm_ops = self._timed(warm)
+        info = classify_user_agent.cache_info()
+
+        self.stdout.write(f"Cold cache: {cold_ops:12.0f} classifications/s")
+        self.stdout.write(f"Warm cache: {warm_ops:12.0f} classifications/s ({distinct} distinct UAs, hits={info.hits}, misses={info.misses})")
+        if cold_ops:
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {warm_ops / cold_ops:.1f}x"))
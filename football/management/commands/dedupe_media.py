@@ -0,0 +1,91 @@
+import os
+from collections import Counter
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from football.models import ImageJob, MediaBlob
+from football.storage import hash_file, image_fields
+
+
+def human_size(num):
+    for unit in ("B", "KB", "MB", "GB"):
+        if num < 1024 or unit == "GB":
+            return f"{num:.1f} {unit}" if unit != "B" else f"{num} B"
+        num /= 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Rehash every stored image, move it to its content-addressed name, collapse duplicates "
+        "and rebuild the reference counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+
+    def handle(self, *args, **opts):
+        dry_run = opts["dry_run"]
+        refs = Counter()
+        blobs = {}
+        moved = {}   # old name -> new name, for files referenced by several rows
+        stats = Counter()
+
+        for model, field in image_fields():
+            storage = field.storage
+            rows = (
+                model._default_manager.exclude(**{field.attname: ""})
+                .exclude(**{f"{field.attname}__isnull": True})
+                .values_list("pk", field.attname)
+            )
+            for pk, name in rows.iterator(chunk_size=500):
+                stats["rows"] += 1
+                if name in moved:
+                    target = moved[name]
+                else:
+                    if not storage.exists(name):
+                        stats["missing"] += 1
+                        self.stderr.write(f"Missing file for {model._meta.label}#{pk}: {name}")
+                        continue
+                    with storage.open(name, "rb") as f:
+                        digest, size = hash_file(File(f))
+                    target = storage.hashed_name(field.generate_filename(None, os.path.basename(name)), digest)
+                    moved[name] = target
+                    blobs[target] = (digest, size)
+                    stats["files"] += 1
+                    if target != name:
+                        if storage.exists(target):
+                            stats["duplicates"] += 1
+                            stats["reclaimed"] += size
+                            if not dry_run:
+                                os.remove(storage.path(name))
+                        else:
+                            stats["renamed"] += 1
+                            if not dry_run:
+                                os.makedirs(os.path.dirname(storage.path(target)), exist_ok=True)
+                                os.replace(storage.path(name), storage.path(target))
+                        if not dry_run:
+                            ImageJob.objects.filter(path=storage.path(name)).update(path=storage.path(target))
+                refs[target] += 1
+                if target != name and not dry_run:
+                    model._default_manager.filter(pk=pk).update(**{field.attname: target})
+
+        if not dry_run:
+            with transaction.atomic():
+                MediaBlob.objects.all().delete()
+                MediaBlob.objects.bulk_create(
+                    [MediaBlob(name=name, sha256=blobs[name][0], size=blobs[name][1], refcount=count)
+                     for name, count in refs.items()],
+                    batch_size=500,
+                )
+
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(
+            f"{prefix}{stats['rows']} references, {stats['files']} files hashed, "
+            f"{stats['renamed']} renamed, {stats['duplicates']} duplicates collapsed, "
+            f"{len(refs)} unique files, {stats['missing']} missing"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Reclaimed {human_size(stats['reclaimed'])} ({stats['reclaimed']} bytes)"
+        ))
@@ -0,0 +1,58 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from football.exports import (
+    CHUNK_SIZE, FORMAT_CSV, FORMAT_JSONL, MATCH_FIELDS, VISIT_FIELDS,
+    export_chunks, filter_matches, filter_visits,
+)
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream page visits or matches to CSV or gzip-compressed JSON Lines.\n"
+        "Rows are read in chunks, so memory use stays constant for any table size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=["visits", "matches"], help="What to export")
+        parser.add_argument("--format", choices=[FORMAT_CSV, FORMAT_JSONL], default=FORMAT_CSV, help="csv or jsonl (gzip)")
+        parser.add_argument("--output", "-o", default="-", help="Output file (default stdout)")
+        parser.add_argument("--start", type=_date, default=None, help="First day (YYYY-MM-DD)")
+        parser.add_argument("--end", type=_date, default=None, help="Last day (YYYY-MM-DD)")
+        parser.add_argument("--page", default=None, help="Only visits of this page name")
+        parser.add_argument("--league", type=int, default=None, help="Only matches of this league id")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Rows fetched per query (default {CHUNK_SIZE})")
+
+    def handle(self, *args, **opts):
+        if opts["dataset"] == "visits":
+            qs = filter_visits(start=opts["start"], end=opts["end"], page=opts["page"])
+            fields = VISIT_FIELDS
+        else:
+            qs = filter_matches(start=opts["start"], end=opts["end"], league=opts["league"])
+            fields = MATCH_FIELDS
+
+        fmt = opts["format"]
+        chunks = export_chunks(qs, fields, fmt, chunk_size=opts["chunk_size"])
+        binary = fmt == FORMAT_JSONL
+        if opts["output"] == "-":
+            out = sys.stdout.buffer if binary else sys.stdout
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+
+        mode = "wb" if binary else "w"
+        kwargs = {} if binary else {"newline": "", "encoding": "utf-8"}
+        with open(opts["output"], mode, **kwargs) as out:
+            for chunk in chunks:
+                out.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported {opts['dataset']} to {opts['output']}"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from football.mediagc import collect_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        "Find media files that no database row (file fields or media URLs in rich text) refers to. "
+        "Reports them by default; --quarantine moves them out of MEDIA_ROOT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-days", type=int, default=7,
+                            help="Only consider files last modified more than N days ago (default 7)")
+        parser.add_argument("--quarantine", action="store_true",
+                            help="Move orphans to MEDIA_QUARANTINE_DIR instead of only reporting them")
+        parser.add_argument("--renditions", action="store_true",
+                            help="Also collect renditions of files that are gone")
+        parser.add_argument("--list", action="store_true", help="Print every orphaned file")
+
+    def handle(self, *args, **opts):
+        if opts["grace_days"] < 0:
+            raise CommandError("--grace-days must not be negative")
+        log = (lambda rel, size: self.stdout.write(f"{size:>12}  {rel}")) if opts["list"] else None
+        stats = collect_garbage(opts["grace_days"], opts["quarantine"], opts["renditions"], log)
+
+        self.stdout.write(
+            f"Scanned {stats['files']} files, {stats['referenced']} referenced names, "
+            f"{stats['too_recent']} unreferenced but within the grace period"
+        )
+        size_mb = stats["orphan_bytes"] / 1024 / 1024
+        if opts["quarantine"]:
+            where = f" to {stats['quarantine_dir']}" if stats["quarantine_dir"] else ""
+            self.stdout.write(self.style.SUCCESS(f"Quarantined {stats['orphans']} files ({size_mb:.1f} MB){where}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Found {stats['orphans']} orphaned files ({size_mb:.1f} MB); run with --quarantine to move them"
+            ))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from football.clubcontext import get_club_team
 from football.models import League, Team, Standing
 
 
@@ -39,8 +40,7 @@ class Command(BaseCommand):
 
     def _find_hlavnice_team(self):
         # Try to reuse existing club team to avoid duplicates
-        t = Team.objects.filter(is_club_team=True).first()
-        return t
+        return get_club_team()
 
     @transaction.atomic
     def handle(self, *args, **opts):
@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from football.imagejobs import run_worker_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued image jobs (resizing after uploads) in a pool of worker processes.\n"
+        "Runs until interrupted; use --once from cron to drain the queue and exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Worker processes (default 2, 1 = no pool)")
+        parser.add_argument("--batch-size", type=int, default=20, help="Jobs claimed per batch (default 20)")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Exit when no due jobs are left")
+
+    def handle(self, *args, **opts):
+        workers = max(1, opts["workers"])
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        total = succeeded = 0
+        try:
+            while True:
+                close_old_connections()
+                claimed, ok = run_worker_batch(opts["batch_size"], pool)
+                total += claimed
+                succeeded += ok
+                if claimed:
+                    self.stdout.write(f"Processed {claimed} jobs ({ok} ok)")
+                    continue
+                if opts["once"]:
+                    break
+                time.sleep(opts["sleep"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Done: {succeeded}/{total} jobs succeeded"))
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from football.rollups import aggregate_visits, get_retention_days, prune_visits
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete raw PageVisit rows older than the retention period in chunks.\n"
+        "New rows are aggregated first; only rows already in the rollups are removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Keep raw rows for this many days (default PAGE_VISIT_RETENTION_DAYS)")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows deleted per statement (default 5000)")
+        parser.add_argument("--archive", action="store_true", help="Write deleted rows to a gzip CSV in PAGE_VISIT_ARCHIVE_DIR")
+        parser.add_argument("--archive-dir", default=None, help="Archive directory (implies --archive)")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would be deleted")
+
+    def handle(self, *args, **opts):
+        days = opts["days"] if opts["days"] is not None else get_retention_days()
+        archive_dir = opts["archive_dir"]
+        if opts["archive"] and not archive_dir:
+            archive_dir = getattr(settings, "PAGE_VISIT_ARCHIVE_DIR", settings.BASE_DIR / "archive")
+
+        if not opts["dry_run"]:
+            aggregate_visits()
+        try:
+            count, path = prune_visits(
+                days=days,
+                chunk_size=opts["chunk_size"],
+                archive_dir=archive_dir,
+                dry_run=opts["dry_run"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if opts["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"[dry-run] Would delete {count} page visits older than {days} days"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} page visits older than {days} days"))
+        if path:
+            self.stdout.write(f"Archived to {path}")
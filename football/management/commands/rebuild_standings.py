@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from football.models import League
+from football.standings import STAT_FIELDS, compute_league, get_standings_settings, rebuild_league, stored_league
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the standings of leagues with 'standings_from_matches' from all their matches. "
+        "--verify only compares the stored (incrementally maintained) rows with a full rebuild."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--league", type=int, action="append", help="League id (repeatable; default all computed leagues)")
+        parser.add_argument("--verify", action="store_true", help="Report differences without writing; exit with an error if any")
+
+    def _differences(self, stored, computed):
+        fields = ("position",) + STAT_FIELDS
+        for team_id in sorted(set(stored) | set(computed)):
+            old, new = stored.get(team_id), computed.get(team_id)
+            if old is None or new is None:
+                yield team_id, "missing in stored rows" if old is None else "not in the computed table"
+                continue
+            changed = [f"{field} {old[field]} -> {new[field]}" for field in fields if old[field] != new[field]]
+            if changed:
+                yield team_id, ", ".join(changed)
+
+    def handle(self, *args, **opts):
+        leagues = League.objects.filter(standings_from_matches=True)
+        if opts["league"]:
+            leagues = League.objects.filter(pk__in=opts["league"])
+            not_computed = [str(league) for league in leagues if not league.standings_from_matches]
+            if not_computed:
+                raise CommandError(f"Standings are not computed from matches for: {', '.join(not_computed)}")
+        conf = get_standings_settings()
+
+        mismatched = 0
+        for league in leagues.order_by("season", "name"):
+            if not opts["verify"]:
+                table = rebuild_league(league.pk, conf)
+                self.stdout.write(f"{league}: {len(table)} teams")
+                continue
+            differences = list(self._differences(stored_league(league.pk), compute_league(league.pk, conf)))
+            if differences:
+                mismatched += 1
+                self.stdout.write(self.style.WARNING(f"{league}: {len(differences)} rows differ"))
+                for team_id, text in differences:
+                    self.stdout.write(f"  team {team_id}: {text}")
+            else:
+                self.stdout.write(f"{league}: incremental and full results agree")
+
+        if opts["verify"] and mismatched:
+            raise CommandError(f"{mismatched} leagues differ from a full rebuild; run without --verify to repair")
+        verb = "verified" if opts["verify"] else "rebuilt"
+        self.stdout.write(self.style.SUCCESS(f"{leagues.count()} leagues {verb}"))
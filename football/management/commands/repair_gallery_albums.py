@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from football.models import GalleryAlbum, refresh_album_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized photo_count and cover_photo of every gallery album "
+        "(needed after bulk updates that bypass signals, e.g. QuerySet.update)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report albums that are out of sync")
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            before = dict((pk, (count, cover)) for pk, count, cover in
+                          GalleryAlbum.objects.values_list("pk", "photo_count", "cover_photo_id"))
+            refresh_album_stats()
+            after = dict((pk, (count, cover)) for pk, count, cover in
+                         GalleryAlbum.objects.values_list("pk", "photo_count", "cover_photo_id"))
+            stale = sorted(pk for pk in after if before.get(pk) != after[pk])
+            for pk in stale:
+                self.stdout.write(f"Album {pk}: {before.get(pk)} -> {after[pk]} (photo_count, cover_photo)")
+            if opts["dry_run"]:
+                transaction.set_rollback(True)
+
+        verb = "would be repaired" if opts["dry_run"] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"{len(stale)} of {len(after)} albums {verb}"))
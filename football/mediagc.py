@@ -0,0 +1,137 @@
+"""Garbage collection of media files no database row refers to.
+
+References come from every FileField/ImageField value and from media URLs
+inside rich text (CKEditor) and other text fields. The media tree is walked
+once with ``os.scandir``, so time is O(files) and memory is bounded by the
+number of referenced names, not by the size of ``MEDIA_ROOT``. Unreferenced
+files older than the grace period are reported or moved to a quarantine
+directory outside ``MEDIA_ROOT`` from which they can be restored by hand.
+"""
+import os
+import re
+import shutil
+import time
+from urllib.parse import unquote, urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import FileField, TextField
+from django.utils import timezone
+from django_ckeditor_5.fields import CKEditor5Field
+
+from .renditions import RENDITION_DIR, content_hash
+from .storage import name_digest
+
+# Upload leftovers that are collected even while a row still points at them
+TRANSIENT_DIRS = ('temp_uploads/',)
+
+
+def get_quarantine_dir():
+    return str(getattr(settings, 'MEDIA_QUARANTINE_DIR', os.path.join(settings.BASE_DIR, 'quarantine')))
+
+
+def _media_url_pattern():
+    media_url = urlsplit(settings.MEDIA_URL).path or '/media/'
+    return media_url, re.compile(re.escape(media_url) + r'''([^"'\s<>)?#,]+)''')
+
+
+def referenced_files():
+    """Set of media-relative paths referenced from any model in the project"""
+    media_url, pattern = _media_url_pattern()
+    refs = set()
+    for model in apps.get_models():
+        file_fields = [f.attname for f in model._meta.concrete_fields if isinstance(f, FileField)]
+        text_fields = [f.attname for f in model._meta.concrete_fields if isinstance(f, (TextField, CKEditor5Field))]
+        manager = model._base_manager
+        for name in file_fields:
+            refs.update(manager.exclude(**{name: ''}).exclude(**{f'{name}__isnull': True})
+                        .values_list(name, flat=True).iterator(chunk_size=2000))
+        for name in text_fields:
+            values = manager.filter(**{f'{name}__contains': media_url}).values_list(name, flat=True)
+            for text in values.iterator(chunk_size=200):
+                refs.update(unquote(match) for match in pattern.findall(text))
+    return refs
+
+
+def referenced_rendition_digests(refs):
+    """Content-hash prefixes of the referenced files that still exist.
+
+    Content-addressed names carry their digest and other known files have a
+    MediaBlob row; only files stored before either existed are read and hashed.
+    """
+    from .models import MediaBlob
+
+    digests = set()
+    unknown = []
+    for name in refs:
+        if not os.path.isfile(os.path.join(settings.MEDIA_ROOT, name)):
+            continue
+        digest = name_digest(name)
+        if digest:
+            digests.add(digest[:24])
+        else:
+            unknown.append(name)
+    known = {}
+    for start in range(0, len(unknown), 500):
+        known.update(MediaBlob.objects.filter(name__in=unknown[start:start + 500]).values_list('name', 'sha256'))
+    for name in unknown:
+        if name in known:
+            digests.add(known[name][:24])
+        else:
+            digests.add(content_hash(os.path.join(settings.MEDIA_ROOT, name))[:24])
+    return digests
+
+
+def iter_media_files(root, skip_dirs=()):
+    """Yield ``(relative posix path, DirEntry)`` for every file under ``root``"""
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, rel_dir))
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                rel = f"{rel_dir}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    if f"{rel}/" not in skip_dirs:
+                        stack.append(f"{rel}/")
+                elif entry.is_file(follow_symlinks=False):
+                    yield rel, entry
+
+
+def collect_garbage(grace_days=7, quarantine=False, renditions=False, log=None):
+    """Find (and optionally quarantine) unreferenced media files; returns a stats dict"""
+    from .models import MediaBlob
+
+    root = str(settings.MEDIA_ROOT)
+    refs = referenced_files()
+    digests = referenced_rendition_digests(refs) if renditions else None
+    cutoff = time.time() - grace_days * 86400
+    target = os.path.join(get_quarantine_dir(), timezone.now().strftime('%Y%m%d-%H%M%S'))
+    skip = () if renditions else (f"{RENDITION_DIR}/",)
+    stats = {'files': 0, 'referenced': len(refs), 'orphans': 0, 'orphan_bytes': 0, 'too_recent': 0}
+
+    for rel, entry in iter_media_files(root, skip):
+        stats['files'] += 1
+        if rel.startswith(f"{RENDITION_DIR}/"):
+            if os.path.basename(rel).split('-', 1)[0] in digests:
+                continue
+        elif rel in refs and not rel.startswith(TRANSIENT_DIRS):
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime > cutoff:
+            stats['too_recent'] += 1
+            continue
+        stats['orphans'] += 1
+        stats['orphan_bytes'] += stat.st_size
+        if log:
+            log(rel, stat.st_size)
+        if quarantine:
+            dest = os.path.join(target, rel)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.move(entry.path, dest)
+            MediaBlob.objects.filter(name=rel).delete()
+    stats['quarantine_dir'] = target if quarantine and stats['orphans'] else None
+    return stats
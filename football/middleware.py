@@ -1,31 +1,70 @@
+from urllib.parse import urlsplit
+
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 from .models import PageVisit
+from .useragents import DEVICE_BOT, classify_user_agent
+from .visits import add_bot_hits, get_buffer_settings, get_visit_buffer, update_visit_sketches
+
+def referrer_host(request):
+    """Host of an external Referer header, '' for direct or internal visits"""
+    referer = request.META.get('HTTP_REFERER', '')
+    if not referer:
+        return ''
+    host = (urlsplit(referer).hostname or '')[:100]
+    if host == request.get_host().split(':')[0]:
+        return ''
+    return host
 
 class PageVisitMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.buffered = get_buffer_settings()['ENABLED']
+
     def process_request(self, request):
         # Skip admin and static files
         if request.path.startswith('/admin/') or request.path.startswith('/static/') or request.path.startswith('/media/'):
             return None
-        
+
         # Get client IP
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
             ip = x_forwarded_for.split(',')[0]
         else:
             ip = request.META.get('REMOTE_ADDR')
-        
+
+        # Crawlers and uptime monitors are counted, not stored
+        device = classify_user_agent(request.META.get('HTTP_USER_AGENT', ''))
+        if device == DEVICE_BOT:
+            if self.buffered:
+                get_visit_buffer().record_bot()
+            else:
+                try:
+                    add_bot_hits({timezone.localdate(): 1})
+                except:
+                    pass
+            return None
+
         # Get page name from path
         page_name = request.path.strip('/') or 'home'
-        
+        referrer = referrer_host(request)
+
+        # Queue the visit; rows are written in batches by the buffer
+        if self.buffered:
+            get_visit_buffer().record(page_name, ip, device, referrer)
+            return None
+
         # Create page visit record
         try:
-            PageVisit.objects.create(
+            visit = PageVisit.objects.create(
                 page_name=page_name,
                 ip_address=ip,
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:500]  # Limit length
+                device=device,
+                referrer=referrer
             )
+            update_visit_sketches([(page_name, ip, visit.timestamp)])
         except:
             # Silently fail if there's an issue (e.g., during migrations)
             pass
-        
+
         return None
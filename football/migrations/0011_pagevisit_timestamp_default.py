@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0010_bulkimageupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pagevisit',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Čas návštěvy'),
+        ),
+    ]
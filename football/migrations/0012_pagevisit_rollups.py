@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0011_pagevisit_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Název')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Poslední zpracované ID')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Aktualizováno')),
+            ],
+            options={
+                'verbose_name': 'Stav agregace',
+                'verbose_name_plural': 'Stav agregace',
+            },
+        ),
+        migrations.CreateModel(
+            name='PageVisitDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_name', models.CharField(max_length=100, verbose_name='Název stránky')),
+                ('bucket', models.DateField(verbose_name='Den')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Návštěvy')),
+                ('unique_ips', models.PositiveIntegerField(default=0, verbose_name='Unikátní IP adresy')),
+            ],
+            options={
+                'verbose_name': 'Návštěvy za den',
+                'verbose_name_plural': 'Návštěvy za den',
+                'ordering': ['-bucket', 'page_name'],
+                'unique_together': {('page_name', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PageVisitHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_name', models.CharField(max_length=100, verbose_name='Název stránky')),
+                ('bucket', models.DateTimeField(verbose_name='Hodina')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Návštěvy')),
+                ('unique_ips', models.PositiveIntegerField(default=0, verbose_name='Unikátní IP adresy')),
+            ],
+            options={
+                'verbose_name': 'Návštěvy za hodinu',
+                'verbose_name_plural': 'Návštěvy za hodinu',
+                'ordering': ['-bucket', 'page_name'],
+                'unique_together': {('page_name', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0012_pagevisit_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagevisit',
+            name='referrer',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Odkazující web'),
+        ),
+        migrations.AlterField(
+            model_name='pagevisitdaily',
+            name='bucket',
+            field=models.DateField(db_index=True, verbose_name='Den'),
+        ),
+        migrations.AlterField(
+            model_name='pagevisithourly',
+            name='bucket',
+            field=models.DateTimeField(db_index=True, verbose_name='Hodina'),
+        ),
+        migrations.CreateModel(
+            name='PageVisitSourceDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('referrer', 'Odkazující web'), ('device', 'Zařízení')], max_length=10, verbose_name='Rozměr')),
+                ('value', models.CharField(blank=True, max_length=100, verbose_name='Hodnota')),
+                ('bucket', models.DateField(verbose_name='Den')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Návštěvy')),
+            ],
+            options={
+                'verbose_name': 'Zdroj návštěv za den',
+                'verbose_name_plural': 'Zdroje návštěv za den',
+                'ordering': ['-bucket', 'dimension', '-hits'],
+                'unique_together': {('dimension', 'bucket', 'value')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0013_pagevisit_sources'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageVisitSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_name', models.CharField(max_length=100, verbose_name='Název stránky')),
+                ('day', models.DateField(db_index=True, verbose_name='Den')),
+                ('registers', models.BinaryField(verbose_name='Registry')),
+            ],
+            options={
+                'verbose_name': 'Odhad unikátních návštěvníků',
+                'verbose_name_plural': 'Odhady unikátních návštěvníků',
+                'unique_together': {('page_name', 'day')},
+            },
+        ),
+    ]
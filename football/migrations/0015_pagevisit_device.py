@@ -0,0 +1,93 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:08
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+# Frozen copy of football.useragents, so this backfill does not change with the module
+DEVICE_BOT = 'bot'
+_BOT_TOKENS = (
+    'bot', 'crawl', 'spider', 'slurp', 'archiver', 'facebookexternalhit',
+    'bingpreview', 'skypeuripreview', 'whatsapp/', 'embedly', 'iframely', 'vkshare',
+    'feedfetcher', 'mediapartners', 'lighthouse', 'headless', 'phantomjs',
+    'uptime', 'monitor', 'pingdom', 'statuscake', 'site24x7', 'check_http',
+    'curl/', 'wget/', 'python-requests', 'python-urllib', 'aiohttp', 'httpclient',
+    'go-http-client', 'okhttp', 'java/', 'libwww', 'scrapy', 'axios/', 'node-fetch',
+)
+_MOBILE_TOKENS = ('mobile', 'android', 'iphone', 'ipad', 'ipod', 'windows phone', 'opera mini')
+_DESKTOP_TOKENS = ('windows nt', 'macintosh', 'x11', 'linux x86_64', 'cros ')
+
+
+def classify_user_agent(user_agent):
+    ua = (user_agent or '').lower()
+    if not ua:
+        return 'unknown'
+    if any(token in ua for token in _BOT_TOKENS):
+        return DEVICE_BOT
+    if any(token in ua for token in _MOBILE_TOKENS):
+        return 'mobile'
+    if any(token in ua for token in _DESKTOP_TOKENS):
+        return 'desktop'
+    return 'unknown'
+
+
+def classify_existing_visits(apps, schema_editor):
+    """Store the device class of existing rows; count and delete bot rows
+
+    Rows up to the rollup checkpoint are already in the daily totals, so
+    only newer bot rows are added to the bot counters.
+    """
+    PageVisit = apps.get_model('football', 'PageVisit')
+    PageVisitSourceDaily = apps.get_model('football', 'PageVisitSourceDaily')
+    RollupCheckpoint = apps.get_model('football', 'RollupCheckpoint')
+    checkpoint = RollupCheckpoint.objects.filter(name='page_visits').first()
+    aggregated_id = checkpoint.last_id if checkpoint else 0
+
+    last_id = 0
+    bot_hits = Counter()
+    while True:
+        chunk = list(
+            PageVisit.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'user_agent', 'timestamp')[:5000]
+        )
+        if not chunk:
+            break
+        by_device = {}
+        for pk, user_agent, ts in chunk:
+            device = classify_user_agent(user_agent)
+            by_device.setdefault(device, []).append(pk)
+            if device == DEVICE_BOT and pk > aggregated_id:
+                bot_hits[timezone.localtime(ts).date()] += 1
+        for device, ids in by_device.items():
+            if device == DEVICE_BOT:
+                PageVisit.objects.filter(id__in=ids).delete()
+            else:
+                PageVisit.objects.filter(id__in=ids).update(device=device)
+        last_id = chunk[-1][0]
+
+    for day, hits in bot_hits.items():
+        updated = PageVisitSourceDaily.objects.filter(dimension='device', value=DEVICE_BOT, bucket=day).update(hits=F('hits') + hits)
+        if not updated:
+            PageVisitSourceDaily.objects.create(dimension='device', value=DEVICE_BOT, bucket=day, hits=hits)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0014_pagevisitsketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagevisit',
+            name='device',
+            field=models.CharField(choices=[('mobile', 'Mobil'), ('desktop', 'Počítač'), ('unknown', 'Neznámé')], default='unknown', max_length=10, verbose_name='Zařízení'),
+        ),
+        migrations.RunPython(classify_existing_visits, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='pagevisit',
+            name='user_agent',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0015_pagevisit_device'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='Model')),
+                ('object_id', models.BigIntegerField(verbose_name='ID objektu')),
+                ('field_name', models.CharField(max_length=50, verbose_name='Pole')),
+                ('path', models.CharField(max_length=500, verbose_name='Soubor')),
+                ('max_width', models.PositiveIntegerField(verbose_name='Max. šířka')),
+                ('max_height', models.PositiveIntegerField(verbose_name='Max. výška')),
+                ('status', models.CharField(choices=[('pending', 'Čeká'), ('running', 'Zpracovává se'), ('done', 'Hotovo'), ('failed', 'Chyba')], db_index=True, default='pending', max_length=10, verbose_name='Stav')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Pokusy')),
+                ('result', models.CharField(blank=True, max_length=20, verbose_name='Výsledek')),
+                ('last_error', models.TextField(blank=True, verbose_name='Poslední chyba')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Spustit po')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Vytvořeno')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Aktualizováno')),
+            ],
+            options={
+                'verbose_name': 'Úloha zpracování obrázku',
+                'verbose_name_plural': 'Úlohy zpracování obrázků',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
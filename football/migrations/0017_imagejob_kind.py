@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0016_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='kind',
+            field=models.CharField(choices=[('resize', 'Zmenšení a varianty'), ('renditions', 'Varianty velikostí')], default='resize', max_length=10, verbose_name='Typ'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:17
+
+import football.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0017_imagejob_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Soubor')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Velikost (B)')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Počet odkazů')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Vytvořeno')),
+            ],
+            options={
+                'verbose_name': 'Uložený soubor',
+                'verbose_name_plural': 'Uložené soubory',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='clubinfo',
+            name='logo',
+            field=models.ImageField(blank=True, null=True, storage=football.storage.get_media_storage, upload_to='club/', verbose_name='Logo'),
+        ),
+        migrations.AlterField(
+            model_name='gallery',
+            name='image',
+            field=models.ImageField(storage=football.storage.get_media_storage, upload_to='gallery/', verbose_name='Obrázek'),
+        ),
+        migrations.AlterField(
+            model_name='galleryalbum',
+            name='cover_image',
+            field=models.ImageField(blank=True, null=True, storage=football.storage.get_media_storage, upload_to='gallery/covers/', verbose_name='Titulní obrázek'),
+        ),
+        migrations.AlterField(
+            model_name='management',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=football.storage.get_media_storage, upload_to='management/', verbose_name='Fotografie'),
+        ),
+        migrations.AlterField(
+            model_name='news',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=football.storage.get_media_storage, upload_to='news/', verbose_name='Obrázek'),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=football.storage.get_media_storage, upload_to='players/', verbose_name='Fotografie'),
+        ),
+        migrations.AlterField(
+            model_name='team',
+            name='flag',
+            field=models.ImageField(blank=True, null=True, storage=football.storage.get_media_storage, upload_to='teams/', verbose_name='Vlajka/Logo'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0018_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupcheckpoint',
+            name='last_key',
+            field=models.CharField(blank=True, max_length=500, verbose_name='Poslední zpracovaný klíč'),
+        ),
+    ]
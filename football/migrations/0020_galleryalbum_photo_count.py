@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_album_stats(apps, schema_editor):
+    GalleryAlbum = apps.get_model('football', 'GalleryAlbum')
+    Gallery = apps.get_model('football', 'Gallery')
+    photos = Gallery.objects.filter(album=models.OuterRef('pk'))
+    GalleryAlbum.objects.update(
+        photo_count=Coalesce(
+            models.Subquery(photos.order_by().values('album').annotate(n=models.Count('pk')).values('n')), 0
+        ),
+        cover_photo=models.Subquery(photos.order_by('-uploaded_at', '-pk').values('pk')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0019_rollupcheckpoint_last_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryalbum',
+            name='cover_photo',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='football.gallery', verbose_name='Fotka na titulce'),
+        ),
+        migrations.AddField(
+            model_name='galleryalbum',
+            name='photo_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Počet fotek'),
+        ),
+        migrations.RunPython(fill_album_stats, migrations.RunPython.noop),
+    ]
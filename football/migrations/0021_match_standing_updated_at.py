@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0020_galleryalbum_photo_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Aktualizováno'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='standing',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Aktualizováno'),
+            preserve_default=False,
+        ),
+    ]
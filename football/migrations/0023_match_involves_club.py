@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:34
+
+from django.db import migrations, models
+
+
+def fill_involves_club(apps, schema_editor):
+    Match = apps.get_model('football', 'Match')
+    Team = apps.get_model('football', 'Team')
+    club = Team.objects.filter(is_club_team=True)
+    Match.objects.update(involves_club=models.Case(
+        models.When(
+            models.Exists(club.filter(pk=models.OuterRef('home_team')))
+            | models.Exists(club.filter(pk=models.OuterRef('away_team'))),
+            then=models.Value(True),
+        ),
+        default=models.Value(False),
+    ))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0022_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='involves_club',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Zápas našeho týmu'),
+        ),
+        migrations.RunPython(fill_involves_club, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(condition=models.Q(('involves_club', True)), fields=['date', 'id'], name='match_club_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['league', 'date', 'id'], name='match_league_date_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0023_match_involves_club'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='news',
+            name='news_published_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date'], name='event_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gallery',
+            index=models.Index(fields=['album', 'uploaded_at', 'id'], name='gallery_album_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galleryalbum',
+            index=models.Index(fields=['created_at'], name='galleryalbum_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('published', True)), fields=['created_at', 'id'], name='news_published_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagevisit',
+            index=models.Index(fields=['timestamp'], name='pagevisit_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagevisit',
+            index=models.Index(fields=['page_name', 'timestamp'], name='pagevisit_page_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='standing',
+            index=models.Index(fields=['league', 'position'], name='standing_league_position_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0024_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='league',
+            name='standings_from_matches',
+            field=models.BooleanField(default=False, help_text='Tabulka se přepočítává z výsledků zápasů; ruční úpravy budou přepsány', verbose_name='Počítat tabulku ze zápasů'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:19
+
+from django.db import migrations, models
+
+PREFIX = 'backfill_images:'
+
+
+def move_backfill_checkpoints(apps, schema_editor):
+    """backfill_images kept its progress in RollupCheckpoint under a name prefix"""
+    RollupCheckpoint = apps.get_model('football', 'RollupCheckpoint')
+    ImageBackfillCheckpoint = apps.get_model('football', 'ImageBackfillCheckpoint')
+    old = RollupCheckpoint.objects.filter(name__startswith=PREFIX)
+    ImageBackfillCheckpoint.objects.bulk_create(
+        ImageBackfillCheckpoint(source=row.name[len(PREFIX):], last_id=row.last_id, last_key=row.last_key)
+        for row in old
+    )
+    old.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('football', '0026_imagejob_thumbnail_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBackfillCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100, unique=True, verbose_name='Zdroj')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Poslední zpracované ID')),
+                ('last_key', models.CharField(blank=True, max_length=500, verbose_name='Poslední zpracovaný soubor')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Aktualizováno')),
+            ],
+            options={
+                'verbose_name': 'Stav převodu obrázků',
+                'verbose_name_plural': 'Stav převodu obrázků',
+            },
+        ),
+        migrations.RunPython(move_backfill_checkpoints, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='rollupcheckpoint',
+            name='last_key',
+        ),
+    ]
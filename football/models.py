@@ -1,16 +1,20 @@
 from django.db import models
+from django.db.models.functions import Cast, Coalesce, Round
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from PIL import Image
 import os
 from django_ckeditor_5.fields import CKEditor5Field
+from .imagejobs import enqueue_renditions, enqueue_resize
+from .storage import get_media_storage
 
 class ClubInfo(models.Model):
     name = models.CharField(max_length=100, default="TJ Družba Hlavnice", verbose_name=_("Název klubu"))
     founded_year = models.IntegerField(default=1952, verbose_name=_("Rok založení"))
     history = CKEditor5Field(config_name='extends', blank=True, verbose_name=_("Historie klubu"), help_text=_("Historie a informace o klubu"))
-    logo = models.ImageField(upload_to='club/', blank=True, null=True, verbose_name=_("Logo"))
+    logo = models.ImageField(upload_to='club/', storage=get_media_storage, blank=True, null=True, verbose_name=_("Logo"))
     address = models.TextField(blank=True, verbose_name=_("Adresa"))
     contact_email = models.EmailField(blank=True, verbose_name=_("Kontaktní email"))
     contact_phone = models.CharField(max_length=20, blank=True, verbose_name=_("Kontaktní telefon"))
@@ -26,6 +30,10 @@ class League(models.Model):
     name = models.CharField(max_length=100, verbose_name=_("Název soutěže"))
     season = models.CharField(max_length=20, verbose_name=_("Sezóna"))
     description = models.TextField(blank=True, verbose_name=_("Popis"))
+    standings_from_matches = models.BooleanField(
+        default=False, verbose_name=_("Počítat tabulku ze zápasů"),
+        help_text=_("Tabulka se přepočítává z výsledků zápasů; ruční úpravy budou přepsány"),
+    )
     
     class Meta:
         unique_together = ['name', 'season']
@@ -38,7 +46,7 @@ class League(models.Model):
 class Team(models.Model):
     name = models.CharField(max_length=100, verbose_name=_("Název týmu"))
     short_name = models.CharField(max_length=30, blank=True, null=True, verbose_name=("Zkrácený název"))
-    flag = models.ImageField(upload_to='teams/', blank=True, null=True, verbose_name=_("Vlajka/Logo"))
+    flag = models.ImageField(upload_to='teams/', storage=get_media_storage, blank=True, null=True, verbose_name=_("Vlajka/Logo"))
     founded = models.IntegerField(blank=True, null=True, verbose_name=_("Rok založení"))
     city = models.CharField(max_length=100, blank=True, verbose_name=_("Město"))
     league = models.ForeignKey(League, on_delete=models.CASCADE, blank=True, null=True, verbose_name=_("Soutěž"))
@@ -53,11 +61,7 @@ class Team(models.Model):
     
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if self.flag:
-            img = Image.open(self.flag.path)
-            if img.height > 100 or img.width > 100:
-                img.thumbnail((100, 100))
-                img.save(self.flag.path)
+        enqueue_resize(self, 'flag', (100, 100))
 
 class Player(models.Model):
     POSITION_CHOICES = [
@@ -73,7 +77,7 @@ class Player(models.Model):
     last_name = models.CharField(max_length=50, verbose_name=_("Příjmení"))
     position = models.CharField(max_length=3, choices=POSITION_CHOICES, verbose_name=_("Pozice"))
     birth_date = models.DateField(blank=True, null=True, verbose_name=_("Datum narození"))
-    photo = models.ImageField(upload_to='players/', blank=True, null=True, verbose_name=_("Fotografie"))
+    photo = models.ImageField(upload_to='players/', storage=get_media_storage, blank=True, null=True, verbose_name=_("Fotografie"))
     goals = models.IntegerField(default=0, verbose_name=_("Góly"))
     yellow_cards = models.IntegerField(default=0, verbose_name=_("Žluté karty"))
     red_cards = models.IntegerField(default=0, verbose_name=_("Červené karty"))
@@ -93,11 +97,7 @@ class Player(models.Model):
     
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if self.photo:
-            img = Image.open(self.photo.path)
-            if img.height > 300 or img.width > 300:
-                img.thumbnail((300, 300))
-                img.save(self.photo.path)
+        enqueue_resize(self, 'photo', (300, 300))
 
 class Management(models.Model):
     ROLE_CHOICES = [
@@ -113,7 +113,7 @@ class Management(models.Model):
     first_name = models.CharField(max_length=50, verbose_name=_("Křestní jméno"))
     last_name = models.CharField(max_length=50, verbose_name=_("Příjmení"))
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, verbose_name=_("Funkce"))
-    photo = models.ImageField(upload_to='management/', blank=True, null=True, verbose_name=_("Fotografie"))
+    photo = models.ImageField(upload_to='management/', storage=get_media_storage, blank=True, null=True, verbose_name=_("Fotografie"))
     bio = CKEditor5Field(config_name='extends', blank=True, verbose_name=_("Biografie"), help_text=_("Biografie a informace"))
     phone = models.CharField(max_length=20, blank=True, verbose_name=_("Telefon"))
     email = models.EmailField(blank=True, verbose_name=_("Email"))
@@ -129,16 +129,12 @@ class Management(models.Model):
     
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if self.photo:
-            img = Image.open(self.photo.path)
-            if img.height > 300 or img.width > 300:
-                img.thumbnail((300, 300))
-                img.save(self.photo.path)
+        enqueue_resize(self, 'photo', (300, 300))
 
 class News(models.Model):
     title = models.CharField(max_length=200, verbose_name=_("Nadpis"))
     content = CKEditor5Field(config_name='extends', verbose_name=_("Obsah"), help_text=_("Obsah článku"))
-    image = models.ImageField(upload_to='news/', blank=True, null=True, verbose_name=_("Obrázek"))
+    image = models.ImageField(upload_to='news/', storage=get_media_storage, blank=True, null=True, verbose_name=_("Obrázek"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Vytvořeno"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Upraveno"))
     author = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=_("Autor"))
@@ -147,6 +143,11 @@ class News(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        # Keyset pagination of the news list (football.keyset); partial because
+        # Django filters booleans as a bare "WHERE published"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=models.Q(published=True), name='news_published_recent_idx'),
+        ]
         verbose_name = _("Aktualita")
         verbose_name_plural = _("Aktuality")
     
@@ -167,14 +168,7 @@ class News(models.Model):
     
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if self.image:
-            try:
-                img = Image.open(self.image.path)
-                if img.height > 800 or img.width > 800:
-                    img.thumbnail((800, 800))
-                    img.save(self.image.path)
-            except (FileNotFoundError, OSError, AttributeError):
-                pass
+        enqueue_resize(self, 'image', (800, 800))
 
 class Match(models.Model):
     home_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='home_matches', verbose_name=_("Domácí tým"))
@@ -187,9 +181,21 @@ class Match(models.Model):
     location = models.CharField(max_length=100, blank=True, verbose_name=_("Místo konání"))
     referee = models.CharField(max_length=100, blank=True, verbose_name=_("Rozhodčí"))
     notes = models.TextField(blank=True, verbose_name=_("Poznámky"))
+    # Denormalized "home or away team is the club team"; kept in sync by save()
+    # and by refresh_club_matches() when a team's is_club_team flag changes
+    involves_club = models.BooleanField(default=False, editable=False, verbose_name=_("Zápas našeho týmu"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Aktualizováno"))
     
     class Meta:
         ordering = ['-date']
+        # Keyset pagination of the match lists (football.keyset)
+        indexes = [
+            models.Index(fields=['date', 'id'], name='match_date_id_idx'),
+            # Partial: Django filters booleans as a bare "WHERE involves_club", which
+            # only an index with the same condition can serve
+            models.Index(fields=['date', 'id'], condition=models.Q(involves_club=True), name='match_club_date_idx'),
+            models.Index(fields=['league', 'date', 'id'], name='match_league_date_idx'),
+        ]
         verbose_name = _("Zápas")
         verbose_name_plural = _("Zápasy")
     
@@ -206,6 +212,51 @@ class Match(models.Model):
     def is_club_match(self):
         return self.home_team.is_club_team or self.away_team.is_club_team
 
+    def save(self, *args, **kwargs):
+        self.involves_club = self.is_club_match
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'involves_club'}
+        super().save(*args, **kwargs)
+
+
+def refresh_club_matches(team_ids=None):
+    """Recompute Match.involves_club for matches of the given teams (all if None) in one UPDATE"""
+    club = Team.objects.filter(is_club_team=True)
+    matches = Match.objects.all()
+    if team_ids is not None:
+        team_ids = {pk for pk in team_ids if pk}
+        if not team_ids:
+            return 0
+        matches = matches.filter(models.Q(home_team__in=team_ids) | models.Q(away_team__in=team_ids))
+    return matches.update(involves_club=models.Case(
+        models.When(
+            models.Exists(club.filter(pk=models.OuterRef('home_team')))
+            | models.Exists(club.filter(pk=models.OuterRef('away_team'))),
+            then=models.Value(True),
+        ),
+        default=models.Value(False),
+    ))
+
+class StandingQuerySet(models.QuerySet):
+    def with_stats(self):
+        """Annotate success_rate (% of possible points) and goals per match, rounded to one decimal"""
+        def per_match(expression, matches=models.F('played')):
+            return models.Case(
+                models.When(played__gt=0, then=Round(Cast(expression, models.FloatField()) / matches, 1)),
+                default=models.Value(0.0),
+                output_field=models.FloatField(),
+            )
+        return self.annotate(
+            success_rate=per_match(models.F('points') * 100, models.F('played') * 3),
+            avg_goals_for=per_match('goals_for'),
+            avg_goals_against=per_match('goals_against'),
+        )
+
+    def for_season(self, season):
+        return self.filter(league__season=season) if season else self
+
+
 class Standing(models.Model):
     team = models.ForeignKey(Team, on_delete=models.CASCADE, verbose_name=_("Tým"))
     league = models.ForeignKey(League, on_delete=models.CASCADE, verbose_name=_("Soutěž"))
@@ -217,10 +268,14 @@ class Standing(models.Model):
     goals_for = models.IntegerField(default=0, verbose_name=_("Góly vstřelené"))
     goals_against = models.IntegerField(default=0, verbose_name=_("Góly obdržené"))
     points = models.IntegerField(default=0, verbose_name=_("Body"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Aktualizováno"))
+
+    objects = StandingQuerySet.as_manager()
     
     class Meta:
         unique_together = ['team', 'league']
         ordering = ['position']
+        indexes = [models.Index(fields=['league', 'position'], name='standing_league_position_idx')]
         verbose_name = _("Tabulka")
         verbose_name_plural = _("Tabulky")
     
@@ -241,6 +296,7 @@ class Event(models.Model):
     
     class Meta:
         ordering = ['date']
+        indexes = [models.Index(fields=['date'], name='event_date_idx')]
         verbose_name = _("Událost")
         verbose_name_plural = _("Události")
     
@@ -250,12 +306,17 @@ class Event(models.Model):
 class GalleryAlbum(models.Model):
     title = models.CharField(max_length=200, verbose_name=("Název galerie"))
     description = models.TextField(blank=True, verbose_name=("Popis"))
-    cover_image = models.ImageField(upload_to='gallery/covers/', blank=True, null=True, verbose_name=("Titulní obrázek"))
+    cover_image = models.ImageField(upload_to='gallery/covers/', storage=get_media_storage, blank=True, null=True, verbose_name=("Titulní obrázek"))
     event = models.ForeignKey(Event, on_delete=models.SET_NULL, blank=True, null=True, verbose_name=("Událost"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=("Vytvořeno"))
+    # Denormalized from Gallery by football.signals / refresh_album_stats
+    photo_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("Počet fotek"))
+    cover_photo = models.ForeignKey('Gallery', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                    related_name='+', verbose_name=_("Fotka na titulce"))
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'], name='galleryalbum_created_idx')]
         verbose_name = ("Galerie (album)")
         verbose_name_plural = ("Galerie (alba)")
     
@@ -268,23 +329,34 @@ class GalleryAlbum(models.Model):
                 return self.cover_image.url
         except (ValueError, AttributeError):
             pass
-        # fallback to first photo
-        first = self.photos.first()
-        if first:
-            return first.get_image_url()
+        # fallback to the newest photo (select_related('cover_photo') avoids a query per album)
+        if self.cover_photo_id:
+            return self.cover_photo.get_image_url()
         return None
 
+    def get_cover_file(self):
+        """Cover image file: the explicit cover or the newest photo"""
+        if self.cover_image:
+            return self.cover_image
+        return self.cover_photo.image if self.cover_photo_id else None
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        enqueue_renditions(self, 'cover_image')
+
 
 class Gallery(models.Model):
     title = models.CharField(max_length=200, verbose_name=("Název"))
     description = models.TextField(blank=True, verbose_name=("Popis"))
-    image = models.ImageField(upload_to='gallery/', verbose_name=("Obrázek"))
+    image = models.ImageField(upload_to='gallery/', storage=get_media_storage, verbose_name=("Obrázek"))
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name=("Nahráno"))
     event = models.ForeignKey(Event, on_delete=models.CASCADE, blank=True, null=True, verbose_name=("Událost"))
     album = models.ForeignKey(GalleryAlbum, on_delete=models.SET_NULL, null=True, blank=True, related_name='photos', verbose_name=("Album"))
     
     class Meta:
         ordering = ['-uploaded_at']
+        # Album photo lists, counts and covers (refresh_album_stats)
+        indexes = [models.Index(fields=['album', 'uploaded_at', 'id'], name='gallery_album_uploaded_idx')]
         verbose_name = _("Galerie")
         verbose_name_plural = _("Galerie")
     
@@ -300,6 +372,32 @@ class Gallery(models.Model):
             pass
         return None
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        enqueue_renditions(self, 'image')
+
+
+def refresh_album_stats(album_ids=None):
+    """Recompute photo_count and cover_photo of the given albums (all if None) in one UPDATE"""
+    from django.db import transaction
+    from .fragments import bump_version
+
+    photos = Gallery.objects.filter(album=models.OuterRef('pk'))
+    albums = GalleryAlbum.objects.all()
+    if album_ids is not None:
+        album_ids = {pk for pk in album_ids if pk}
+        if not album_ids:
+            return 0
+        albums = albums.filter(pk__in=album_ids)
+    # The UPDATE bypasses signals; cached gallery pages still have to go
+    transaction.on_commit(lambda: bump_version('GalleryAlbum'))
+    return albums.update(
+        photo_count=Coalesce(
+            models.Subquery(photos.order_by().values('album').annotate(n=models.Count('pk')).values('n')), 0
+        ),
+        cover_photo=models.Subquery(photos.order_by('-uploaded_at', '-pk').values('pk')[:1]),
+    )
+
 
 class BulkImageUpload(models.Model):
     """Temporary model for bulk image uploads"""
@@ -328,19 +426,188 @@ class BulkImageUpload(models.Model):
                 pass
 
 class PageVisit(models.Model):
+    DEVICE_CHOICES = [
+        ('mobile', _('Mobil')),
+        ('desktop', _('Počítač')),
+        ('unknown', _('Neznámé')),
+    ]
+
     page_name = models.CharField(max_length=100, verbose_name=_("Název stránky"))
     ip_address = models.GenericIPAddressField(verbose_name=_("IP adresa"))
-    user_agent = models.TextField(verbose_name=_("User Agent"))
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name=_("Čas návštěvy"))
+    device = models.CharField(max_length=10, choices=DEVICE_CHOICES, default='unknown', verbose_name=_("Zařízení"))
+    referrer = models.CharField(max_length=100, blank=True, default='', verbose_name=_("Odkazující web"))
+    # Set explicitly by the visit buffer so batched rows keep the request time
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, verbose_name=_("Čas návštěvy"))
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp'], name='pagevisit_timestamp_idx'),
+            models.Index(fields=['page_name', 'timestamp'], name='pagevisit_page_timestamp_idx'),
+        ]
         verbose_name = _("Návštěva stránky")
         verbose_name_plural = _("Návštěvy stránek")
     
     def __str__(self):
         return f"{self.page_name} - {self.timestamp}"
 
+class ImageJob(models.Model):
+    """Queued image resize, processed by the process_image_jobs command"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    KIND_CHOICES = [
+        ('resize', _('Zmenšení a varianty')),
+        ('renditions', _('Varianty velikostí')),
+        ('thumbnail', _('Náhled v administraci')),
+    ]
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _('Čeká')),
+        (STATUS_RUNNING, _('Zpracovává se')),
+        (STATUS_DONE, _('Hotovo')),
+        (STATUS_FAILED, _('Chyba')),
+    ]
+
+    model = models.CharField(max_length=100, verbose_name=_("Model"))
+    object_id = models.BigIntegerField(verbose_name=_("ID objektu"))
+    field_name = models.CharField(max_length=50, verbose_name=_("Pole"))
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='resize', verbose_name=_("Typ"))
+    path = models.CharField(max_length=500, verbose_name=_("Soubor"))
+    max_width = models.PositiveIntegerField(verbose_name=_("Max. šířka"))
+    max_height = models.PositiveIntegerField(verbose_name=_("Max. výška"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True, verbose_name=_("Stav"))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Pokusy"))
+    result = models.CharField(max_length=20, blank=True, verbose_name=_("Výsledek"))
+    last_error = models.TextField(blank=True, verbose_name=_("Poslední chyba"))
+    run_after = models.DateTimeField(default=timezone.now, verbose_name=_("Spustit po"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Vytvořeno"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Aktualizováno"))
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = _("Úloha zpracování obrázku")
+        verbose_name_plural = _("Úlohy zpracování obrázků")
+
+    def __str__(self):
+        return f"{self.model}#{self.object_id}.{self.field_name} ({self.status})"
+
+class MediaBlob(models.Model):
+    """A stored media file shared by every row that uploaded the same bytes"""
+    name = models.CharField(max_length=255, unique=True, verbose_name=_("Soubor"))
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name=_("SHA-256"))
+    size = models.BigIntegerField(default=0, verbose_name=_("Velikost (B)"))
+    refcount = models.PositiveIntegerField(default=0, verbose_name=_("Počet odkazů"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Vytvořeno"))
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = _("Uložený soubor")
+        verbose_name_plural = _("Uložené soubory")
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount}×)"
+
+class PageVisitHourly(models.Model):
+    """Hourly visit totals per page, maintained by aggregate_page_visits"""
+    page_name = models.CharField(max_length=100, verbose_name=_("Název stránky"))
+    bucket = models.DateTimeField(db_index=True, verbose_name=_("Hodina"))
+    hits = models.PositiveIntegerField(default=0, verbose_name=_("Návštěvy"))
+    unique_ips = models.PositiveIntegerField(default=0, verbose_name=_("Unikátní IP adresy"))
+
+    class Meta:
+        unique_together = ['page_name', 'bucket']
+        ordering = ['-bucket', 'page_name']
+        verbose_name = _("Návštěvy za hodinu")
+        verbose_name_plural = _("Návštěvy za hodinu")
+
+    def __str__(self):
+        return f"{self.page_name} - {self.bucket}: {self.hits}"
+
+class PageVisitDaily(models.Model):
+    """Daily visit totals per page, maintained by aggregate_page_visits"""
+    page_name = models.CharField(max_length=100, verbose_name=_("Název stránky"))
+    bucket = models.DateField(db_index=True, verbose_name=_("Den"))
+    hits = models.PositiveIntegerField(default=0, verbose_name=_("Návštěvy"))
+    unique_ips = models.PositiveIntegerField(default=0, verbose_name=_("Unikátní IP adresy"))
+
+    class Meta:
+        unique_together = ['page_name', 'bucket']
+        ordering = ['-bucket', 'page_name']
+        verbose_name = _("Návštěvy za den")
+        verbose_name_plural = _("Návštěvy za den")
+
+    def __str__(self):
+        return f"{self.page_name} - {self.bucket}: {self.hits}"
+
+class PageVisitSourceDaily(models.Model):
+    """Daily visit totals per referrer host or device type"""
+    DIMENSION_CHOICES = [
+        ('referrer', _('Odkazující web')),
+        ('device', _('Zařízení')),
+    ]
+
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES, verbose_name=_("Rozměr"))
+    value = models.CharField(max_length=100, blank=True, verbose_name=_("Hodnota"))
+    bucket = models.DateField(verbose_name=_("Den"))
+    hits = models.PositiveIntegerField(default=0, verbose_name=_("Návštěvy"))
+
+    class Meta:
+        unique_together = ['dimension', 'bucket', 'value']
+        ordering = ['-bucket', 'dimension', '-hits']
+        verbose_name = _("Zdroj návštěv za den")
+        verbose_name_plural = _("Zdroje návštěv za den")
+
+    def __str__(self):
+        return f"{self.dimension}={self.value or '-'} {self.bucket}: {self.hits}"
+
+class PageVisitSketch(models.Model):
+    """HyperLogLog sketch of visitor IPs per page and day (see football.hll)"""
+    page_name = models.CharField(max_length=100, verbose_name=_("Název stránky"))
+    day = models.DateField(db_index=True, verbose_name=_("Den"))
+    registers = models.BinaryField(verbose_name=_("Registry"))
+
+    class Meta:
+        unique_together = ['page_name', 'day']
+        verbose_name = _("Odhad unikátních návštěvníků")
+        verbose_name_plural = _("Odhady unikátních návštěvníků")
+
+    def __str__(self):
+        return f"{self.page_name} - {self.day}"
+
+    @property
+    def sketch(self):
+        from .hll import HyperLogLog
+        return HyperLogLog.from_bytes(self.registers)
+
+class RollupCheckpoint(models.Model):
+    """High-water mark of raw rows already folded into a rollup"""
+    name = models.CharField(max_length=50, unique=True, verbose_name=_("Název"))
+    last_id = models.BigIntegerField(default=0, verbose_name=_("Poslední zpracované ID"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Aktualizováno"))
+
+    class Meta:
+        verbose_name = _("Stav agregace")
+        verbose_name_plural = _("Stav agregace")
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
+class ImageBackfillCheckpoint(models.Model):
+    """Progress of backfill_images per image source (model field or the CKEditor upload directory)"""
+    source = models.CharField(max_length=100, unique=True, verbose_name=_("Zdroj"))
+    last_id = models.BigIntegerField(default=0, verbose_name=_("Poslední zpracované ID"))
+    last_key = models.CharField(max_length=500, blank=True, verbose_name=_("Poslední zpracovaný soubor"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Aktualizováno"))
+
+    class Meta:
+        verbose_name = _("Stav převodu obrázků")
+        verbose_name_plural = _("Stav převodu obrázků")
+
+    def __str__(self):
+        return f"{self.source}: {self.last_key or self.last_id}"
+
 class MainPage(models.Model):
     """Single model instance to control main page content"""
     featured_news = models.ManyToManyField(News, blank=True, verbose_name=_("Doporučené aktuality"), limit_choices_to={'published': True})
@@ -357,13 +624,13 @@ class MainPage(models.Model):
     
     def get_upcoming_match(self):
         from django.utils import timezone
-        from django.db.models import Q
         # Earliest upcoming match where the club participates (home or away)
         return (
             Match.objects.filter(
-                date__gte=timezone.now()
+                date__gte=timezone.now(),
+                involves_club=True,
             )
-            .filter(Q(home_team__is_club_team=True) | Q(away_team__is_club_team=True))
+            .select_related('home_team', 'away_team', 'league')
             .order_by('date')
             .first()
         )
@@ -373,13 +640,13 @@ class MainPage(models.Model):
         return Match.objects.filter(
             date__lt=timezone.now(),
             home_score__isnull=False,
-            away_score__isnull=False
-        ).filter(
-            models.Q(home_team__is_club_team=True) | models.Q(away_team__is_club_team=True)
-        )[:2]
+            away_score__isnull=False,
+            involves_club=True,
+        ).select_related('home_team', 'away_team', 'league')[:2]
     
     def get_club_standing(self):
-        club_team = Team.objects.filter(is_club_team=True).first()
+        from .clubcontext import get_club_team
+        club_team = get_club_team()
         if club_team:
             try:
                 standing = Standing.objects.get(team=club_team)
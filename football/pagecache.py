@@ -0,0 +1,141 @@
+"""Full-page cache for anonymous visitors with conditional GET support.
+
+``cache_public_page`` stores the rendered body of a public view in the
+shared cache, keyed by the path, the query parameters the views read
+(``QUERY_PARAMS``) and the version counters of the models the page is built
+from (the same counters the home page fragments use, see
+``football.fragments``). A save or delete of one of
+those models bumps its counter, so the next request renders afresh.
+
+Each cached page carries a strong ETag (a hash of the body) and a
+Last-Modified time taken from the newest relevant row or model change.
+Visitors that send them back get ``304 Not Modified`` without a render,
+and a cache hit never touches the database. Authenticated users, non-GET
+requests, requests with any other query parameter (so random query strings
+cannot fill the cache) and responses other than a plain 200 bypass the cache.
+"""
+import hashlib
+from functools import wraps
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, urlencode
+
+from .fragments import last_changed, model_versions
+
+PAGE_KEY = 'page:{}:{}'
+DEFAULTS = {
+    'ENABLED': True,
+    'TIMEOUT': 60 * 60 * 24,
+}
+# Timestamp field used for Last-Modified, per model
+MODIFIED_FIELDS = {
+    'News': 'updated_at',
+    'Match': 'updated_at',
+    'Standing': 'updated_at',
+    'Gallery': 'uploaded_at',
+    'GalleryAlbum': 'created_at',
+}
+# page name -> (models the page is built from, timeout or None for PAGE_CACHE['TIMEOUT'])
+PAGES = {
+    'home': (('News', 'Match', 'Standing', 'Team', 'League', 'ClubInfo', 'MainPage'), 60 * 10),
+    'news_list': (('News',), None),
+    'matches': (('Match', 'Team', 'League'), 60 * 10),
+    'standings': (('Standing', 'Team', 'League'), None),
+    'gallery': (('GalleryAlbum', 'Gallery', 'Event'), None),
+}
+# Query parameters the cached views read; requests with any other parameter are not cached
+QUERY_PARAMS = frozenset(('season', 'league', 'league_id', 'after', 'recent_after', 'upcoming_after', 'list'))
+# Models whose saves bump a version (connected in football.signals)
+PAGE_MODELS = sorted({model for models, _ in PAGES.values() for model in models})
+
+
+def get_page_cache_settings():
+    """Return PAGE_CACHE merged over the defaults"""
+    conf = dict(DEFAULTS)
+    conf.update(getattr(settings, 'PAGE_CACHE', {}))
+    return conf
+
+
+def last_modified(models):
+    """Unix time of the newest row or change of the given models, or None"""
+    times = []
+    for name in models:
+        field = MODIFIED_FIELDS.get(name)
+        if field:
+            newest = apps.get_model('football', name)._default_manager.aggregate(newest=Max(field))['newest']
+            if newest:
+                times.append(newest.timestamp())
+    changed = last_changed(models)
+    if changed:
+        times.append(changed)
+    return int(max(times)) if times else None
+
+
+def _cacheable(request):
+    if request.method not in ('GET', 'HEAD') or not QUERY_PARAMS.issuperset(request.GET):
+        return False
+    # Only look at the user when a session exists; loading it costs queries
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and request.user.is_authenticated:
+        return False
+    return True
+
+
+def _render(view, request, args, kwargs, models):
+    response = view(request, *args, **kwargs)
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return response, None
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    entry = {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'etag': f'"{hashlib.md5(response.content).hexdigest()}"',
+        'last_modified': last_modified(models),
+    }
+    return response, entry
+
+
+def cache_public_page(name):
+    """
+    Cache a public view for anonymous visitors until one of the models of page ``name`` changes.
+
+    Usage: @cache_public_page('standings') on a function view, or
+    method_decorator(cache_public_page('news_list'), name='dispatch') on a class-based view.
+    Pages that also depend on the clock declare a shorter timeout in ``PAGES``.
+    """
+    models, timeout = PAGES[name]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            conf = get_page_cache_settings()
+            if not conf['ENABLED'] or not _cacheable(request):
+                return view(request, *args, **kwargs)
+
+            versions = ':'.join(map(str, model_versions(models)))
+            query = urlencode(sorted(request.GET.lists()), doseq=True)
+            key = PAGE_KEY.format(name, hashlib.md5(f"{request.path}?{query}|{versions}".encode()).hexdigest())
+            entry = cache.get(key)
+            if entry is None:
+                response, entry = _render(view, request, args, kwargs, models)
+                if entry is None:
+                    return response
+                cache.set(key, entry, timeout or conf['TIMEOUT'])
+
+            response = get_conditional_response(
+                request, etag=entry['etag'], last_modified=entry['last_modified'],
+            ) or HttpResponse(entry['content'], content_type=entry['content_type'])
+            response['ETag'] = entry['etag']
+            if entry['last_modified']:
+                response['Last-Modified'] = http_date(entry['last_modified'])
+            # Browsers keep the page but ask again every time, which is where the 304s come from
+            patch_cache_control(response, max_age=0, must_revalidate=True)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,194 @@
+"""Multi-resolution JPEG/WebP renditions of uploaded images.
+
+Renditions live under ``MEDIA_ROOT/renditions`` and are named after the
+SHA-256 of the source bytes plus the spec (width, quality, format), so a
+replaced image never serves stale files and identical uploads share them.
+They are generated by the image job worker, which also writes a small JSON
+manifest listing them. Templates use the ``picture`` tag from
+``football.templatetags.renditions``; it finds the manifest through the hash
+in the content-addressed file name (see ``football.storage``), so rendering
+never reads or hashes the original and never writes anything. Every source
+also gets a 96px WebP micro-thumbnail for the admin changelist previews.
+"""
+import json
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .storage import name_digest
+
+DEFAULTS = {
+    'WIDTHS': (64, 128, 256, 480, 800, 1200),
+    'FORMATS': ('jpeg', 'webp'),
+    'JPEG_QUALITY': 82,
+    'WEBP_QUALITY': 80,
+}
+RENDITION_DIR = 'renditions'
+THUMBNAIL_SIZE = 96  # admin changelist previews
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+META_TIMEOUT = 60 * 60 * 24
+
+
+def get_rendition_settings():
+    conf = dict(DEFAULTS)
+    conf.update(getattr(settings, 'IMAGE_RENDITIONS', {}))
+    return conf
+
+
+def content_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def target_widths(source_width, widths=None):
+    """Configured widths below the source width, plus the source width itself if smaller than the largest"""
+    widths = sorted(widths or get_rendition_settings()['WIDTHS'])
+    chosen = [w for w in widths if w < source_width]
+    if source_width <= widths[-1]:
+        chosen.append(source_width)
+    return chosen
+
+
+def rendition_name(digest, width, fmt, conf=None):
+    conf = conf or get_rendition_settings()
+    quality = conf['JPEG_QUALITY'] if fmt == 'jpeg' else conf['WEBP_QUALITY']
+    return f"{RENDITION_DIR}/{digest[:2]}/{digest[:24]}-{width}w-q{quality}.{EXTENSIONS[fmt]}"
+
+
+def thumbnail_name(digest, conf=None, size=THUMBNAIL_SIZE):
+    conf = conf or get_rendition_settings()
+    return f"{RENDITION_DIR}/{digest[:2]}/{digest[:24]}-thumb{size}-q{conf['WEBP_QUALITY']}.webp"
+
+
+def manifest_name(digest):
+    return f"{RENDITION_DIR}/{digest[:2]}/{digest[:24]}-manifest.json"
+
+
+def _manifest_key(digest):
+    return f"rendition-manifest:{digest[:24]}"
+
+
+def read_manifest(name):
+    """Manifest of the stored file ``name`` (``{'jpeg': [[name, width], ...], 'webp': ..., 'thumbnail': name}``).
+
+    Empty until the renditions have been generated, and always empty for files
+    stored before content addressing (``dedupe_media`` renames those).
+    """
+    digest = name_digest(name)
+    if digest is None:
+        return {}
+    key = _manifest_key(digest)
+    manifest = cache.get(key)
+    if manifest is None:
+        try:
+            with open(os.path.join(settings.MEDIA_ROOT, manifest_name(digest)), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}  # not generated yet; not cached so the worker's result shows up at once
+        cache.set(key, manifest, META_TIMEOUT)
+    return manifest
+
+
+def stored_renditions(name):
+    """``{fmt: [(url, width), ...]}`` of the renditions listed in the manifest of ``name``"""
+    manifest = read_manifest(name)
+    return {
+        fmt: [(default_storage.url(rendition), width) for rendition, width in manifest[fmt]]
+        for fmt in EXTENSIONS if manifest.get(fmt)
+    }
+
+
+def thumbnail_url(name):
+    """URL of the admin micro-thumbnail of the stored file ``name``, or None if it does not exist yet"""
+    thumbnail = read_manifest(name).get('thumbnail')
+    return default_storage.url(thumbnail) if thumbnail else None
+
+
+def _write_manifest(digest, media_root, manifest):
+    dest = os.path.join(media_root, manifest_name(digest))
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, dest)
+    cache.delete(_manifest_key(digest))
+
+
+def _save(img, dest, fmt, conf):
+    tmp = f"{dest}.tmp"
+    if fmt == 'jpeg':
+        if img.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.convert('RGBA').split()[-1])
+            img = background
+        img.save(tmp, 'JPEG', quality=conf['JPEG_QUALITY'], optimize=True, progressive=True)
+    else:
+        img.save(tmp, 'WEBP', quality=conf['WEBP_QUALITY'], method=4)
+    os.replace(tmp, dest)
+
+
+def generate_renditions(path, media_root=None):
+    """Write all missing renditions of ``path`` and its manifest; returns the number of files written.
+
+    Runs in image job worker processes and does not touch the database.
+    """
+    conf = get_rendition_settings()
+    media_root = media_root or settings.MEDIA_ROOT
+    digest = content_hash(path)
+    written = 0
+    manifest = {'thumbnail': thumbnail_name(digest, conf)}
+    with Image.open(path) as src:
+        largest = max(conf['WIDTHS'])
+        if src.format == 'JPEG':
+            src.draft('RGB', (largest, largest))  # decode at reduced scale when possible
+        img = ImageOps.exif_transpose(src)
+        if img.mode not in ('RGB', 'RGBA', 'L'):
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        _write_thumbnail(img, digest, media_root, conf)
+        current = img
+        # Largest first, each step downscales the previous result
+        for width in sorted(target_widths(img.width, conf['WIDTHS']), reverse=True):
+            height = max(1, round(img.height * width / img.width))
+            if current.width != width:
+                current = current.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            for fmt in conf['FORMATS']:
+                name = rendition_name(digest, width, fmt, conf)
+                manifest.setdefault(fmt, []).insert(0, [name, width])
+                dest = os.path.join(media_root, name)
+                if os.path.exists(dest):
+                    continue
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                _save(current, dest, fmt, conf)
+                written += 1
+    _write_manifest(digest, media_root, manifest)
+    return written
+
+
+def _write_thumbnail(img, digest, media_root, conf, force=False):
+    dest = os.path.join(media_root, thumbnail_name(digest, conf))
+    if os.path.exists(dest) and not force:
+        return False
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    thumb = img.copy()
+    thumb.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS, reducing_gap=3.0)
+    _save(thumb, dest, 'webp', conf)
+    return True
+
+
+def generate_thumbnail(path, media_root=None, force=False):
+    """Write the admin micro-thumbnail of ``path``; returns True if written"""
+    conf = get_rendition_settings()
+    with Image.open(path) as src:
+        if src.format == 'JPEG':
+            src.draft('RGB', (THUMBNAIL_SIZE * 2, THUMBNAIL_SIZE * 2))
+        img = ImageOps.exif_transpose(src)
+        if img.mode not in ('RGB', 'RGBA', 'L'):
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        return _write_thumbnail(img, content_hash(path), media_root or settings.MEDIA_ROOT, conf, force)
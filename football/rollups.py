@@ -0,0 +1,175 @@
+"""Hourly/daily PageVisit rollups and raw-row retention.
+
+Aggregation is incremental: RollupCheckpoint stores the highest PageVisit id
+already folded in. Each run re-computes only the buckets covered by newer
+rows, from the raw rows of those buckets, so distinct IP counts stay exact.
+Retention only removes rows below the checkpoint, so no visit is lost from
+the rollups.
+"""
+import csv
+import gzip
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import PageVisit, PageVisitDaily, PageVisitHourly, PageVisitSourceDaily, RollupCheckpoint
+from .useragents import DEVICE_BOT
+
+CHECKPOINT_NAME = 'page_visits'
+DEFAULT_RETENTION_DAYS = 90
+
+
+def _bucket_rows(queryset, trunc):
+    return (
+        queryset.annotate(bucket=trunc)
+        .values('page_name', 'bucket')
+        .annotate(hits=Count('id'), unique_ips=Count('ip_address', distinct=True))
+        .order_by()
+    )
+
+
+def _source_rows(queryset, trunc):
+    """Daily hits per referrer host and per device type"""
+    per_day = queryset.annotate(bucket=trunc).order_by()
+    for row in per_day.values('bucket', 'referrer').annotate(hits=Count('id')):
+        yield {'dimension': 'referrer', 'value': row['referrer'], 'bucket': row['bucket'], 'hits': row['hits']}
+    # Bot hits never reach the raw table; the visit buffer adds them here directly
+    for row in per_day.values('bucket', 'device').annotate(hits=Count('id')):
+        yield {'dimension': 'device', 'value': row['device'], 'bucket': row['bucket'], 'hits': row['hits']}
+
+
+def _upsert(model, rows, unique_fields=('page_name', 'bucket'), update_fields=('hits', 'unique_ips')):
+    objs = [model(**row) for row in rows]
+    if objs:
+        model.objects.bulk_create(
+            objs,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=list(unique_fields),
+            update_fields=list(update_fields),
+        )
+    return len(objs)
+
+
+def _clear_rebuild_window():
+    """Delete the rollups of the days that still have raw rows; older days were pruned and are kept"""
+    first = PageVisit.objects.aggregate(first=Min('timestamp'))['first']
+    if first is None:
+        return
+    day_start = timezone.localtime(first).replace(hour=0, minute=0, second=0, microsecond=0)
+    PageVisitHourly.objects.filter(bucket__gte=day_start).delete()
+    PageVisitDaily.objects.filter(bucket__gte=day_start.date()).delete()
+    # Bot counts exist only in the rollup, keep them
+    (PageVisitSourceDaily.objects.filter(bucket__gte=day_start.date())
+     .exclude(dimension='device', value=DEVICE_BOT).delete())
+
+
+def aggregate_visits(rebuild=False):
+    """Fold new PageVisit rows into the hourly and daily rollups.
+
+    ``rebuild`` recomputes every bucket from the first day that still has raw
+    rows; buckets of pruned days cannot be recomputed and are left as they are.
+    Returns a dict with the processed id range and the number of buckets written.
+    """
+    with transaction.atomic():
+        checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+        if rebuild:
+            _clear_rebuild_window()
+            checkpoint.last_id = 0
+
+        new_rows = PageVisit.objects.filter(id__gt=checkpoint.last_id)
+        bounds = new_rows.aggregate(max_id=Max('id'), first=Min('timestamp'), last=Max('timestamp'))
+        if bounds['max_id'] is None:
+            return {'from_id': checkpoint.last_id, 'to_id': checkpoint.last_id, 'hourly': 0, 'daily': 0}
+
+        tz = timezone.get_current_timezone()
+        first = timezone.localtime(bounds['first'], tz)
+        last = timezone.localtime(bounds['last'], tz)
+        hour_start = first.replace(minute=0, second=0, microsecond=0)
+        day_start = hour_start.replace(hour=0)
+        day_end = last.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+        # Only rows up to max_id: visits flushed during this run wait for the next one
+        window = PageVisit.objects.filter(id__lte=bounds['max_id'])
+        hourly = _upsert(
+            PageVisitHourly,
+            _bucket_rows(window.filter(timestamp__gte=hour_start, timestamp__lt=day_end), TruncHour('timestamp', tzinfo=tz)),
+        )
+        days = window.filter(timestamp__gte=day_start, timestamp__lt=day_end)
+        daily = _upsert(PageVisitDaily, _bucket_rows(days, TruncDate('timestamp', tzinfo=tz)))
+        _upsert(
+            PageVisitSourceDaily,
+            _source_rows(days, TruncDate('timestamp', tzinfo=tz)),
+            unique_fields=('dimension', 'bucket', 'value'),
+            update_fields=('hits',),
+        )
+
+        from_id = checkpoint.last_id
+        checkpoint.last_id = bounds['max_id']
+        checkpoint.save(update_fields=['last_id', 'updated_at'])
+    return {'from_id': from_id, 'to_id': checkpoint.last_id, 'hourly': hourly, 'daily': daily}
+
+
+def get_retention_days():
+    return getattr(settings, 'PAGE_VISIT_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+
+
+def prune_visits(days=None, chunk_size=5000, archive_dir=None, dry_run=False):
+    """Delete raw PageVisit rows older than ``days`` in chunks.
+
+    Only rows already aggregated (id <= checkpoint) are touched. When
+    ``archive_dir`` is given, rows are appended to a gzip CSV file there
+    before deletion. Returns ``(rows, archive_path)``.
+    """
+    days = get_retention_days() if days is None else days
+    if days < 2:
+        # Buckets of the last day may still be re-computed from raw rows
+        raise ValueError("Retention must be at least 2 days")
+
+    checkpoint = RollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+    if checkpoint is None:
+        return 0, None
+
+    day_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff = day_start - timedelta(days=days)
+    expired = PageVisit.objects.filter(timestamp__lt=cutoff, id__lte=checkpoint.last_id)
+    if dry_run:
+        return expired.count(), None
+
+    archive_path = None
+    writer = None
+    archive = None
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+        archive_path = os.path.join(archive_dir, f"pagevisits-before-{cutoff:%Y%m%d}-{timezone.now():%Y%m%d%H%M%S}.csv.gz")
+        archive = gzip.open(archive_path, 'wt', newline='', encoding='utf-8')
+        writer = csv.writer(archive)
+        writer.writerow(['id', 'page_name', 'ip_address', 'device', 'referrer', 'timestamp'])
+
+    total = 0
+    last_id = 0
+    try:
+        while True:
+            chunk = list(
+                expired.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'page_name', 'ip_address', 'device', 'referrer', 'timestamp')[:chunk_size]
+            )
+            if not chunk:
+                break
+            ids = [row[0] for row in chunk]
+            if writer:
+                writer.writerows((pk, page, ip, device, ref, ts.isoformat()) for pk, page, ip, device, ref, ts in chunk)
+                archive.flush()
+            PageVisit.objects.filter(id__in=ids).delete()
+            total += len(ids)
+            last_id = ids[-1]
+    finally:
+        if archive:
+            archive.close()
+    return total, archive_path
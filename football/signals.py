@@ -0,0 +1,171 @@
+"""Signal handlers for the football app (connected in FootballConfig.ready)"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .storage import image_fields
+
+
+def _release_later(storage, name):
+    transaction.on_commit(lambda: storage.delete(name))
+
+
+def release_replaced_files(sender, instance, raw=False, **kwargs):
+    """Drop the reference to a file that is being replaced or cleared.
+
+    The previous names are kept on ``instance._previous_files`` so ``save()``
+    only queues image jobs for files that actually changed.
+    """
+    instance._previous_files = {}
+    if raw or instance._state.adding or not instance.pk:
+        return
+    fields = [f for model, f in image_fields() if model is sender]
+    old = sender._default_manager.filter(pk=instance.pk).values(*[f.attname for f in fields]).first()
+    if not old:
+        return
+    instance._previous_files = old
+    for field in fields:
+        previous = old[field.attname]
+        current = getattr(instance, field.attname)
+        current = current.name if current else ''
+        if previous and previous != current:
+            _release_later(field.storage, previous)
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    for model, field in image_fields():
+        if model is sender:
+            field_file = getattr(instance, field.attname)
+            if field_file:
+                _release_later(field.storage, field_file.name)
+
+
+def invalidate_album_download(sender, instance, **kwargs):
+    """Drop cached album ZIPs when a photo is saved or removed.
+
+    Bulk-created photos bypass signals; the fingerprint in the cache file name covers them.
+    """
+    from .albumzip import invalidate_album_zip
+
+    if instance.album_id:
+        invalidate_album_zip(instance.album_id)
+
+
+def remember_album(sender, instance, raw=False, **kwargs):
+    """Note the album a photo is moving out of, so both albums get their stats refreshed"""
+    instance._previous_album_id = None
+    if not raw and not instance._state.adding and instance.pk:
+        instance._previous_album_id = (
+            sender._default_manager.filter(pk=instance.pk).values_list('album_id', flat=True).first()
+        )
+
+
+def refresh_album(sender, instance, raw=False, **kwargs):
+    from .models import refresh_album_stats
+
+    if raw:
+        return
+    refresh_album_stats({instance.album_id, getattr(instance, '_previous_album_id', None)})
+
+
+def remember_club_flag(sender, instance, raw=False, **kwargs):
+    """Note whether a team's is_club_team flag is changing"""
+    instance._club_flag_changed = False
+    if not raw and not instance._state.adding and instance.pk:
+        previous = sender._default_manager.filter(pk=instance.pk).values_list('is_club_team', flat=True).first()
+        instance._club_flag_changed = previous is not None and previous != instance.is_club_team
+
+
+def refresh_club_flag(sender, instance, raw=False, **kwargs):
+    from .models import refresh_club_matches
+
+    if not raw and getattr(instance, '_club_flag_changed', False):
+        refresh_club_matches({instance.pk})
+
+
+def _match_state(match):
+    return (match.league_id, match.home_team_id, match.away_team_id, match.home_score, match.away_score)
+
+
+def remember_match_result(sender, instance, raw=False, **kwargs):
+    """Note the league, teams and score a match had before this save"""
+    instance._previous_state = None
+    if not raw and not instance._state.adding and instance.pk:
+        instance._previous_state = sender._default_manager.filter(pk=instance.pk).values_list(
+            'league_id', 'home_team_id', 'away_team_id', 'home_score', 'away_score').first()
+
+
+def update_standings(sender, instance, raw=False, **kwargs):
+    from .standings import apply_match_change
+
+    if raw:
+        return
+    if kwargs.get('signal') is post_delete:
+        apply_match_change(_match_state(instance), None)
+    else:
+        apply_match_change(getattr(instance, '_previous_state', None), _match_state(instance))
+
+
+def remember_standings_flag(sender, instance, raw=False, **kwargs):
+    instance._was_from_matches = None
+    if not raw and not instance._state.adding and instance.pk:
+        instance._was_from_matches = sender._default_manager.filter(pk=instance.pk).values_list(
+            'standings_from_matches', flat=True).first()
+
+
+def rebuild_enabled_standings(sender, instance, raw=False, **kwargs):
+    """Build the table from scratch when a league switches to computed standings"""
+    from .standings import rebuild_league
+
+    if not raw and instance.standings_from_matches and not getattr(instance, '_was_from_matches', None):
+        rebuild_league(instance.pk)
+
+
+def club_context_changed(sender, **kwargs):
+    from .clubcontext import invalidate_club_context
+
+    transaction.on_commit(invalidate_club_context)
+
+
+def fragments_changed(sender, **kwargs):
+    """Bump the fragment and page cache version of the saved or deleted model"""
+    from .fragments import bump_version
+
+    name = sender.__name__
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def connect():
+    from django.apps import apps
+
+    from .fragments import VERSIONED_MODELS
+    from .pagecache import PAGE_MODELS
+    from .models import ClubInfo, Gallery, League, MainPage, Match, Team
+
+    for model in (Team, ClubInfo, MainPage):
+        post_save.connect(club_context_changed, sender=model, dispatch_uid=f"club_context_save_{model.__name__}")
+        post_delete.connect(club_context_changed, sender=model, dispatch_uid=f"club_context_delete_{model.__name__}")
+
+    for name in sorted(set(VERSIONED_MODELS) | set(PAGE_MODELS)):
+        model = apps.get_model('football', name)
+        post_save.connect(fragments_changed, sender=model, dispatch_uid=f"fragments_save_{name}")
+        post_delete.connect(fragments_changed, sender=model, dispatch_uid=f"fragments_delete_{name}")
+
+    pre_save.connect(remember_club_flag, sender=Team, dispatch_uid="team_remember_club_flag")
+    post_save.connect(refresh_club_flag, sender=Team, dispatch_uid="team_refresh_club_flag")
+
+    pre_save.connect(remember_standings_flag, sender=League, dispatch_uid="league_remember_standings_flag")
+    post_save.connect(rebuild_enabled_standings, sender=League, dispatch_uid="league_rebuild_standings")
+    pre_save.connect(remember_match_result, sender=Match, dispatch_uid="match_remember_result")
+    post_save.connect(update_standings, sender=Match, dispatch_uid="match_update_standings_save")
+    post_delete.connect(update_standings, sender=Match, dispatch_uid="match_update_standings_delete")
+
+    pre_save.connect(remember_album, sender=Gallery, dispatch_uid="gallery_remember_album")
+    post_save.connect(refresh_album, sender=Gallery, dispatch_uid="gallery_refresh_album_save")
+    post_delete.connect(refresh_album, sender=Gallery, dispatch_uid="gallery_refresh_album_delete")
+
+    post_save.connect(invalidate_album_download, sender=Gallery, dispatch_uid="gallery_album_zip_save")
+    post_delete.connect(invalidate_album_download, sender=Gallery, dispatch_uid="gallery_album_zip_delete")
+
+    for model in {model for model, _ in image_fields()}:
+        pre_save.connect(release_replaced_files, sender=model, dispatch_uid=f"release_replaced_{model.__name__}")
+        post_delete.connect(release_deleted_files, sender=model, dispatch_uid=f"release_deleted_{model.__name__}")
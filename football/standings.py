@@ -0,0 +1,255 @@
+"""Standings computed from match results.
+
+Leagues with ``League.standings_from_matches`` set get their Standing rows
+from finished matches instead of manual input. A team appears in the table
+once it has any match in the league; played/won/drawn/lost, goals and points
+count finished matches only.
+
+Saving or deleting a single Match applies only its own difference: the old
+result (if any) is subtracted from and the new one added to the two teams'
+rows with ``F()`` updates, then the league is re-ranked from its Standing
+rows. Matches are only read again to break ties head-to-head, and then only
+the matches among the tied teams. ``rebuild_league`` recomputes everything
+from scratch; the ``rebuild_standings`` command uses it to repair tables or
+to verify that the incremental rows agree with a full rebuild.
+
+Ranking follows ``STANDINGS['TIE_BREAKERS']`` in order. ``head_to_head``
+builds a mini table (points, goal difference, goals scored) from the matches
+among the teams still tied at that step. Teams that remain tied are ordered
+by name.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+POINTS = 'points'
+HEAD_TO_HEAD = 'head_to_head'
+GOAL_DIFFERENCE = 'goal_difference'
+GOALS_FOR = 'goals_for'
+WINS = 'won'
+TIE_BREAKERS = (POINTS, HEAD_TO_HEAD, GOAL_DIFFERENCE, GOALS_FOR, WINS)
+
+DEFAULTS = {
+    'POINTS_WIN': 3,
+    'POINTS_DRAW': 1,
+    # FAČR order: points, mutual matches, overall goal difference, goals scored
+    'TIE_BREAKERS': [POINTS, HEAD_TO_HEAD, GOAL_DIFFERENCE, GOALS_FOR],
+}
+STAT_FIELDS = ('played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against', 'points')
+
+
+def get_standings_settings():
+    """Return STANDINGS merged over the defaults"""
+    conf = dict(DEFAULTS)
+    conf.update(getattr(settings, 'STANDINGS', {}))
+    unknown = set(conf['TIE_BREAKERS']) - set(TIE_BREAKERS)
+    if unknown:
+        raise ValueError(f"Unknown STANDINGS TIE_BREAKERS: {', '.join(sorted(unknown))}")
+    return conf
+
+
+def _empty():
+    return dict.fromkeys(STAT_FIELDS, 0)
+
+
+def result_stats(goals_for, goals_against, conf):
+    """Stat increments of one finished match for one team"""
+    won, drawn = goals_for > goals_against, goals_for == goals_against
+    return {
+        'played': 1,
+        'won': int(won),
+        'drawn': int(drawn),
+        'lost': int(not won and not drawn),
+        'goals_for': goals_for,
+        'goals_against': goals_against,
+        'points': conf['POINTS_WIN'] if won else conf['POINTS_DRAW'] if drawn else 0,
+    }
+
+
+def _mini_table(team_ids, matches, conf):
+    table = {pk: _empty() for pk in team_ids}
+    for home, away, home_score, away_score in matches:
+        if home in table and away in table:
+            for team, gf, ga in ((home, home_score, away_score), (away, away_score, home_score)):
+                for field, value in result_stats(gf, ga, conf).items():
+                    table[team][field] += value
+    return {pk: (row['points'], row['goals_for'] - row['goals_against'], row['goals_for'])
+            for pk, row in table.items()}
+
+
+def rank(stats, names, load_mutual, conf):
+    """
+    Team ids ordered by the configured tie-breakers.
+
+    ``stats`` maps team id to a stats dict, ``names`` team id to name and
+    ``load_mutual(team_ids)`` returns ``(home, away, home_score, away_score)``
+    tuples of finished matches among those teams.
+    """
+    def value(criterion, team_ids):
+        if criterion == HEAD_TO_HEAD:
+            return _mini_table(team_ids, load_mutual(team_ids), conf).get
+        if criterion == GOAL_DIFFERENCE:
+            return lambda pk: stats[pk]['goals_for'] - stats[pk]['goals_against']
+        return lambda pk: stats[pk][criterion]
+
+    def order(team_ids, criteria):
+        if len(team_ids) < 2 or not criteria:
+            return sorted(team_ids, key=lambda pk: (names.get(pk, ''), pk))
+        key = value(criteria[0], team_ids)
+        groups = defaultdict(list)
+        for pk in team_ids:
+            groups[key(pk)].append(pk)
+        ordered = []
+        for group_key in sorted(groups, reverse=True):
+            ordered.extend(order(groups[group_key], criteria[1:]))
+        return ordered
+
+    return order(list(stats), list(conf['TIE_BREAKERS']))
+
+
+def _finished(league_id):
+    from .models import Match
+
+    return Match.objects.filter(league_id=league_id, home_score__isnull=False, away_score__isnull=False)
+
+
+def _mutual_loader(league_id):
+    def load(team_ids):
+        return list(_finished(league_id).filter(home_team__in=team_ids, away_team__in=team_ids)
+                    .values_list('home_team_id', 'away_team_id', 'home_score', 'away_score'))
+    return load
+
+
+def _team_names(team_ids):
+    from .models import Team
+
+    return dict(Team.objects.filter(pk__in=team_ids).values_list('pk', 'name'))
+
+
+def compute_league(league_id, conf=None):
+    """Full table of a league from its matches: ``{team_id: stats dict with 'position'}``"""
+    from .models import Match
+
+    conf = conf or get_standings_settings()
+    stats = {}
+    results = []
+    matches = Match.objects.filter(league_id=league_id).values_list(
+        'home_team_id', 'away_team_id', 'home_score', 'away_score')
+    for home, away, home_score, away_score in matches.iterator():
+        for team in (home, away):
+            stats.setdefault(team, _empty())
+        if home_score is None or away_score is None:
+            continue
+        results.append((home, away, home_score, away_score))
+        for team, gf, ga in ((home, home_score, away_score), (away, away_score, home_score)):
+            for field, value in result_stats(gf, ga, conf).items():
+                stats[team][field] += value
+
+    def load_mutual(team_ids):
+        team_ids = set(team_ids)
+        return [r for r in results if r[0] in team_ids and r[1] in team_ids]
+
+    for position, team in enumerate(rank(stats, _team_names(stats), load_mutual, conf), start=1):
+        stats[team]['position'] = position
+    return stats
+
+
+def stored_league(league_id):
+    """Current Standing rows of a league in the same shape as ``compute_league``"""
+    from .models import Standing
+
+    rows = Standing.objects.filter(league_id=league_id).values('team_id', 'position', *STAT_FIELDS)
+    return {row.pop('team_id'): row for row in rows}
+
+
+def rebuild_league(league_id, conf=None):
+    """Replace the Standing rows of a league with a full recomputation; returns the table"""
+    from .models import Standing
+
+    table = compute_league(league_id, conf)
+    with transaction.atomic():
+        Standing.objects.filter(league_id=league_id).exclude(team_id__in=list(table)).delete()
+        for team_id, row in table.items():
+            Standing.objects.update_or_create(league_id=league_id, team_id=team_id, defaults=row)
+    return table
+
+
+def rerank_league(league_id, conf=None):
+    """Recompute positions of a league from its Standing rows (reads matches only for head-to-head ties)"""
+    from .models import Standing
+
+    conf = conf or get_standings_settings()
+    rows = {row.team_id: row for row in Standing.objects.filter(league_id=league_id).select_related('team')}
+    stats = {pk: {field: getattr(row, field) for field in STAT_FIELDS} for pk, row in rows.items()}
+    names = {pk: row.team.name for pk, row in rows.items()}
+    changed = []
+    for position, team in enumerate(rank(stats, names, _mutual_loader(league_id), conf), start=1):
+        if rows[team].position != position:
+            rows[team].position = position
+            changed.append(rows[team])
+    Standing.objects.bulk_update(changed, ['position'])
+    return len(changed)
+
+
+def _apply(league_id, home, away, home_score, away_score, sign, conf):
+    from .models import Standing
+
+    for team, gf, ga in ((home, home_score, away_score), (away, away_score, home_score)):
+        delta = {field: F(field) + sign * value for field, value in result_stats(gf, ga, conf).items()}
+        Standing.objects.filter(league_id=league_id, team_id=team).update(**delta)
+
+
+def _ensure_rows(league_id, team_ids):
+    from .models import Standing
+
+    existing = set(Standing.objects.filter(league_id=league_id, team_id__in=team_ids).values_list('team_id', flat=True))
+    last = Standing.objects.filter(league_id=league_id).count()
+    Standing.objects.bulk_create(
+        Standing(league_id=league_id, team_id=team, position=last + i)
+        for i, team in enumerate(sorted(set(team_ids) - existing), start=1)
+    )
+
+
+def _drop_orphans(league_id, team_ids):
+    """Remove rows of teams that no longer have any match in the league"""
+    from .models import Match, Standing
+
+    for team in team_ids:
+        if not Match.objects.filter(Q(home_team_id=team) | Q(away_team_id=team), league_id=league_id).exists():
+            Standing.objects.filter(league_id=league_id, team_id=team).delete()
+
+
+def managed_league_ids(league_ids):
+    from .models import League
+
+    return set(League.objects.filter(pk__in=[pk for pk in league_ids if pk], standings_from_matches=True)
+               .values_list('pk', flat=True))
+
+
+def apply_match_change(old, new):
+    """
+    Update standings for one match changing from ``old`` to ``new``.
+
+    Both are ``(league_id, home_id, away_id, home_score, away_score)`` tuples or
+    None (created / deleted match). Only leagues with standings_from_matches are touched.
+    """
+    from .fragments import bump_version
+
+    managed = managed_league_ids([state[0] for state in (old, new) if state])
+    if not managed or old == new:
+        return
+    conf = get_standings_settings()
+    with transaction.atomic():
+        if new and new[0] in managed:
+            _ensure_rows(new[0], new[1:3])
+        for state, sign in ((old, -1), (new, 1)):
+            if state and state[0] in managed and state[3] is not None and state[4] is not None:
+                _apply(*state, sign, conf)
+        if old and old[0] in managed:
+            _drop_orphans(old[0], old[1:3])
+        for league_id in managed:
+            rerank_league(league_id, conf)
+    # The F() updates bypass the Standing signals that invalidate cached pages
+    transaction.on_commit(lambda: bump_version('Standing'))
@@ -0,0 +1,154 @@
+"""Content-addressed, reference-counted media storage.
+
+Image fields store their files as ``<upload_to>/<h[:2]>/<h[:32]><ext>``
+where ``h`` is the SHA-256 of the uploaded bytes, so the same photo uploaded
+to several albums is kept on disk once. Every ``save()`` adds a reference in
+``MediaBlob`` and every ``delete()`` drops one; the file is removed with the
+last reference. A stored file is never modified; rewritten images go through
+``store_rewritten`` and get a name of their own. Model rows release their
+files through the signal handlers in ``football.signals``. Files stored before this backend existed have no
+``MediaBlob`` row and are never deleted here; ``dedupe_media`` rehashes them.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.core.files.storage import FileSystemStorage
+
+
+# <dir>/<h[:2]>/<h[:32]><ext>
+HASHED_NAME = re.compile(r'(?:^|/)([0-9a-f]{2})/(\1[0-9a-f]{30})(?:\.[^/.]*)?$')
+
+
+def name_digest(name):
+    """SHA-256 prefix (32 hex digits) of a content-addressed file name, or None for other names"""
+    match = HASHED_NAME.search(name or '')
+    return match.group(2) if match else None
+
+
+def hash_file(content, chunk_size=1024 * 1024):
+    """(sha256 hex digest, size) of a Django File, rewound afterwards"""
+    digest = hashlib.sha256()
+    size = 0
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(chunk_size):
+        digest.update(chunk)
+        size += len(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest(), size
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and counts references"""
+
+    def __init__(self, **kwargs):
+        # Identical names mean identical bytes, so overwriting is harmless
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def hashed_name(self, name, digest):
+        dirname, basename = posixpath.split(name.replace('\\', '/'))
+        ext = os.path.splitext(basename)[1].lower()
+        return posixpath.join(dirname, digest[:2], f"{digest[:32]}{ext}")
+
+    def _save(self, name, content):
+        digest, size = hash_file(content)
+        name = self.hashed_name(name, digest)
+        if not self.exists(name):
+            name = super()._save(name, content)
+        retain(name, digest, size)
+        return name
+
+    def delete(self, name, references=1):
+        """Drop ``references`` references to ``name``; the file goes with the last one"""
+        if name and release(name, references):
+            super().delete(name)
+
+
+def upload_dir(name):
+    """Directory ``name`` was uploaded to, without the hash subdirectory of content-addressed names"""
+    dirname = posixpath.dirname(name)
+    return posixpath.dirname(dirname) if name_digest(name) else dirname
+
+
+def store_rewritten(storage, rows, attname, old_name, content):
+    """
+    Store ``content`` as the new version of ``old_name`` and point ``rows`` at it.
+
+    Content-addressed files must never change in place, so a resized or
+    recompressed image is saved like a new upload, under the hash of its new
+    bytes. Rows of the queryset ``rows`` whose ``attname`` still is
+    ``old_name`` are moved to the new file, one reference each; the old file
+    keeps its bytes for everybody else. Returns ``(new name, rows moved)``.
+    """
+    from .models import MediaBlob
+
+    new_name = storage.save(posixpath.join(upload_dir(old_name), posixpath.basename(old_name)), content)
+    if new_name == old_name:
+        storage.delete(new_name)  # same bytes; undo the reference save() added
+        return old_name, 0
+    with transaction.atomic():
+        moved = rows.filter(**{attname: old_name}).update(**{attname: new_name})
+        if moved > 1:
+            MediaBlob.objects.filter(name=new_name).update(refcount=F('refcount') + moved - 1)
+        if moved:
+            transaction.on_commit(lambda: storage.delete(old_name, moved))
+        else:
+            transaction.on_commit(lambda: storage.delete(new_name))
+    return new_name, moved
+
+
+def retain(name, digest, size):
+    """Add one reference to the blob stored as ``name``"""
+    from .models import MediaBlob
+
+    with transaction.atomic():
+        if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1):
+            return
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(name=name, sha256=digest, size=size, refcount=1)
+        except IntegrityError:  # created concurrently
+            MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def release(name, count=1):
+    """Drop ``count`` references to ``name``; True when the file is no longer referenced"""
+    from .models import MediaBlob
+
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return False  # not tracked (stored before deduplication), keep it
+        if blob.refcount > count:
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - count)
+            return False
+        blob.delete()
+    return True
+
+
+_storage = None
+
+
+def get_media_storage():
+    """Storage used by the image fields (a callable so migrations stay stable)"""
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
+
+
+def image_fields():
+    """(model, field) for every file field backed by the content-addressed storage"""
+    from django.apps import apps
+    from django.db.models import FileField
+
+    for model in apps.get_app_config('football').get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field
@@ -0,0 +1,44 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from football.fragments import FRAGMENTS, get_fragment, set_fragment
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, name, nodelist, vary_on):
+        self.name = name
+        self.nodelist = nodelist
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key, markup = get_fragment(self.name, vary_on)
+        if markup is None:
+            markup = self.nodelist.render(context)
+            set_fragment(self.name, key, markup)
+        return mark_safe(markup)
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Cache the enclosed markup under a fragment declared in football.fragments.FRAGMENTS.
+
+    Usage: {% fragment "home_latest_news" [vary_on ...] %} ... {% endfragment %}
+    The key changes whenever one of the fragment's models is saved or deleted.
+    Context values used inside should be lazy, so a hit runs no queries.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name")
+    name = bits[1]
+    if not (name[0] == name[-1] and name[0] in ('"', "'")):
+        raise template.TemplateSyntaxError(f"'{bits[0]}' fragment name must be a quoted string")
+    name = name[1:-1]
+    if name not in FRAGMENTS:
+        raise template.TemplateSyntaxError(f"Unknown fragment '{name}'")
+    nodelist = parser.parse(("endfragment",))
+    parser.delete_first_token()
+    return FragmentNode(name, nodelist, [parser.compile_filter(bit) for bit in bits[2:]])
@@ -0,0 +1,52 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from football.renditions import stored_renditions
+
+register = template.Library()
+
+
+def _srcset(items):
+    return ", ".join(f"{url} {width}w" for url, width in items)
+
+
+def _attrs(attrs):
+    return format_html_join(
+        "", ' {}="{}"', ((name.replace("_", "-"), value) for name, value in attrs.items() if value is not None)
+    )
+
+
+@register.simple_tag
+def picture(field_file, sizes="100vw", alt="", **attrs):
+    """
+    Render a <picture> with WebP and JPEG srcsets for an ImageField value.
+
+    Usage: {% picture news.image sizes="(min-width: 1024px) 33vw, 100vw" alt=news.title class="..." %}
+    Extra keyword arguments become <img> attributes (underscores turn into hyphens).
+    Falls back to a plain <img> of the original until the image job has written the
+    renditions; rendering only reads their manifest and never queues work.
+    """
+    if not field_file:
+        return ""
+    try:
+        original = field_file.url
+    except ValueError:
+        return ""
+
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    found = stored_renditions(field_file.name)
+
+    jpeg = found.get("jpeg")
+    if not jpeg:
+        return format_html('<img src="{}" alt="{}"{}>', original, alt, _attrs(attrs))
+
+    fallback = jpeg[-1][0]
+    sources = mark_safe("")
+    if found.get("webp"):
+        sources = format_html('<source type="image/webp" srcset="{}" sizes="{}">', _srcset(found["webp"]), sizes)
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        sources, fallback, _srcset(jpeg), sizes, alt, _attrs(attrs),
+    )
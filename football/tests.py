@@ -1,3 +1,1117 @@
-from django.test import TestCase
+import csv
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import clubcontext
+from .analytics import MAX_RANGE_DAYS, unique_visitors
+from .exports import MATCH_FIELDS, VISIT_FIELDS
+from .fragments import VERSIONED_MODELS, fragment_stats, reset_stats
+from .hll import HyperLogLog
+from .imagejobs import run_worker_batch
+from .ingest import ingest_archive, ingest_images
+from .models import (
+    BulkImageUpload, Gallery, GalleryAlbum, ImageBackfillCheckpoint, ImageJob, League, Match, MediaBlob, News,
+    PageVisit, PageVisitDaily, PageVisitSketch, PageVisitSourceDaily, Standing, Team,
+)
+from .mediagc import iter_media_files
+from .renditions import generate_renditions, read_manifest, thumbnail_url
+from .rollups import aggregate_visits, prune_visits
+from .standings import compute_league, rebuild_league, stored_league
+from .storage import name_digest, store_rewritten
+from .useragents import classify_user_agent
+from .visits import (
+    DROP_NEWEST, DROP_OLDEST, FLUSH_NOW, VisitBuffer, _merge_sketch, add_bot_hits, get_visit_buffer, reset_visit_buffer,
+    update_visit_sketches,
+)
+
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 Chrome/126.0 Mobile Safari/537.36',
+]
+
+
+def seed_page_visits(count, days=60, seed=1):
+    """Bulk insert synthetic visits spread over the last ``days`` days"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    pages = ['home', 'news', 'matches', 'standings', 'gallery', 'team', 'club']
+    referrers = ['', '', 'www.google.com', 'www.facebook.com', 'www.fotbal.cz']
+    rows = [
+        PageVisit(
+            page_name=rng.choice(pages),
+            ip_address=f"10.{rng.randrange(4)}.{rng.randrange(256)}.{rng.randrange(256)}",
+            device=classify_user_agent(rng.choice(USER_AGENTS)),
+            referrer=rng.choice(referrers),
+            timestamp=now - timedelta(seconds=rng.randrange(days * 86400)),
+        )
+        for _ in range(count)
+    ]
+    PageVisit.objects.bulk_create(rows, batch_size=2000)
+    update_visit_sketches((row.page_name, row.ip_address, row.timestamp) for row in rows)
+    return rows
+
+
+# Views are rendered for their queries, so visits stay in memory instead of adding INSERTs
+BUFFERED_VISITS = {'ENABLED': True, 'FLUSH_INTERVAL': 3600}
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'football-tests'}},
+    IMAGE_JOBS={'SYNC': False},
+    PAGE_CACHE={'ENABLED': False},
+    PAGE_VISIT_BUFFER={'ENABLED': False},
+)
+class FootballTestCase(TestCase):
+    """Private cache, queued image jobs, no page cache and unbuffered visits unless a test class overrides them"""
+
+    def setUp(self):
+        cache.clear()
+        clubcontext._memo = None
+        # Queued visits would otherwise be flushed at exit, into the real database
+        self.addCleanup(reset_visit_buffer)
+
+
+class VisitAnalyticsDashboardTests(FootballTestCase):
+    ROWS = 50000
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_page_visits(cls.ROWS)
+        aggregate_visits()
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:football_pagevisit_analytics')
+
+    def test_rollups_cover_all_raw_rows(self):
+        total = sum(PageVisitDaily.objects.values_list('hits', flat=True))
+        self.assertEqual(total, self.ROWS)
+
+    def test_dashboard_query_count_is_constant(self):
+        # session, user, two singleton checks for the admin sidebar, five rollup queries, sketches, checkpoint
+        with self.assertNumQueries(11):
+            response = self.client.get(self.url, {'days': 365})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report']['total_hits'], self.ROWS)
+        with self.assertNumQueries(11):
+            self.client.get(self.url, {'days': 7})
+
+    def test_dashboard_does_not_scan_raw_visits(self):
+        with self.assertNumQueries(11) as ctx:
+            self.client.get(self.url)
+        self.assertFalse(any('"football_pagevisit"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_dashboard_latency(self):
+        self.client.get(self.url)  # warm templates
+        start = time.perf_counter()
+        response = self.client.get(self.url, {'days': 365})
+        elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 0.5)
+
+    def test_explicit_date_range(self):
+        today = timezone.localdate()
+        response = self.client.get(self.url, {'start': (today - timedelta(days=2)).isoformat(), 'end': today.isoformat()})
+        self.assertEqual(len(response.context['report']['visits_per_day']), 3)
+
+    def test_out_of_range_parameters_are_clamped(self):
+        response = self.client.get(self.url, {'days': 10 ** 9})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['days'], 30)
+        response = self.client.get(self.url, {'start': '0001-01-01', 'end': '0001-01-02'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, {'start': '1990-01-01'})
+        self.assertEqual(len(response.context['report']['visits_per_day']), MAX_RANGE_DAYS)
+
+
+class RollupRebuildTests(FootballTestCase):
+    def test_rebuild_keeps_history_of_pruned_days(self):
+        seed_page_visits(2000, days=30)
+        aggregate_visits()
+        first_day = min(PageVisitDaily.objects.values_list('bucket', flat=True))
+        total = sum(PageVisitDaily.objects.values_list('hits', flat=True))
+
+        prune_visits(days=10)
+        self.assertTrue(PageVisit.objects.exists())
+        aggregate_visits(rebuild=True)
+        self.assertEqual(sum(PageVisitDaily.objects.values_list('hits', flat=True)), total)
+        self.assertEqual(min(PageVisitDaily.objects.values_list('bucket', flat=True)), first_day)
+
+
+class HyperLogLogTests(FootballTestCase):
+    def assertWithinError(self, sketch, exact, sigmas=3):
+        bound = max(sigmas * sketch.standard_error * exact, 2)
+        self.assertLessEqual(abs(sketch.estimate() - exact), bound)
+
+    def test_estimate_matches_exact_count(self):
+        rng = random.Random(7)
+        for exact in (10, 500, 5000, 50000):
+            ips = {f"{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}" for _ in range(exact)}
+            sketch = HyperLogLog()
+            sketch.update(ips)
+            sketch.update(list(ips)[:100])  # repeats must not change the estimate
+            self.assertWithinError(sketch, len(ips))
+
+    def test_merge_estimates_union(self):
+        days = [HyperLogLog() for _ in range(5)]
+        exact = set()
+        for i, sketch in enumerate(days):
+            ips = {f"10.0.{(i * 1000 + n) // 256 % 256}.{n % 256}" for n in range(3000)}
+            sketch.update(ips)
+            exact |= ips
+        self.assertWithinError(HyperLogLog.union(days), len(exact))
+
+    def test_serialization_round_trip(self):
+        sketch = HyperLogLog()
+        sketch.update(range(1000))
+        restored = HyperLogLog.from_bytes(sketch.to_bytes())
+        self.assertEqual(restored.registers, sketch.registers)
+
+    def test_flush_updates_daily_sketches(self):
+        buffer = VisitBuffer(flush_size=1000, flush_interval=0)
+        for n in range(300):
+            buffer.record('news', f"192.168.{n // 256}.{n % 256}", 'desktop', '')
+            buffer.record('home', f"192.168.1.{n % 50}", 'mobile', '')
+        buffer.flush()
+        self.assertEqual(PageVisitSketch.objects.count(), 2)
+        today = timezone.localdate()
+        per_page, total = unique_visitors(today, today)
+        self.assertAlmostEqual(per_page['news'], 300, delta=300 * 0.07)
+        self.assertAlmostEqual(per_page['home'], 50, delta=3)
+        exact = PageVisit.objects.values('ip_address').distinct().count()
+        self.assertAlmostEqual(total, exact, delta=exact * 0.07)
+
+    def test_concurrent_sketch_writes_are_merged(self):
+        today = timezone.localdate()
+        first = [f"10.1.0.{n}" for n in range(100)]
+        second = [f"10.2.0.{n}" for n in range(100)]
+        # Both workers saw no row yet: the second insert conflicts and merges instead
+        _merge_sketch('news', today, first)
+        _merge_sketch('news', today, second, current=None)
+        # A worker holding registers that changed since its read merges again
+        stale = (PageVisitSketch.objects.get().pk, HyperLogLog().to_bytes())
+        third = [f"10.3.0.{n}" for n in range(100)]
+        _merge_sketch('news', today, third, current=stale)
+        self.assertAlmostEqual(PageVisitSketch.objects.get().sketch.estimate(), 300, delta=300 * 0.07)
+
+    def test_bot_hits_survive_a_concurrent_first_insert(self):
+        today = timezone.localdate()
+        add_bot_hits({today: 2})
+        real_update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            # The first update runs before the other worker's row exists
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            add_bot_hits({today: 3})
+        self.assertEqual(PageVisitSourceDaily.objects.get(dimension='device', value='bot').hits, 5)
+
+
+class VisitBufferTests(FootballTestCase):
+    def record(self, buffer, *pages):
+        return [buffer.record(page, '10.0.0.1', 'desktop') for page in pages]
+
+    def stored(self):
+        return list(PageVisit.objects.order_by('pk').values_list('page_name', flat=True))
+
+    def test_flushes_when_full(self):
+        buffer = VisitBuffer(max_size=10, flush_size=3, flush_interval=0)
+        self.record(buffer, 'a', 'b')
+        self.assertEqual((self.stored(), len(buffer)), ([], 2))
+        self.record(buffer, 'c')
+        self.assertEqual((self.stored(), len(buffer)), (['a', 'b', 'c'], 0))
+        self.assertEqual(buffer.stats(), {'queued': 0, 'recorded': 3, 'flushed': 3, 'dropped': 0,
+                                          'flush_errors': 0, 'bots': 0})
+
+    def test_flushes_when_the_interval_expires(self):
+        buffer = VisitBuffer(flush_size=100, flush_interval=60)
+        self.addCleanup(buffer.stop, False)
+        self.record(buffer, 'a')
+        self.assertEqual(self.stored(), [])
+        buffer._last_flush -= 61
+        self.record(buffer, 'b')
+        self.assertEqual(self.stored(), ['a', 'b'])
+
+    def overflow(self, policy):
+        """Record five visits into a buffer of three whose writer is stuck"""
+        buffer = VisitBuffer(max_size=3, flush_size=3, flush_interval=0, drop_policy=policy)
+        with mock.patch.object(buffer, 'flush'):
+            accepted = self.record(buffer, 'a', 'b', 'c', 'd', 'e')
+        return buffer, accepted
+
+    def test_drop_newest_rejects_new_visits(self):
+        buffer, accepted = self.overflow(DROP_NEWEST)
+        self.assertEqual(accepted, [True, True, True, False, False])
+        buffer.flush()
+        self.assertEqual(self.stored(), ['a', 'b', 'c'])
+        self.assertEqual((buffer.recorded, buffer.dropped, buffer.flushed), (3, 2, 3))
+
+    def test_drop_oldest_keeps_the_latest_visits(self):
+        buffer, accepted = self.overflow(DROP_OLDEST)
+        self.assertEqual(accepted, [True] * 5)
+        buffer.flush()
+        self.assertEqual(self.stored(), ['c', 'd', 'e'])
+        self.assertEqual((buffer.recorded, buffer.dropped, buffer.flushed), (5, 2, 3))
+
+    def test_flush_policy_writes_instead_of_dropping(self):
+        buffer = VisitBuffer(max_size=3, flush_size=3, flush_interval=0, drop_policy=FLUSH_NOW)
+        with mock.patch.object(buffer, 'flush'):
+            self.record(buffer, 'a', 'b', 'c')
+        self.record(buffer, 'd')
+        self.assertEqual(self.stored(), ['a', 'b', 'c', 'd'])
+        self.assertEqual((buffer.recorded, buffer.dropped, buffer.flushed), (4, 0, 4))
+
+    def test_stop_flushes_what_is_left(self):
+        buffer = VisitBuffer(flush_size=100, flush_interval=0)
+        self.record(buffer, 'a', 'b')
+        buffer.record_bot()
+        buffer.stop()
+        self.assertEqual(self.stored(), ['a', 'b'])
+        self.assertEqual(PageVisitSourceDaily.objects.get(dimension='device', value='bot').hits, 1)
+        self.assertEqual(buffer.stats()['queued'], 0)
+
+    @override_settings(PAGE_VISIT_BUFFER=BUFFERED_VISITS)
+    def test_reset_drops_queued_visits(self):
+        self.client.get('/club/', HTTP_USER_AGENT=USER_AGENTS[0])
+        self.assertEqual(len(get_visit_buffer()), 1)
+        reset_visit_buffer()
+        self.assertEqual(self.stored(), [])
+        self.assertEqual(len(get_visit_buffer()), 0)
+
+
+class UserAgentClassificationTests(FootballTestCase):
+    def test_classify_user_agent(self):
+        self.assertEqual(classify_user_agent(USER_AGENTS[0]), 'desktop')
+        self.assertEqual(classify_user_agent(USER_AGENTS[1]), 'mobile')
+        self.assertEqual(classify_user_agent('Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'), 'bot')
+        self.assertEqual(classify_user_agent('UptimeRobot/2.0'), 'bot')
+        self.assertEqual(classify_user_agent('curl/8.5.0'), 'bot')
+        self.assertEqual(classify_user_agent(''), 'unknown')
+
+    def test_tokens_do_not_match_inside_other_words(self):
+        chromebook = 'Mozilla/5.0 (X11; CrOS x86_64 15633.69.0) AppleWebKit/537.36 Chrome/119.0 Safari/537.36'
+        self.assertEqual(classify_user_agent(chromebook), 'desktop')
+        self.assertEqual(classify_user_agent('Microsoft Office/16.0 (Microsoft Outlook 16.0.4266; Pro)'), 'unknown')
+        # A browser that mentions "preview" is still a visitor; link-preview fetchers are not
+        self.assertEqual(classify_user_agent(USER_AGENTS[0] + ' Edg/126.0 (Preview)'), 'desktop')
+        self.assertEqual(classify_user_agent('WhatsApp/2.23.20.0 A'), 'bot')
+        self.assertEqual(classify_user_agent('Mozilla/5.0 (compatible; BingPreview/1.0b)'), 'bot')
+        self.assertEqual(classify_user_agent('Mozilla/5.0 (compatible; Embedly/0.2; +http://support.embed.ly/)'), 'bot')
+
+    def test_bots_are_counted_not_stored(self):
+        self.client.get('/club/', HTTP_USER_AGENT='Mozilla/5.0 (compatible; bingbot/2.0)')
+        self.client.get('/club/', HTTP_USER_AGENT='Mozilla/5.0 (compatible; bingbot/2.0)')
+        self.client.get('/club/', HTTP_USER_AGENT=USER_AGENTS[1])
+        self.assertEqual(list(PageVisit.objects.values_list('device', flat=True)), ['mobile'])
+        bots = PageVisitSourceDaily.objects.get(dimension='device', value='bot')
+        self.assertEqual(bots.hits, 2)
+
+
+@override_settings(PAGE_VISIT_BUFFER=BUFFERED_VISITS)
+class GalleryAlbumListQueryTests(FootballTestCase):
+    def make_albums(self, count, photos=3):
+        for i in range(count):
+            album = GalleryAlbum.objects.create(title=f"Album {i}")
+            for j in range(photos):
+                Gallery.objects.create(title=f"Fotka {j}", image=f"gallery/{i}-{j}.jpg", album=album)
+
+    def test_signals_keep_counters_in_sync(self):
+        self.make_albums(2, photos=2)
+        first, second = GalleryAlbum.objects.order_by('pk')
+        newest = Gallery.objects.filter(album=first).order_by('-uploaded_at', '-pk').first()
+        self.assertEqual((first.photo_count, first.cover_photo_id), (2, newest.pk))
+
+        newest.album = second
+        newest.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.photo_count, second.photo_count), (1, 3))
+        self.assertNotEqual(first.cover_photo_id, newest.pk)
+
+        newest.delete()
+        second.refresh_from_db()
+        self.assertEqual(second.photo_count, 2)
+        self.assertNotEqual(second.cover_photo_id, newest.pk)
+
+    def test_album_list_query_count_is_constant(self):
+        self.make_albums(3)
+        with self.assertNumQueries(2) as small:
+            response = self.client.get(reverse('gallery'))
+        self.assertContains(response, "3 fotek")
+        self.make_albums(9)
+        with self.assertNumQueries(len(small.captured_queries)):
+            response = self.client.get(reverse('gallery'))
+        self.assertEqual(len(response.context['albums']), 12)
+
+
+@override_settings(PAGE_VISIT_BUFFER=BUFFERED_VISITS)
+class HomeFragmentCacheTests(FootballTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        league = League.objects.create(name="I.B třída", season="2025/2026")
+        club = Team.objects.create(name="TJ Družba Hlavnice", is_club_team=True, league=league)
+        rival = Team.objects.create(name="Sokol Mokré Lazce", league=league)
+        Match.objects.create(home_team=club, away_team=rival, league=league,
+                             date=timezone.now() + timedelta(days=3))
+        Match.objects.create(home_team=rival, away_team=club, league=league,
+                             date=timezone.now() - timedelta(days=4), home_score=1, away_score=2)
+        cls.author = User.objects.create_user('editor')
+        News.objects.create(title="Zahájení sezóny", content="Text", author=cls.author)
+
+    def setUp(self):
+        super().setUp()
+        reset_stats()
+
+    def test_warm_home_page_runs_no_queries(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, "Zahájení sezóny")
+        self.assertContains(response, "Sokol Mokré Lazce")
+
+    def test_saving_a_model_invalidates_its_fragments(self):
+        self.client.get(reverse('home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title="Nová posila", content="Text", author=self.author)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, "Nová posila")
+        stats = {row['name']: row for row in fragment_stats()}
+        self.assertEqual((stats['home_latest_news']['hits'], stats['home_latest_news']['misses']), (0, 2))
+        self.assertEqual(stats['home_hero']['hits'], 1)
+
+    def test_lost_version_does_not_bring_back_old_fragments(self):
+        self.client.get(reverse('home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title="Nová posila", content="Text", author=self.author)
+        self.client.get(reverse('home'))
+        cache.delete_many([f'fragment-version:{model}' for model in VERSIONED_MODELS])
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title="Derby v neděli", content="Text", author=self.author)
+        self.assertContains(self.client.get(reverse('home')), "Derby v neděli")
+
+
+class ClubContextTests(FootballTestCase):
+    def test_saving_a_club_row_reloads_the_context(self):
+        team = Team.objects.create(name="TJ Družba Hlavnice", is_club_team=True)
+        self.assertEqual(clubcontext.get_club_team().name, "TJ Družba Hlavnice")
+        with self.assertNumQueries(0):
+            clubcontext.get_club_team()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            team.name = "TJ Hlavnice"
+            team.save()
+        self.assertEqual(clubcontext.get_club_team().name, "TJ Hlavnice")
+
+        # A lost version counter must not bring back the bundle cached under an earlier version
+        cache.delete(clubcontext.VERSION_KEY)
+        clubcontext._memo = None
+        with self.captureOnCommitCallbacks(execute=True):
+            team.name = "TJ Družba"
+            team.save()
+        self.assertEqual(clubcontext.get_club_team().name, "TJ Družba")
+
+
+@override_settings(PAGE_VISIT_BUFFER=BUFFERED_VISITS, PAGE_CACHE={'ENABLED': True})
+class PublicPageCacheTests(FootballTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('editor')
+        News.objects.create(title="Zahájení sezóny", content="Text", author=cls.author)
+
+    def test_conditional_get_returns_not_modified(self):
+        response = self.client.get(reverse('news_list'))
+        self.assertEqual(response.status_code, 200)
+        etag, modified = response['ETag'], response['Last-Modified']
+        self.assertFalse(etag.startswith('W/'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('news_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse('news_list'), HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_model_save_invalidates_cached_pages(self):
+        etag = self.client.get(reverse('news_list'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title="Nová posila", content="Text", author=self.author)
+        response = self.client.get(reverse('news_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Nová posila")
+
+    def test_standing_change_invalidates_homepage(self):
+        league = League.objects.create(name="I.B třída", season="2025/2026")
+        team = Team.objects.create(name="TJ Družba Hlavnice", league=league, is_club_team=True)
+        self.client.get(reverse('home'))
+        self.assertIsNone(self.client.get(reverse('home')).context)
+        # The view hands club_standing to the template, so a table change must re-render it
+        with self.captureOnCommitCallbacks(execute=True):
+            Standing.objects.create(team=team, league=league, position=1, points=3)
+        self.assertIsNotNone(self.client.get(reverse('home')).context)
+
+    def test_query_string_is_part_of_the_key_and_staff_bypass(self):
+        self.client.get(reverse('standings'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('standings'))
+        response = self.client.get(reverse('standings') + '?season=all')
+        self.assertEqual(response.context['season'], None)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('standings') + '?season=all')
+
+        # Unknown parameters bypass the cache instead of creating new entries
+        response = self.client.get(reverse('standings') + '?season=all&utm_source=x')
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('ETag', response)
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        response = self.client.get(reverse('standings'))
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(PAGE_VISIT_BUFFER=BUFFERED_VISITS)
+class KeysetPaginationTests(FootballTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('editor')
+        News.objects.bulk_create(
+            News(title=f"Článek {i}", content="Text", author=author) for i in range(25)
+        )
+        # Ties on created_at must not skip or repeat rows across pages
+        stamp = timezone.now() - timedelta(days=1)
+        News.objects.filter(pk__in=list(News.objects.values_list('pk', flat=True)[5:15])).update(created_at=stamp)
+
+    def test_cursor_walk_visits_every_row_once_at_constant_cost(self):
+        response = self.client.get(reverse('news_list'))
+        seen = [news.pk for news in response.context['news_list']]
+        cursor = response.context['next_cursor']
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('news_list_more'), {'after': cursor}).json()
+        pages = [data]
+        while data['next']:
+            with self.assertNumQueries(1):
+                data = self.client.get(reverse('news_list_more'), {'after': data['next']}).json()
+            pages.append(data)
+        for page in pages:
+            # Every card links to its article twice
+            seen.extend(dict.fromkeys(int(pk) for pk in re.findall(r'/news/(\d+)/', page['html'])))
+
+        expected = list(News.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('news_list'), {'after': 'nesmysl'})
+        self.assertEqual(len(response.context['news_list']), 10)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+
+class MatchInvolvesClubTests(FootballTestCase):
+    def test_flag_follows_match_and_team_changes(self):
+        league = League.objects.create(name="I.B třída", season="2025/2026")
+        home = Team.objects.create(name="TJ Družba Hlavnice", league=league)
+        away = Team.objects.create(name="Sokol Mokré Lazce", league=league)
+        other = Team.objects.create(name="FK Kravaře", league=league)
+        match = Match.objects.create(home_team=home, away_team=away, league=league, date=timezone.now())
+        self.assertFalse(match.involves_club)
+
+        home.is_club_team = True
+        home.save()
+        match.refresh_from_db()
+        self.assertTrue(match.involves_club)
+
+        match.home_team = other
+        match.save(update_fields=['home_team'])
+        match.refresh_from_db()
+        self.assertFalse(match.involves_club)
+
+
+class QueryPlanAuditTests(FootballTestCase):
+    def test_public_views_do_not_scan_large_tables(self):
+        author = User.objects.create_user('editor')
+        News.objects.create(title="Zahájení sezóny", content="Text", author=author)
+        GalleryAlbum.objects.create(title="Album")
+        out = StringIO()
+        call_command('audit_query_plans', '--fail', stdout=out)
+        self.assertIn("0 views failed", out.getvalue())
+        self.assertFalse(PageVisit.objects.exists())
+
+
+class StandingsViewTests(FootballTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        League.objects.create(name="I.B třída", season="2026/2027")  # new season, no table yet
+        cls.league = League.objects.create(name="I.B třída", season="2025/2026")
+        old = League.objects.create(name="II. třída", season="2024/2025")
+        stats = [(6, 10, 7, 5), (7, 4, 9, 13), (0, 0, 0, 0)]
+        for position, (played, points, goals_for, goals_against) in enumerate(stats, 1):
+            team = Team.objects.create(name=f"Tým {position}")
+            Standing.objects.create(league=cls.league, team=team, position=position, played=played, points=points,
+                                    goals_for=goals_for, goals_against=goals_against)
+        Standing.objects.create(league=old, team=team, position=1, played=1, points=3)
+
+    def test_default_season_is_the_latest_with_a_table(self):
+        response = self.client.get(reverse('standings'))
+        self.assertEqual(response.context['season'], "2025/2026")
+        self.assertEqual(response.context['seasons'], ["2025/2026", "2024/2025"])
+        self.assertEqual(list(response.context['standings_by_league']), [self.league])
+        response = self.client.get(reverse('standings') + '?season=all')
+        self.assertEqual(len(response.context['standings_by_league']), 2)
+
+    def test_with_stats_matches_python(self):
+        rows = Standing.objects.for_season("2025/2026").with_stats().order_by('position')
+        self.assertEqual(len(rows), 3)
+        for row in rows:
+            if row.played:
+                expected = (round(row.points * 100 / (row.played * 3), 1), round(row.goals_for / row.played, 1),
+                            round(row.goals_against / row.played, 1))
+            else:
+                expected = (0.0, 0.0, 0.0)
+            self.assertEqual((row.success_rate, row.avg_goals_for, row.avg_goals_against), expected)
+
+
+class StandingsEngineTests(FootballTestCase):
+    def setUp(self):
+        self.league = League.objects.create(name="III. třída", season="2025/2026", standings_from_matches=True)
+        self.teams = [Team.objects.create(name=f"Tým {c}", league=self.league) for c in "ABCDEF"]
+
+    def play(self, home, away, home_score=None, away_score=None, league=None):
+        return Match.objects.create(home_team=home, away_team=away, league=league or self.league,
+                                    date=timezone.now(), home_score=home_score, away_score=away_score)
+
+    def assert_matches_full_rebuild(self, league=None):
+        league_id = (league or self.league).pk
+        self.assertEqual(stored_league(league_id), compute_league(league_id))
+
+    def test_incremental_updates_agree_with_full_rebuild(self):
+        rng = random.Random(7)
+        other = League.objects.create(name="Pohár", season="2025/2026", standings_from_matches=True)
+        matches = []
+        for _ in range(30):
+            home, away = rng.sample(self.teams, 2)
+            played = rng.random() < 0.8
+            matches.append(self.play(home, away, rng.randrange(5) if played else None,
+                                     rng.randrange(5) if played else None))
+        self.assert_matches_full_rebuild()
+
+        for match in rng.sample(matches, 10):
+            match.home_score, match.away_score = rng.randrange(5), rng.randrange(5)
+            match.save()
+        moved = matches[0]
+        moved.league = other
+        moved.save()
+        for match in matches[1:6]:
+            match.delete()
+        self.assert_matches_full_rebuild()
+        self.assert_matches_full_rebuild(other)
+        call_command('rebuild_standings', '--verify', stdout=StringIO())
+
+    def test_head_to_head_breaks_points_tie_before_goal_difference(self):
+        a, b, c = self.teams[:3]
+        self.play(a, c, 6, 0)   # A: big goal difference
+        self.play(b, a, 1, 0)   # B beats A, both finish on 3 points
+        order = list(Standing.objects.filter(league=self.league).order_by('position').values_list('team__name', flat=True))
+        self.assertEqual(order[:2], ["Tým B", "Tým A"])
+
+        with override_settings(STANDINGS={'TIE_BREAKERS': ['points', 'goal_difference']}):
+            rebuild_league(self.league.pk)
+        order = list(Standing.objects.filter(league=self.league).order_by('position').values_list('team__name', flat=True))
+        self.assertEqual(order[:2], ["Tým A", "Tým B"])
+
+    def test_manual_leagues_are_left_alone(self):
+        manual = League.objects.create(name="Přebor", season="2025/2026")
+        self.play(self.teams[0], self.teams[1], 2, 0, league=manual)
+        self.assertFalse(Standing.objects.filter(league=manual).exists())
+
+
+class ExportDataTests(FootballTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        PageVisit.objects.bulk_create([
+            PageVisit(page_name='news', ip_address='10.0.0.1', device='mobile', referrer='www.google.com', timestamp=now),
+            PageVisit(page_name='home', ip_address='10.0.0.2', device='desktop', referrer='', timestamp=now - timedelta(days=3)),
+        ])
+        league = League.objects.create(name="I.B třída", season="2025/2026")
+        home = Team.objects.create(name="TJ Družba Hlavnice", league=league)
+        away = Team.objects.create(name="Sokol Mokré Lazce", league=league)
+        Match.objects.create(home_team=home, away_team=away, league=league, date=now, home_score=2, away_score=1)
+        Match.objects.create(home_team=away, away_team=home, league=League.objects.create(name="Pohár", season="2025/2026"),
+                             date=now)
+
+    def export(self, *args):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'export')
+            call_command('export_data', *args, '--output', path, stderr=StringIO())
+            with open(path, 'rb') as f:
+                return f.read()
+
+    def read_csv(self, data):
+        return list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+
+    def read_jsonl(self, data):
+        return [json.loads(line) for line in gzip.decompress(data).decode('utf-8').splitlines()]
+
+    def test_visits_round_trip_in_both_formats(self):
+        for rows in (self.read_csv(self.export('visits')), self.read_jsonl(self.export('visits', '--format', 'jsonl'))):
+            self.assertEqual(list(rows[0]), VISIT_FIELDS)
+            self.assertEqual([(r['page_name'], r['ip_address'], r['device']) for r in rows],
+                             [('news', '10.0.0.1', 'mobile'), ('home', '10.0.0.2', 'desktop')])
+        today = timezone.localdate().isoformat()
+        rows = self.read_csv(self.export('visits', '--start', today, '--chunk-size', '1'))
+        self.assertEqual([r['page_name'] for r in rows], ['news'])
+
+    def test_matches_round_trip_in_both_formats(self):
+        league = League.objects.get(name="I.B třída")
+        for rows in (self.read_csv(self.export('matches', '--league', str(league.pk))),
+                     self.read_jsonl(self.export('matches', '--league', str(league.pk), '--format', 'jsonl'))):
+            self.assertEqual(list(rows[0]), MATCH_FIELDS)
+            self.assertEqual(len(rows), 1)
+            self.assertEqual((rows[0]['home_team__name'], rows[0]['league__name']), ("TJ Družba Hlavnice", "I.B třída"))
+        self.assertEqual(self.read_csv(self.export('matches'))[0]['home_score'], '2')
+        self.assertIsNone(self.read_jsonl(self.export('matches', '--format', 'jsonl'))[1]['home_score'])
+
+
+def image_file(name, size=(300, 200), color=(200, 30, 30), fmt='JPEG', **options):
+    buf = io.BytesIO()
+    Image.new('RGB', size, color).save(buf, format=fmt, **options)
+    return ContentFile(buf.getvalue(), name=name)
+
+
+class MediaTestCase(FootballTestCase):
+    """Runs against a throwaway MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings_override = override_settings(
+            MEDIA_ROOT=media.name,
+            IMAGE_JOBS={'SYNC': False, 'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 30},
+            IMAGE_RENDITIONS={'WIDTHS': (64, 128)},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class ImageJobQueueTests(MediaTestCase):
+    def test_jobs_are_queued_on_commit_and_only_for_changed_files(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            team = Team.objects.create(name="Sokol Mokré Lazce", flag=image_file('flag.jpg'))
+        self.assertFalse(ImageJob.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(ImageJob.objects.filter(kind='resize', object_id=team.pk).count(), 1)
+
+        ImageJob.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            team.city = "Mokré Lazce"
+            team.save()
+        self.assertFalse(ImageJob.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            team.flag = image_file('novy.jpg', color=(0, 0, 200))
+            team.save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+    def test_worker_stores_resized_file_under_its_new_hash(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            team = Team.objects.create(name="Sokol Mokré Lazce", flag=image_file('flag.jpg'))
+            # Same bytes uploaded twice share the blob; both rows follow the resize
+            twin = Team.objects.create(name="Sokol B", flag=image_file('flag.jpg'))
+        original = team.flag.name
+        self.assertEqual(twin.flag.name, original)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_worker_batch(), (1, 1))
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.result, job.attempts), (ImageJob.STATUS_DONE, 'resized', 1))
+
+        team.refresh_from_db()
+        twin.refresh_from_db()
+        self.assertNotEqual(team.flag.name, original)
+        self.assertEqual(twin.flag.name, team.flag.name)
+        with open(team.flag.path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self.assertEqual(name_digest(team.flag.name), digest[:32])
+        blob = MediaBlob.objects.get(name=team.flag.name)
+        self.assertEqual((blob.sha256, blob.refcount), (digest, 2))
+        self.assertFalse(MediaBlob.objects.filter(name=original).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, original)))
+        with Image.open(team.flag.path) as img:
+            self.assertLessEqual(max(img.size), 100)
+        self.assertTrue(read_manifest(team.flag.name))
+
+    def test_failed_jobs_are_retried_with_backoff_then_given_up(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            team = Team.objects.create(name="Sokol Mokré Lazce", flag=ContentFile(b'not an image', name='flag.jpg'))
+        self.assertEqual(run_worker_batch(), (1, 0))
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ImageJob.STATUS_PENDING, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(run_worker_batch(), (0, 0))  # not due yet
+
+        ImageJob.objects.update(run_after=timezone.now())
+        with self.assertLogs('football.imagejobs', 'ERROR'):
+            self.assertEqual(run_worker_batch(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ImageJob.STATUS_FAILED, 2))
+        self.assertTrue(job.last_error)
+
+    def test_regenerate_thumbnails_action_only_queues_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            photos = [Gallery.objects.create(title=f"Fotka {i}", image=image_file(f"{i}.jpg", color=(i * 80, 0, 0)))
+                      for i in range(3)]
+        ImageJob.objects.all().delete()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:football_gallery_changelist'), {
+                'action': 'regenerate_thumbnails', '_selected_action': [p.pk for p in photos],
+            }, follow=True)
+        self.assertContains(response, "Zařazeno 3 úloh")
+        self.assertEqual(ImageJob.objects.filter(kind='thumbnail', status=ImageJob.STATUS_PENDING).count(), 3)
+        self.assertIsNone(thumbnail_url(photos[0].image.name))
+
+        self.assertEqual(run_worker_batch(), (3, 3))
+        self.assertIsNotNone(thumbnail_url(photos[0].image.name))
+
+    def test_sync_mode_processes_jobs_inline(self):
+        with override_settings(IMAGE_JOBS={'SYNC': True}), self.captureOnCommitCallbacks(execute=True):
+            Team.objects.create(name="Sokol Mokré Lazce", flag=image_file('flag.jpg', (900, 600)))
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.STATUS_DONE)
+
+
+class PictureTagTests(MediaTestCase):
+    def render(self, field_file):
+        return Template('{% load renditions %}{% picture image alt="Fotka" %}').render(Context({'image': field_file}))
+
+    def test_tag_only_reads_the_manifest(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = Gallery.objects.create(title="Fotka", image=image_file('foto.jpg', (400, 300)))
+        ImageJob.objects.all().delete()
+        with self.assertNumQueries(0):
+            html = self.render(photo.image)
+        self.assertTrue(html.startswith('<img src="/media/gallery/'))
+        self.assertFalse(ImageJob.objects.exists())
+
+        generate_renditions(photo.image.path)
+        html = self.render(photo.image)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('-128w-q82.jpg 128w', html)
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    def refcount(self, name):
+        blob = MediaBlob.objects.filter(name=name).first()
+        return blob.refcount if blob else 0
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_create_replace_and_delete_move_references(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = Gallery.objects.create(title="Fotka", image=image_file('a.jpg'))
+        first = photo.image.name
+        self.assertEqual(self.refcount(first), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.image = image_file('b.jpg', color=(0, 200, 0))
+            photo.save()
+        second = photo.image.name
+        self.assertEqual((self.refcount(first), self.exists(first)), (0, False))
+        self.assertEqual((self.refcount(second), self.exists(second)), (1, True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.delete()
+        self.assertEqual((self.refcount(second), self.exists(second)), (0, False))
+
+    def test_shared_blob_is_kept_until_the_last_reference_goes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Gallery.objects.create(title="Fotka 1", image=image_file('a.jpg'))
+            second = Gallery.objects.create(title="Fotka 2", image=image_file('kopie.jpg'))
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(self.refcount(name), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual((self.refcount(name), self.exists(name)), (1, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image = image_file('jina.jpg', color=(0, 0, 0))
+            second.save()
+        self.assertEqual((self.refcount(name), self.exists(name)), (0, False))
+
+    def test_store_rewritten_leaves_the_old_bytes_to_other_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Gallery.objects.create(title="Fotka 1", image=image_file('a.jpg'))
+            second = Gallery.objects.create(title="Fotka 2", image=image_file('a.jpg'))
+        name = first.image.name
+        storage = first.image.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            new_name, moved = store_rewritten(storage, Gallery.objects.filter(pk=first.pk), 'image', name,
+                                              image_file('a.jpg', (50, 50)))
+        self.assertEqual(moved, 1)
+        self.assertEqual((self.refcount(name), self.refcount(new_name)), (1, 1))
+        second.refresh_from_db()
+        with Image.open(second.image.path) as img:
+            self.assertEqual(img.size, (300, 200))
+
+
+class BackfillImagesTests(MediaTestCase):
+    def backfill(self, *args):
+        out = StringIO()
+        call_command('backfill_images', '--workers', '1', '--no-renditions', '--source', 'football.Gallery.image',
+                     *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def photo(self, title, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Gallery.objects.create(title=title, image=content)
+
+    def test_dry_run_writes_nothing(self):
+        photo = self.photo("Fotka", image_file('velka.jpg', (2000, 1500)))
+        with open(photo.image.path, 'rb') as f:
+            original = f.read()
+        self.backfill('--dry-run')
+        self.assertFalse(ImageBackfillCheckpoint.objects.exists())
+        photo.refresh_from_db()
+        with open(photo.image.path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+
+    def test_rewritten_file_gets_a_new_name_and_keeps_its_icc_profile(self):
+        photo = self.photo("Fotka", image_file('velka.jpg', (2000, 1500), icc_profile=b'test profile'))
+        original = photo.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.backfill()
+
+        photo.refresh_from_db()
+        self.assertNotEqual(photo.image.name, original)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, original)))
+        with open(photo.image.path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self.assertEqual(MediaBlob.objects.get(name=photo.image.name).sha256, digest)
+        with Image.open(photo.image.path) as img:
+            self.assertEqual(img.size, (1200, 900))
+            self.assertEqual(img.info.get('icc_profile'), b'test profile')
+        self.assertEqual(ImageBackfillCheckpoint.objects.get(source='football.Gallery.image').last_id, photo.pk)
+
+    def test_checkpoint_stops_in_front_of_a_failed_file(self):
+        first = self.photo("Fotka 1", image_file('a.jpg'))
+        self.photo("Rozbitá", ContentFile(b'not an image', name='b.jpg'))
+        self.photo("Fotka 3", image_file('c.jpg', color=(0, 0, 200)))
+        output = self.backfill()
+        self.assertIn("checkpoint kept", output)
+        self.assertEqual(ImageBackfillCheckpoint.objects.get(source='football.Gallery.image').last_id, first.pk)
+
+
+class AlbumZipCacheTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        zips = tempfile.TemporaryDirectory()
+        self.addCleanup(zips.cleanup)
+        self.cache_dir = zips.name
+        settings_override = override_settings(
+            ALBUM_ZIP_CACHE_DIR=zips.name, ALBUM_ZIP_CACHE_MAX_AGE=3600,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def stale_file(self, name, size, age):
+        path = os.path.join(self.cache_dir, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    def download(self, album):
+        response = self.client.get(reverse('gallery_download', args=[album.pk]))
+        return b''.join(response.streaming_content)
+
+    def test_old_and_least_recently_used_archives_are_evicted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            album = GalleryAlbum.objects.create(title="Derby")
+            Gallery.objects.create(title="Fotka", album=album, image=image_file('a.jpg'))
+        expired = self.stale_file('album-998-0000000000000000.zip', 10, 7200)
+        abandoned = self.stale_file('tmpabc.part', 10, 7200)
+        older = self.stale_file('album-997-0000000000000000.zip', 50000, 600)
+        recent = self.stale_file('album-996-0000000000000000.zip', 10, 60)
+
+        with override_settings(ALBUM_ZIP_CACHE_MAX_BYTES=50000):
+            data = self.download(album)
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertEqual(zf.namelist(), ['001-fotka.jpg'])
+        self.assertEqual([os.path.exists(p) for p in (expired, abandoned, older, recent)], [False, False, False, True])
+        cached = [name for name in os.listdir(self.cache_dir) if name.startswith(f'album-{album.pk}-')]
+        self.assertEqual(len(cached), 1)
+        # The second download comes from the cache file
+        self.assertEqual(self.download(album), data)
+
+
+class GalleryIngestTests(MediaTestCase):
+    def test_zip_entries_are_shrunk_keeping_exif_and_icc_profile(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Canon"
+        large = image_file('velka.jpg', (2400, 1600), icc_profile=b'test profile', exif=exif.tobytes())
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('derby/velka.jpg', large.read())
+            zf.writestr('derby/mala.png', image_file('mala.png', (40, 40), fmt='PNG').read())
+            zf.writestr('derby/popis.txt', b'text')
+            zf.writestr('__MACOSX/derby/._velka.jpg', b'')
+        album = GalleryAlbum.objects.create(title="Derby")
+        with self.captureOnCommitCallbacks(execute=True):
+            galleries, failures = ingest_archive(ContentFile(archive.getvalue(), name='derby.zip'), album=album)
+
+        self.assertEqual(failures, [('derby/popis.txt', "přeskočeno, není obrázek")])
+        self.assertEqual([g.title for g in galleries], ["Fotka 1", "Fotka 2"])
+        with Image.open(galleries[0].image.path) as img:
+            self.assertEqual((img.format, img.size), ('JPEG', (1200, 800)))
+            self.assertEqual(img.info.get('icc_profile'), b'test profile')
+            self.assertEqual(img.getexif().get(0x010F), "Canon")
+        with Image.open(galleries[1].image.path) as img:
+            self.assertEqual(img.size, (40, 40))
+
+    def test_uploads_are_processed_in_a_thread_pool(self):
+        album = GalleryAlbum.objects.create(title="Derby")
+        uploads = [
+            image_file('velka.jpg', (2400, 1600)),
+            image_file('mala.jpg', (200, 100), color=(0, 90, 0)),
+            ContentFile(b'not an image', name='rozbita.jpg'),
+            image_file('dalsi.png', (300, 300), color=(0, 0, 90), fmt='PNG'),
+        ]
+        with mock.patch('football.ingest.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as executor, \
+                self.captureOnCommitCallbacks(execute=True):
+            galleries, failures = ingest_images(uploads, album=album, workers=3)
+        executor.assert_called_once_with(max_workers=3)
+
+        self.assertEqual(failures, [('rozbita.jpg', "soubor není platný obrázek")])
+        self.assertEqual([g.title for g in galleries], ["Fotka 1", "Fotka 2", "Fotka 4"])
+        with Image.open(galleries[0].image.path) as img:
+            self.assertEqual(img.size, (1200, 800))
+        for gallery in galleries:
+            self.assertTrue(read_manifest(gallery.image.name))
+            self.assertEqual(MediaBlob.objects.get(name=gallery.image.name).refcount, 1)
+        album.refresh_from_db()
+        self.assertEqual(album.photo_count, 3)
+
+    def test_bulk_upload_view_streams_files_to_disk(self):
+        album = GalleryAlbum.objects.create(title="Derby")
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        data = {'album': album.pk, 'default_title_prefix': "Derby",
+                'images': [image_file('a.jpg'), image_file('b.jpg', color=(0, 90, 0))]}
+        with mock.patch('football.forms.ingest_images', wraps=ingest_images) as ingest, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:football_bulkimageupload_add'), data)
+        uploads = ingest.call_args.args[0]
+        self.assertTrue(all(isinstance(upload, TemporaryUploadedFile) for upload in uploads))
+        self.assertEqual(Gallery.objects.filter(album=album).count(), 2)
+
+        # The view skips the CSRF middleware, but not the check itself
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.get(username='admin'))
+        with self.assertLogs('django.security.csrf', 'WARNING'):
+            response = client.post(reverse('admin:football_bulkimageupload_add'), {'album': album.pk})
+        self.assertEqual(response.status_code, 403)
+
+
+class MediaGarbageCollectionTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        quarantine = tempfile.TemporaryDirectory()
+        self.addCleanup(quarantine.cleanup)
+        self.quarantine_dir = quarantine.name
+        settings_override = override_settings(MEDIA_QUARANTINE_DIR=quarantine.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def media_file(self, name, age_days=30, data=b'data'):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.age(name, age_days)
+        return name
+
+    def age(self, name, days):
+        when = time.time() - days * 86400
+        os.utime(os.path.join(self.media_root, name), (when, when))
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def gc(self, *args):
+        out = StringIO()
+        call_command('gc_media', '--grace-days', '7', *args, stdout=out)
+        return out.getvalue()
+
+    def test_renditions_follow_their_source_without_reading_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = Gallery.objects.create(title="Fotka", image=image_file('a.jpg', (300, 200)))
+        generate_renditions(photo.image.path)
+        kept = read_manifest(photo.image.name)['thumbnail']
+        gone = self.media_file(f"renditions/ff/{'f' * 24}-thumb96-q80.webp")
+        for rel, _ in iter_media_files(self.media_root):
+            self.age(rel, 30)
+
+        with mock.patch('football.mediagc.content_hash') as content_hash:
+            self.gc('--quarantine', '--renditions')
+        content_hash.assert_not_called()
+        self.assertTrue(self.exists(kept))
+        self.assertTrue(self.exists(photo.image.name))
+        self.assertFalse(self.exists(gone))
+
+    def test_referenced_files_are_kept_and_orphans_quarantined(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            team = Team.objects.create(name="Sokol Mokré Lazce", flag=image_file('flag.jpg'))
+        self.age(team.flag.name, 30)
+        inline = self.media_file('uploads/derby.jpg')
+        News.objects.create(title="Derby", content=f'<p><img src="/media/{inline}" alt=""></p>',
+                            author=User.objects.create_user('editor'))
+        orphan = self.media_file('gallery/zapomenuta.jpg')
+        fresh = self.media_file('gallery/prave-nahrana.jpg', age_days=1)
+        album = GalleryAlbum.objects.create(title="Derby")
+        leftover = self.media_file('temp_uploads/davka.jpg')
+        BulkImageUpload.objects.bulk_create([BulkImageUpload(album=album, images=leftover)])  # save() expects an 'image' field
+
+        output = self.gc()
+        self.assertIn("Found 2 orphaned files", output)
+        self.assertIn("1 unreferenced but within the grace period", output)
+        self.assertTrue(all(self.exists(name) for name in (team.flag.name, inline, orphan, fresh, leftover)))
+
+        output = self.gc('--quarantine')
+        self.assertIn("Quarantined 2 files", output)
+        self.assertTrue(all(self.exists(name) for name in (team.flag.name, inline, fresh)))
+        for name in (orphan, leftover):
+            self.assertFalse(self.exists(name))
+            moved = glob.glob(os.path.join(self.quarantine_dir, '*', name))
+            self.assertEqual(len(moved), 1)
+            with open(moved[0], 'rb') as f:
+                self.assertEqual(f.read(), b'data')
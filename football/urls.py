@@ -4,14 +4,17 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('news/', views.NewsListView.as_view(), name='news_list'),
+    path('news/more/', views.news_list_more, name='news_list_more'),
     path('news/<int:pk>/', views.NewsDetailView.as_view(), name='news_detail'),
     path('team/', views.team_lineup, name='team_lineup'),
     path('management/', views.management, name='management'),
     path('matches/', views.MatchListView.as_view(), name='matches'),
+    path('matches/more/', views.match_list_more, name='match_list_more'),
     path('standings/', views.standings, name='standings'),
     path('calendar/', views.EventListView.as_view(), name='calendar'),
     path('kalendar/', views.google_calendar_view, name='google_calendar'),
     path('gallery/', views.GalleryAlbumListView.as_view(), name='gallery'),
     path('gallery/<int:pk>/', views.GalleryAlbumDetailView.as_view(), name='gallery_detail'),
+    path('gallery/<int:pk>/download/', views.album_download, name='gallery_download'),
     path('club/', views.club_info, name='club_info'),
 ]
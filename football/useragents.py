@@ -0,0 +1,41 @@
+"""User-agent classification for visit statistics.
+
+Visitors send only a handful of distinct User-Agent strings, so results are
+memoised in an LRU cache keyed on the raw header value.
+"""
+from functools import lru_cache
+
+DEVICE_BOT = 'bot'
+DEVICE_MOBILE = 'mobile'
+DEVICE_DESKTOP = 'desktop'
+DEVICE_UNKNOWN = 'unknown'
+
+CACHE_SIZE = 4096
+
+_BOT_TOKENS = (
+    'bot', 'crawl', 'spider', 'slurp', 'archiver', 'facebookexternalhit',
+    # Link previews that do not call themselves bots
+    'bingpreview', 'skypeuripreview', 'whatsapp/', 'embedly', 'iframely', 'vkshare',
+    'feedfetcher', 'mediapartners', 'lighthouse', 'headless', 'phantomjs',
+    'uptime', 'monitor', 'pingdom', 'statuscake', 'site24x7', 'check_http',
+    'curl/', 'wget/', 'python-requests', 'python-urllib', 'aiohttp', 'httpclient',
+    'go-http-client', 'okhttp', 'java/', 'libwww', 'scrapy', 'axios/', 'node-fetch',
+)
+_MOBILE_TOKENS = ('mobile', 'android', 'iphone', 'ipad', 'ipod', 'windows phone', 'opera mini')
+# Matched as lowercase substrings, so keep the delimiters ('cros ' must not match "microsoft")
+_DESKTOP_TOKENS = ('windows nt', 'macintosh', 'x11', 'linux x86_64', 'cros ')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def classify_user_agent(user_agent):
+    """Return 'bot', 'mobile', 'desktop' or 'unknown' for a User-Agent string"""
+    ua = (user_agent or '').lower()
+    if not ua:
+        return DEVICE_UNKNOWN
+    if any(token in ua for token in _BOT_TOKENS):
+        return DEVICE_BOT
+    if any(token in ua for token in _MOBILE_TOKENS):
+        return DEVICE_MOBILE
+    if any(token in ua for token in _DESKTOP_TOKENS):
+        return DEVICE_DESKTOP
+    return DEVICE_UNKNOWN
@@ -1,45 +1,44 @@
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
-from django.views.generic import ListView, DetailView
+from django.template.loader import render_to_string
+from django.views.generic import ListView, DetailView, TemplateView
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject
 from django.contrib import messages
 import requests
 import json
 from datetime import datetime, timedelta
 from .models import (
-    ClubInfo, News, Team, Player, Management, Match, 
+    News, Player, Management, Match,
     Standing, Event, Gallery, GalleryAlbum, MainPage, League, GoogleCalendarSettings
 )
+from .albumzip import album_zip_response
+from .clubcontext import get_club_info, get_club_team, get_main_page
+from .keyset import keyset_page
+from .pagecache import cache_public_page
 
+@cache_public_page('home')
 def home(request):
     """Main page view"""
-    try:
-        main_page = MainPage.objects.first()
-        if not main_page:
-            main_page = MainPage.objects.create()
-    except:
-        main_page = None
-    
+    # The configuration row is created in the admin; a GET never writes it
+    main_page = get_main_page() or MainPage()
+    # Sections are cached as template fragments; the querysets are lazy so
+    # only fragments that miss the cache touch the database
+    upcoming_match = SimpleLazyObject(main_page.get_upcoming_match)
+
     context = {
-        'latest_news': News.objects.filter(published=True)[:3],
-        'upcoming_match': None,
-        'upcoming_matches': [],
-        'recent_matches': [],
-        'club_standing': [],
-        'club_info': ClubInfo.objects.first(),
+        'latest_news': SimpleLazyObject(lambda: list(News.objects.filter(published=True)[:3])),
+        'upcoming_match': upcoming_match,
+        'upcoming_matches': SimpleLazyObject(lambda: [upcoming_match] if upcoming_match else []),
+        'recent_matches': SimpleLazyObject(lambda: list(main_page.get_recent_matches())),
+        'club_standing': SimpleLazyObject(lambda: list(main_page.get_club_standing())),
+        'club_info': get_club_info(),
     }
-    
-    if main_page:
-        upcoming_match = main_page.get_upcoming_match()
-        context.update({
-            'upcoming_match': upcoming_match,
-            'upcoming_matches': [upcoming_match] if upcoming_match else [],
-            'recent_matches': main_page.get_recent_matches(),
-            'club_standing': main_page.get_club_standing(),
-        })
-    
+
     return render(request, 'football/home.html', context)
 
+@method_decorator(cache_public_page('news_list'), name='dispatch')
 class NewsListView(ListView):
     model = News
     template_name = 'football/news_list.html'
@@ -48,13 +47,32 @@ class NewsListView(ListView):
     
     def get_queryset(self):
         try:
-            return News.objects.filter(published=True)
+            return News.objects.filter(published=True).select_related('author')
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f"Error fetching news: {e}")
             return News.objects.none()
 
+    def paginate_queryset(self, queryset, page_size):
+        # Keyset pagination on (created_at, id): no COUNT(*), no OFFSET
+        page = keyset_page(queryset, 'created_at', self.request.GET.get('after'), page_size)
+        self.next_cursor = page.next_cursor
+        return None, None, page.items, page.has_next
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        return context
+
+@cache_public_page('news_list')
+def news_list_more(request):
+    """Next page of news cards as JSON for the "load more" button"""
+    view = NewsListView(request=request)
+    page = keyset_page(view.get_queryset(), 'created_at', request.GET.get('after'), view.paginate_by)
+    html = render_to_string('football/partials/news_cards.html', {'news_list': page.items}, request)
+    return JsonResponse({'html': html, 'next': page.next_cursor})
+
 class NewsDetailView(DetailView):
     model = News
     template_name = 'football/news_detail.html'
@@ -71,7 +89,7 @@ class NewsDetailView(DetailView):
 
 def team_lineup(request):
     """Team lineup view"""
-    club_team = Team.objects.filter(is_club_team=True).first()
+    club_team = get_club_team()
     players = Player.objects.filter(team=club_team) if club_team else Player.objects.none()
     
     context = {
@@ -88,73 +106,82 @@ def management(request):
     management_team = Management.objects.all()
     return render(request, 'football/management.html', {'management_team': management_team})
 
-class MatchListView(ListView):
-    model = Match
+def club_matches(league=None):
+    """Matches of the club team, optionally limited to one league"""
+    qs = Match.objects.filter(involves_club=True).select_related('home_team', 'away_team', 'league')
+    return qs.filter(league=league) if league else qs
+
+def match_page(matches, which, cursor, per_page=20):
+    """One keyset page of upcoming (soonest first) or recent (latest first, with a score) matches"""
+    now = timezone.now()
+    if which == 'upcoming':
+        return keyset_page(matches.filter(date__gte=now), 'date', cursor, per_page, descending=False)
+    return keyset_page(matches.filter(date__lt=now, home_score__isnull=False), 'date', cursor, per_page)
+
+def selected_league(request):
+    """League of the ?league=<id> filter (also ?league_id=), or None"""
+    league_id = request.GET.get('league') or request.GET.get('league_id')
+    if league_id:
+        try:
+            return League.objects.get(pk=int(league_id))
+        except (ValueError, League.DoesNotExist):
+            pass
+    return None
+
+@method_decorator(cache_public_page('matches'), name='dispatch')
+class MatchListView(TemplateView):
     template_name = 'football/matches.html'
-    context_object_name = 'matches'
     paginate_by = 20
     
-    def _club_matches_qs(self):
-        return Match.objects.filter(
-            Q(home_team__is_club_team=True) | Q(away_team__is_club_team=True)
-        )
-
-    def get_queryset(self):
-        qs = self._club_matches_qs()
-        # Optional filter by league via query param (?league=<id>)
-        self.selected_league = None
-        league_id = self.request.GET.get('league') or self.request.GET.get('league_id')
-        if league_id:
-            try:
-                self.selected_league = League.objects.get(pk=int(league_id))
-                qs = qs.filter(league=self.selected_league)
-            except (ValueError, League.DoesNotExist):
-                self.selected_league = None
-        return qs
-    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        now = timezone.now()
-        filtered_qs = self.get_queryset()
-        # Upcoming: soonest first (ascending) — show all
-        context['upcoming_matches'] = (
-            filtered_qs.filter(date__gte=now).order_by('date')
-        )
-        # Recent (played): latest first (descending) — show all with a recorded score
-        context['recent_matches'] = (
-            filtered_qs.filter(date__lt=now, home_score__isnull=False).order_by('-date')
-        )
-        # Provide leagues for filter dropdown (only leagues where club plays)
-        base_qs = self._club_matches_qs()
-        context['leagues'] = League.objects.filter(pk__in=base_qs.values_list('league_id', flat=True).distinct()).order_by('name', 'season')
-        context['selected_league'] = getattr(self, 'selected_league', None)
+        league = selected_league(self.request)
+        matches = club_matches(league)
+        recent = match_page(matches, 'recent', self.request.GET.get('recent_after'), self.paginate_by)
+        upcoming = match_page(matches, 'upcoming', self.request.GET.get('upcoming_after'), self.paginate_by)
+        context.update({
+            'recent_matches': recent.items,
+            'recent_next': recent.next_cursor,
+            'upcoming_matches': upcoming.items,
+            'upcoming_next': upcoming.next_cursor,
+            # Leagues for the filter dropdown (only leagues where club plays)
+            'leagues': League.objects.filter(
+                pk__in=club_matches().values_list('league_id', flat=True).distinct()
+            ).order_by('name', 'season'),
+            'selected_league': league,
+        })
         return context
 
+@cache_public_page('matches')
+def match_list_more(request):
+    """Next page of ?list=recent|upcoming match cards as JSON for the "load more" button"""
+    which = 'upcoming' if request.GET.get('list') == 'upcoming' else 'recent'
+    page = match_page(club_matches(selected_league(request)), which, request.GET.get('after'), MatchListView.paginate_by)
+    html = render_to_string(f'football/partials/{which}_match_cards.html', {f'{which}_matches': page.items}, request)
+    return JsonResponse({'html': html, 'next': page.next_cursor})
+
+@cache_public_page('standings')
 def standings(request):
-    """Display standings for all leagues."""
+    """Display standings of one season (the latest with a table by default, ?season=all for every season)."""
+    # Leagues of a new season exist before any table does; offer only seasons with rows
+    seasons = list(Standing.objects.order_by('-league__season').values_list('league__season', flat=True).distinct())
+    season = request.GET.get('season') or (seasons[0] if seasons else None)
+    if season == 'all':
+        season = None
+
     standings_by_league = {}
-    
-    # Get all leagues with their standings
-    for league in League.objects.all():
-        league_standings = Standing.objects.filter(
-            league=league
-        ).select_related('team').order_by('position')
-        
-        if league_standings.exists():
-            # Add calculated statistics to each standing
-            for standing in league_standings:
-                # Calculate success rate (percentage)
-                max_points = standing.played * 3
-                standing.success_rate = round((standing.points / max_points * 100) if max_points > 0 else 0, 1)
-                
-                # Calculate average goals per match
-                standing.avg_goals_for = round((standing.goals_for / standing.played) if standing.played > 0 else 0, 1)
-                standing.avg_goals_against = round((standing.goals_against / standing.played) if standing.played > 0 else 0, 1)
-            
-            standings_by_league[league] = league_standings
+    rows = (
+        Standing.objects.for_season(season).with_stats()
+        .select_related('team', 'league')
+        .order_by('-league__season', 'league__name', 'league_id', 'position')
+    )
+    for standing in rows:
+        standings_by_league.setdefault(standing.league, []).append(standing)
     
     context = {
         'standings_by_league': standings_by_league,
+        'seasons': seasons,
+        'season': season,
         'page_title': 'Tabulky'
     }
     return render(request, 'football/standings.html', context)
@@ -167,6 +194,7 @@ class EventListView(ListView):
     def get_queryset(self):
         return Event.objects.filter(date__gte=timezone.now())
 
+@method_decorator(cache_public_page('gallery'), name='dispatch')
 class GalleryAlbumListView(ListView):
     model = GalleryAlbum
     template_name = 'football/gallery_albums.html'
@@ -174,7 +202,7 @@ class GalleryAlbumListView(ListView):
     paginate_by = 12
     
     def get_queryset(self):
-        return GalleryAlbum.objects.all()
+        return GalleryAlbum.objects.select_related('event', 'cover_photo')
 
 class GalleryAlbumDetailView(DetailView):
     model = GalleryAlbum
@@ -186,9 +214,14 @@ class GalleryAlbumDetailView(DetailView):
         ctx['photos'] = self.object.photos.all()
         return ctx
 
+def album_download(request, pk):
+    """Whole album as a ZIP, streamed on first request and served from the disk cache after"""
+    album = get_object_or_404(GalleryAlbum, pk=pk)
+    return album_zip_response(album)
+
 def club_info(request):
     """Club information view"""
-    club = ClubInfo.objects.first()
+    club = get_club_info()
     
     # Calculate years of existence
     if club and club.founded_year:
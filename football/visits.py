@@ -0,0 +1,293 @@
+"""Buffered page-visit recording.
+
+Visits are queued in memory per worker process and written with a single
+``bulk_create`` once the queue reaches ``FLUSH_SIZE`` rows or ``FLUSH_INTERVAL``
+seconds have passed since the last flush. Remaining rows are flushed when the
+worker exits. Each flush also folds the visitor IPs into the per-page, per-day
+HyperLogLog sketches used for unique-visitor estimates. Bot hits are only
+counted per day and never stored as rows.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .hll import HyperLogLog
+from .useragents import DEVICE_BOT
+
+logger = logging.getLogger(__name__)
+
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+FLUSH_NOW = 'flush'
+DROP_POLICIES = (DROP_NEWEST, DROP_OLDEST, FLUSH_NOW)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_SIZE': 1000,       # hard limit of queued visits per worker
+    'FLUSH_SIZE': 100,      # flush once this many visits are queued
+    'FLUSH_INTERVAL': 5.0,  # seconds; 0 disables the background flusher
+    'DROP_POLICY': DROP_OLDEST,
+}
+# Compare-and-swap retries when another worker updates the same sketch
+MERGE_ATTEMPTS = 5
+
+
+def _merge_sketch(page_name, day, ips, current=None):
+    """
+    Fold ``ips`` into the sketch of one page and day without losing concurrent writes.
+
+    ``current`` is the ``(pk, registers)`` pair read earlier, or None when no
+    row existed. The write only succeeds against the registers it was merged
+    into (or as the first insert); otherwise the row is read again and merged
+    again, so two workers flushing the same page and day both keep their IPs.
+    """
+    from .models import PageVisitSketch
+
+    rows = PageVisitSketch.objects.filter(page_name=page_name, day=day)
+    for _ in range(MERGE_ATTEMPTS):
+        if current is None:
+            sketch = HyperLogLog()
+            sketch.update(ips)
+            try:
+                with transaction.atomic():
+                    PageVisitSketch.objects.create(page_name=page_name, day=day, registers=sketch.to_bytes())
+                return
+            except IntegrityError:
+                pass  # another worker inserted the first sketch; merge into it
+        else:
+            pk, registers = current
+            sketch = HyperLogLog.from_bytes(registers)
+            sketch.update(ips)
+            if PageVisitSketch.objects.filter(pk=pk, registers=registers).update(registers=sketch.to_bytes()):
+                return
+        row = rows.values_list('pk', 'registers').first()
+        current = row and (row[0], bytes(row[1]))
+    logger.warning("Gave up merging the visitor sketch of %s on %s after %d attempts", page_name, day, MERGE_ATTEMPTS)
+
+
+def update_visit_sketches(visits):
+    """Add ``(page_name, ip_address, timestamp)`` visits to the daily sketches"""
+    from .models import PageVisitSketch
+
+    groups = defaultdict(set)
+    for page_name, ip, ts in visits:
+        groups[(page_name, timezone.localtime(ts).date())].add(ip)
+    if not groups:
+        return 0
+
+    pages = {page for page, _ in groups}
+    days = {day for _, day in groups}
+    existing = {
+        (page_name, day): (pk, bytes(registers))
+        for pk, page_name, day, registers in PageVisitSketch.objects.filter(page_name__in=pages, day__in=days)
+        .values_list('pk', 'page_name', 'day', 'registers')
+    }
+    for (page_name, day), ips in groups.items():
+        _merge_sketch(page_name, day, ips, existing.get((page_name, day)))
+    return len(groups)
+
+
+def add_bot_hits(counts):
+    """Add ``{date: hits}`` bot counts to the daily device rollup"""
+    from .models import PageVisitSourceDaily
+
+    for day, hits in counts.items():
+        rows = PageVisitSourceDaily.objects.filter(dimension='device', value=DEVICE_BOT, bucket=day)
+        if rows.update(hits=F('hits') + hits):
+            continue
+        try:
+            with transaction.atomic():
+                PageVisitSourceDaily.objects.create(dimension='device', value=DEVICE_BOT, bucket=day, hits=hits)
+        except IntegrityError:
+            # Another worker created the day's row in the meantime
+            rows.update(hits=F('hits') + hits)
+
+
+def get_buffer_settings():
+    """Return PAGE_VISIT_BUFFER merged over the defaults"""
+    conf = dict(DEFAULTS)
+    conf.update(getattr(settings, 'PAGE_VISIT_BUFFER', {}))
+    if conf['DROP_POLICY'] not in DROP_POLICIES:
+        raise ValueError(f"Unknown PAGE_VISIT_BUFFER DROP_POLICY: {conf['DROP_POLICY']!r}")
+    return conf
+
+
+class VisitBuffer:
+    """In-memory queue of PageVisit rows flushed in batches"""
+
+    def __init__(self, max_size=1000, flush_size=100, flush_interval=5.0, drop_policy=DROP_OLDEST):
+        self.max_size = max(1, max_size)
+        self.flush_size = max(1, min(flush_size, self.max_size))
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self._queue = deque()
+        self._bot_hits = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flusher = None
+        self._stopped = threading.Event()
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_errors = 0
+        self.bots = 0
+
+    @classmethod
+    def from_settings(cls):
+        conf = get_buffer_settings()
+        return cls(
+            max_size=conf['MAX_SIZE'],
+            flush_size=conf['FLUSH_SIZE'],
+            flush_interval=conf['FLUSH_INTERVAL'],
+            drop_policy=conf['DROP_POLICY'],
+        )
+
+    def __len__(self):
+        return len(self._queue)
+
+    def record(self, page_name, ip_address, device, referrer=''):
+        """Queue a visit; flushes inline when a threshold is reached"""
+        self._ensure_flusher()
+        flush_inline = False
+        with self._lock:
+            if len(self._queue) >= self.max_size:
+                if self.drop_policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.drop_policy == DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    flush_inline = True
+            self._queue.append((page_name, ip_address, device, referrer, timezone.now()))
+            self.recorded += 1
+            if len(self._queue) >= self.flush_size:
+                flush_inline = True
+            elif self.flush_interval and time.monotonic() - self._last_flush >= self.flush_interval:
+                flush_inline = True
+        if flush_inline:
+            self.flush()
+        return True
+
+    def record_bot(self):
+        """Count a crawler hit; written with the next flush"""
+        with self._lock:
+            self._bot_hits[timezone.localdate()] += 1
+            self.bots += 1
+
+    def flush(self):
+        """Write all queued visits with one bulk_create; returns rows written"""
+        from .models import PageVisit
+
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._queue)
+                self._queue.clear()
+                bot_hits, self._bot_hits = self._bot_hits, Counter()
+                self._last_flush = time.monotonic()
+            if bot_hits:
+                try:
+                    add_bot_hits(bot_hits)
+                except Exception:
+                    logger.exception("Failed to store %d bot hits", sum(bot_hits.values()))
+                    self.flush_errors += 1
+            if not batch:
+                return 0
+            try:
+                PageVisit.objects.bulk_create(
+                    [
+                        PageVisit(page_name=page_name, ip_address=ip, device=device, referrer=ref, timestamp=ts)
+                        for page_name, ip, device, ref, ts in batch
+                    ],
+                    batch_size=500,
+                )
+            except Exception:
+                # Same tolerance as the old per-request insert (e.g. during migrations)
+                logger.exception("Failed to flush %d page visits", len(batch))
+                self.flush_errors += 1
+                self.dropped += len(batch)
+                return 0
+            self.flushed += len(batch)
+            try:
+                update_visit_sketches((page_name, ip, ts) for page_name, ip, device, ref, ts in batch)
+            except Exception:
+                logger.exception("Failed to update visitor sketches")
+                self.flush_errors += 1
+            return len(batch)
+
+    def stats(self):
+        return {
+            'queued': len(self._queue),
+            'recorded': self.recorded,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'flush_errors': self.flush_errors,
+            'bots': self.bots,
+        }
+
+    def stop(self, flush=True):
+        """Stop the background flusher and write what is left (or drop it with ``flush=False``)"""
+        self._stopped.set()
+        if flush:
+            self.flush()
+            return
+        with self._lock:
+            self.dropped += len(self._queue)
+            self._queue.clear()
+            self._bot_hits.clear()
+
+    def _ensure_flusher(self):
+        if not self.flush_interval or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run_flusher, name='page-visit-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._stopped.wait(self.flush_interval):
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                continue
+            try:
+                self.flush()
+            finally:
+                # This thread owns its own DB connection
+                connections.close_all()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_visit_buffer():
+    """Return the per-process visit buffer, creating it on first use"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = VisitBuffer.from_settings()
+                atexit.register(_buffer.stop)
+    return _buffer
+
+
+def reset_visit_buffer(flush=False):
+    """Stop and discard the per-process buffer, dropping queued visits unless ``flush`` is set.
+
+    Tests must not flush: the buffer outlives the test transaction, so its rows
+    would end up in whatever database is current at the time.
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.stop(flush)
+            atexit.unregister(_buffer.stop)
+        _buffer = None
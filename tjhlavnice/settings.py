@@ -139,6 +139,16 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Shared between the Gunicorn workers, so version bumps from signals reach every process
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'django',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -216,6 +226,53 @@ CKEDITOR_5_CONFIGS = {
 
 CKEDITOR_5_UPLOAD_PATH = "uploads/"
 
+# Page visit logging: visits are queued per worker and written in batches
+# DROP_POLICY applies when MAX_SIZE is reached: 'drop_oldest', 'drop_newest' or 'flush'
+PAGE_VISIT_BUFFER = {
+    'ENABLED': True,
+    'MAX_SIZE': 1000,
+    'FLUSH_SIZE': 100,
+    'FLUSH_INTERVAL': 5.0,
+    'DROP_POLICY': 'drop_oldest',
+}
+
+# Raw PageVisit rows older than this are removed by prune_page_visits
+PAGE_VISIT_RETENTION_DAYS = 90
+PAGE_VISIT_ARCHIVE_DIR = BASE_DIR / 'archive'
+
+# Image resizing runs in the process_image_jobs worker; SYNC runs jobs inline on save
+IMAGE_JOBS = {
+    'SYNC': os.getenv('IMAGE_JOBS_SYNC', 'False').lower() in ('true', '1', 'yes'),
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,
+}
+
+# Public pages are cached for anonymous visitors until the models they show change
+PAGE_CACHE = {
+    'ENABLED': True,
+    'TIMEOUT': 60 * 60 * 24,
+}
+
+# Leagues with "standings_from_matches" rank teams by these criteria in order
+# (points, head_to_head, goal_difference, goals_for, won)
+STANDINGS = {
+    'POINTS_WIN': 3,
+    'POINTS_DRAW': 1,
+    'TIE_BREAKERS': ['points', 'head_to_head', 'goal_difference', 'goals_for'],
+}
+
+# Bulk gallery uploads are processed in a thread pool
+GALLERY_INGEST_WORKERS = int(os.getenv('GALLERY_INGEST_WORKERS', '4'))
+
+# Built album ZIP downloads are kept here until the album's photos change
+ALBUM_ZIP_CACHE_DIR = BASE_DIR / 'cache' / 'album_zips'
+# Archives unused this long are dropped; beyond the size limit the least recently used go first
+ALBUM_ZIP_CACHE_MAX_AGE = 60 * 60 * 24 * 30
+ALBUM_ZIP_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# gc_media --quarantine moves unreferenced media here (not served by the web server)
+MEDIA_QUARANTINE_DIR = BASE_DIR / 'quarantine'
+
 # Logging configuration
 LOGGING = {
     'version': 1,